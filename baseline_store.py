@@ -0,0 +1,146 @@
+import hashlib
+import inspect
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+import compute_forward_returns as _returns_module
+import ma_crossover_signals as _ma_module
+import sample_random_events as _random_module
+from compute_forward_returns import compute_forward_returns
+from ma_crossover_signals import ma_crossover_signals
+from price_panel import frame_digest, load_price_data, price_digest
+from stage_graph import StageCache
+
+BASELINE_DIR = ".baseline_cache"
+
+class BaselineStore:
+    """
+    Persistent per-ticker baseline events: moving average crossovers and random anchors with forward returns.
+
+    Both baselines are pure functions of the ticker's prices and their parameters, so each is computed once
+    per parameter set, persisted, and served from memory afterwards. Keys cover a digest of the prices the
+    baselines are built from (`price_digest`, recorded at ingest, so a lookup does not read the prices) and the
+    source of the baseline code, so edited data or code is recomputed.
+
+    Random baselines store the forward returns of every eligible anchor once (independent of seed and n_events);
+    a request replays the exact draw of `sample_random_events` over them, so any (seed, n_events) is served
+    without touching the prices again and matches `sample_random_events` row for row.
+
+    Parameters
+    ----------
+    cache : StageCache or None
+        Backing pickle store (default is a StageCache in '.baseline_cache').
+    """
+
+    def __init__(self, cache=None):
+        self.cache = cache if cache is not None else StageCache(BASELINE_DIR)
+        self._memory = {}
+
+    def ma_events(self, ticker, df=None, short_window=20, long_window=50, horizons=(5, 20, 60)):
+        """
+        `ma_crossover_signals(df, short_window, long_window, horizons)` for the ticker.
+
+        `df` is only used (and only loaded, when None) if the events are not stored yet.
+        """
+        params = {'short_window': short_window, 'long_window': long_window, 'horizons': tuple(horizons)}
+        table = self._table('ma', ticker, params, df,
+                            lambda d: ma_crossover_signals(d, short_window, long_window, horizons=horizons))
+        return table.copy()
+
+    def random_events(self, ticker, n_events, df=None, horizons=(5, 20, 60), seed=42, buffer=60):
+        """
+        `sample_random_events(df, n_events, horizons, seed, buffer)` for the ticker.
+
+        `df` is only used (and only loaded, when None) if the anchors are not stored yet.
+        """
+        table = self.eligible_anchors(ticker, df=df, horizons=horizons, buffer=buffer)
+
+        n_valid = len(table)
+        n = min(n_events, n_valid)
+        # the same draw sample_random_events makes over the eligible anchors, which the table holds in order
+        picked = np.random.default_rng(seed).choice(n_valid, size=n, replace=False)
+        return table.iloc[picked].reset_index(drop=True)
+
+    def eligible_anchors(self, ticker, df=None, horizons=(5, 20, 60), buffer=60):
+        """
+        Every anchor `sample_random_events` can draw for the ticker, in draw order, with its forward returns.
+
+        Shared by all seeds and event counts; do not modify the returned frame.
+        """
+        params = {'horizons': tuple(horizons), 'buffer': buffer}
+        return self._table('random', ticker, params, df, lambda d: _eligible_anchors(d, horizons, buffer))
+
+    def _table(self, kind, ticker, params, df, build):
+        key = self._key(kind, ticker, params, df)
+        if key in self._memory:
+            return self._memory[key]
+        try:
+            table = self.cache.get(key)
+        except KeyError:
+            table = build(df if df is not None else load_price_data(ticker))
+            self.cache.put(key, table)
+        self._memory[key] = table
+        return table
+
+    def _key(self, kind, ticker, params, df=None):
+        h = hashlib.sha256()
+        h.update(f"{kind}:{ticker}".encode())
+        h.update(_code_hash().encode())
+        h.update(repr(sorted(params.items())).encode())
+        h.update((frame_digest(df) if df is not None else price_digest(ticker)).encode())
+        return h.hexdigest()
+
+
+@lru_cache(maxsize=1)
+def _code_hash():
+    h = hashlib.sha256()
+    for obj in (_eligible_anchors, _returns_module, _ma_module, _random_module):
+        h.update(inspect.getsource(obj).encode())
+    return h.hexdigest()
+
+
+def _eligible_anchors(df, horizons, buffer):
+    """
+    Every anchor `sample_random_events` can draw, in draw order, with its forward returns.
+    """
+    valid_idx = df.index[buffer:-buffer]  # avoid edges
+    rand_df = pd.DataFrame({'confirm_date': valid_idx, 'confirm_price': df.loc[valid_idx, 'Close'].to_numpy()})
+    rand_df = compute_forward_returns(df, rand_df, horizons=horizons)
+    rand_df['type'] = 'random'
+    return rand_df
+
+
+@lru_cache(maxsize=None)
+def open_baseline_store(cache_dir=BASELINE_DIR):
+    """
+    Shared BaselineStore for this process.
+    """
+    return BaselineStore(StageCache(cache_dir))
+
+
+if __name__ == "__main__":
+    # equivalence check of the stored baselines against computing them directly
+    import time
+    from price_panel import list_tickers
+    from sample_random_events import sample_random_events
+
+    store = open_baseline_store()
+    tickers = list_tickers()
+    rng = np.random.default_rng(0)
+    for ticker in tickers:
+        df = load_price_data(ticker)
+        pd.testing.assert_frame_equal(store.ma_events(ticker, df=df), ma_crossover_signals(df))
+        for n_events in (0, 1, int(rng.integers(2, 60)), 5000):
+            seed = int(rng.integers(0, 1000))
+            pd.testing.assert_frame_equal(store.random_events(ticker, n_events, df=df, seed=seed),
+                                          sample_random_events(df, n_events, seed=seed))
+    print("stored baselines match ma_crossover_signals and sample_random_events on all tickers")
+
+    fresh = BaselineStore(store.cache)
+    start = time.perf_counter()
+    for ticker in tickers:
+        fresh.ma_events(ticker)
+        fresh.random_events(ticker, 20)
+    print(f"served both baselines for {len(tickers)} tickers from disk in {time.perf_counter() - start:.2f} s")
@@ -0,0 +1,238 @@
+import argparse
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import joblib
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+from engineer_features import FEATURES, engineer_features
+
+# detection outputs the features are built from, besides the peak and trough positions
+RAW_COLUMNS = ('peak1_price', 'peak2_price', 'trough_price', 'peak_gap_days', 'vol1', 'vol2', 'vol2_vol1_ratio')
+
+class BatchScorer:
+    """
+    Long-lived scorer for double top candidates: loads the trained model once and scores micro-batches.
+
+    Candidates are raw rows as produced by detect_double_tops (or pos_to_date); the engineered features
+    are built here with the same formulas as training. Models trained with technical_features=True also use
+    TECHNICAL_FEATURES: they are taken from the candidates when present, and otherwise read from the feature
+    store at each candidate's second peak, which needs a 'Ticker' column.
+
+    Parameters
+    ----------
+    model_path : str
+        Trained model saved by prediction_pipeline (default is 'best_xgb_model.json').
+    feature_path : str
+        Pickled feature list saved by prediction_pipeline (default is 'feature_names.pkl').
+    threshold : float
+        Probability threshold for a positive prediction (default is 0.5).
+    window : int
+        Number of recent calls kept for the latency percentiles (default is 10,000).
+    """
+
+    def __init__(self, model_path='best_xgb_model.json', feature_path='feature_names.pkl', threshold=0.5, window=10_000):
+        self.booster = xgb.Booster()
+        self.booster.load_model(model_path)
+        self.features = list(joblib.load(feature_path))
+        self.threshold = threshold
+
+        self._technical = [f for f in self.features if f not in FEATURES]
+        self._feature_store = None
+        if self._technical:
+            from feature_store import TECHNICAL_FEATURES, open_feature_store
+
+            unknown = sorted(set(self._technical) - set(TECHNICAL_FEATURES))
+            if unknown:
+                raise ValueError(f"{feature_path} lists features BatchScorer cannot build: {unknown}")
+            self._feature_store = open_feature_store()
+
+        self._latencies = deque(maxlen=window)
+        self._calls = 0
+        self._rows = 0
+        self._busy = 0.0
+        self._lock = threading.Lock()
+
+    def score(self, candidates):
+        """
+        Probability that each candidate completes as a confirmed double top.
+
+        Parameters
+        ----------
+        candidates : pd.DataFrame or list of dict
+            Raw candidate rows with 'peak1_price', 'peak2_price', 'trough_price', 'peak_gap_days', 'vol1', 'vol2',
+            'vol2_vol1_ratio' and the peak/trough positions.
+
+        Returns
+        -------
+        np.ndarray
+            Positive-class probabilities, aligned with candidates.
+        """
+        start = time.perf_counter()
+        columns = self._raw_columns(candidates)
+        n = len(columns['peak1_price'])
+        if n == 0:
+            probs = np.zeros(0, dtype=np.float32)
+        else:
+            # column arrays rather than a DataFrame: pandas overhead dominates for a handful of rows
+            engineered = engineer_features(columns)
+            if self._technical:
+                engineered.update(self._technical_columns(candidates, columns))
+            X = np.column_stack([engineered[f] for f in self.features]).astype(np.float32)
+            probs = self.booster.inplace_predict(X)
+        self._record(time.perf_counter() - start, n)
+        return probs
+
+    @staticmethod
+    def _raw_columns(candidates):
+        """
+        Float arrays of the detection columns the features are built from.
+        """
+        if isinstance(candidates, pd.DataFrame):
+            get = lambda c: candidates[c].to_numpy(dtype=np.float64)
+            has = candidates.columns.__contains__
+        else:
+            get = lambda c: np.array([row[c] for row in candidates], dtype=np.float64)
+            has = (lambda c: c in candidates[0]) if len(candidates) else (lambda c: True)
+
+        names = list(RAW_COLUMNS)
+        for k in ('peak1', 'trough', 'peak2'):
+            names.append(f'{k}_pos' if has(f'{k}_pos') else f'{k}_date')
+        return {c: get(c) for c in names}
+
+    def _technical_columns(self, candidates, columns):
+        """
+        The model's TECHNICAL_FEATURES for the candidates, from their own columns or joined from the feature store.
+        """
+        frame = candidates if isinstance(candidates, pd.DataFrame) else pd.DataFrame(list(candidates))
+        if all(c in frame for c in self._technical):
+            return {c: frame[c].to_numpy(dtype=np.float64) for c in self._technical}
+        if 'Ticker' not in frame:
+            raise ValueError(f"the model uses technical features {self._technical}; candidates need a 'Ticker' "
+                             f"column to read them from the feature store")
+        from feature_store import add_technical_features
+
+        # positions of the second peak, as chosen by _raw_columns
+        peak2 = columns['peak2_pos'] if 'peak2_pos' in columns else columns['peak2_date']
+        points = pd.DataFrame({'Ticker': frame['Ticker'].to_numpy(), 'peak2_pos': peak2.astype(np.int64)})
+        joined = add_technical_features(points, store=self._feature_store)
+        return {c: joined[c].to_numpy() for c in self._technical}
+
+    def score_frame(self, candidates):
+        """
+        Candidates with 'prob' and 'predicted_label' columns added.
+        """
+        candidates = pd.DataFrame(candidates).copy()
+        candidates['prob'] = self.score(candidates)
+        candidates['predicted_label'] = (candidates['prob'] >= self.threshold).astype(int)
+        return candidates
+
+    def _record(self, seconds, rows):
+        with self._lock:
+            self._latencies.append(seconds)
+            self._calls += 1
+            self._rows += rows
+            self._busy += seconds
+
+    def stats(self):
+        """
+        Counters since start: calls, rows, p50/p99 latency (ms, over recent calls) and rows per busy second.
+        """
+        with self._lock:
+            latencies = np.array(self._latencies)
+            calls, rows, busy = self._calls, self._rows, self._busy
+        return {
+            'calls': calls,
+            'rows': rows,
+            'p50_ms': float(np.percentile(latencies, 50) * 1e3) if calls else float('nan'),
+            'p99_ms': float(np.percentile(latencies, 99) * 1e3) if calls else float('nan'),
+            'rows_per_s': rows / busy if busy > 0 else float('nan'),
+        }
+
+
+def serve(scorer, host='127.0.0.1', port=8765):
+    """
+    Local HTTP front end for a BatchScorer, serving until interrupted (see `make_server`).
+    """
+    server = make_server(scorer, host, port)
+    print(f"Scoring double top candidates on http://{host}:{server.server_address[1]}/score")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def make_server(scorer, host='127.0.0.1', port=8765):
+    """
+    HTTP server for a BatchScorer, bound but not yet serving; port 0 picks a free port.
+
+    POST /score with a JSON list of candidate rows (or {"candidates": [...]}) returns {"prob": [...],
+    "predicted_label": [...]}; GET /stats returns the scorer's counters.
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, code, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(code)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == '/stats':
+                self._reply(200, scorer.stats())
+            else:
+                self._reply(404, {'error': f'unknown path {self.path}'})
+
+        def do_POST(self):
+            if self.path != '/score':
+                self._reply(404, {'error': f'unknown path {self.path}'})
+                return
+            try:
+                payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                candidates = payload['candidates'] if isinstance(payload, dict) else payload
+                probs = scorer.score(candidates)
+            except KeyError as e:
+                self._reply(400, {'error': f'missing column {e}'})
+                return
+            except (ValueError, TypeError) as e:
+                self._reply(400, {'error': str(e)})
+                return
+            self._reply(200, {'prob': probs.tolist(),
+                              'predicted_label': (probs >= scorer.threshold).astype(int).tolist()})
+
+        def log_message(self, format, *args):
+            pass  # keep the console quiet under load
+
+    return ThreadingHTTPServer((host, port), Handler)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batch scorer for double top candidates.")
+    parser.add_argument('--model', default='best_xgb_model.json')
+    parser.add_argument('--features', default='feature_names.pkl')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--check', action='store_true',
+                        help="score the labeled events in micro-batches and print the counters")
+    args = parser.parse_args()
+
+    scorer = BatchScorer(args.model, args.features)
+    if not args.check:
+        serve(scorer, args.host, args.port)
+    else:
+        from event_store import read_events
+
+        labeled = read_events('labeled_double_top_events.csv')
+        raw = labeled.drop(columns=[c for c in scorer.features if c not in RAW_COLUMNS])
+        # one micro-batch per peak-2 day, like the day's new candidates across the universe
+        for _, day in raw.groupby('peak2_date', sort=False):
+            scorer.score(day)
+        print(scorer.stats())
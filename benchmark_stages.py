@@ -0,0 +1,229 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from price_panel import load_price_data, list_tickers
+from find_local_extrema import find_local_extrema
+from detect_double_tops import detect_double_tops
+from confirm_double_tops import confirm_double_tops
+from compute_forward_returns import compute_forward_returns
+from ma_crossover_signals import ma_crossover_signals
+from sample_random_events import sample_random_events
+from evaluate_all import evaluate_all
+
+BENCH_TICKER = "AAPL"
+N_UNIVERSE_TICKERS = 50
+HISTORY_FILE = "benchmark_history.json"
+
+def _ticker_inputs(ticker=BENCH_TICKER):
+    """
+    Shared per-ticker inputs so each stage is timed on its own, with upstream work done in setup.
+    """
+    df = load_price_data(ticker)
+    candidates = detect_double_tops(df)
+    confirmed = confirm_double_tops(df, candidates, max_confirm_days=40)
+    dt_events = compute_forward_returns(df, confirmed)
+    rand_events = sample_random_events(df, n_events=len(dt_events))
+    ma_events = ma_crossover_signals(df)
+    return {'df': df, 'candidates': candidates, 'confirmed': confirmed,
+            'dt_events': dt_events, 'rand_events': rand_events, 'ma_events': ma_events}
+
+
+def _bench_extrema(x):
+    local_high, local_low = find_local_extrema(x['df'])
+    return int(local_high.sum() + local_low.sum())
+
+def _bench_detect(x):
+    return len(detect_double_tops(x['df']))
+
+def _bench_confirm(x):
+    return len(confirm_double_tops(x['df'], x['candidates'], max_confirm_days=40))
+
+def _bench_forward_returns(x):
+    return len(compute_forward_returns(x['df'], x['confirmed']))
+
+def _bench_ma_crossover(x):
+    return len(ma_crossover_signals(x['df']))
+
+def _bench_evaluate_all(x):
+    ind_summary, comp_summary = evaluate_all(x['dt_events'], x['rand_events'], x['ma_events'])
+    return len(ind_summary) + len(comp_summary)
+
+def _permutation_inputs():
+    import joblib
+    from xgboost import XGBClassifier
+    from event_store import read_events
+
+    labeled = read_events('labeled_double_top_events.csv').sort_values('peak2_date', kind='stable').iloc[:2000]
+    features = joblib.load('feature_names.pkl')
+    split = int(len(labeled) * 0.8)
+    model = XGBClassifier(objective="binary:logistic", n_estimators=50, max_depth=3, n_jobs=1)
+    return {'model': model, 'features': features, 'train': labeled.iloc[:split], 'test': labeled.iloc[split:]}
+
+def _bench_permutation(x):
+    from permutation_test_all_metrics import permutation_test_all_metrics
+
+    n_permutations = 5
+    permutation_test_all_metrics(x['model'], x['train'][x['features']], x['train']['label'],
+                                 x['test'][x['features']], x['test']['label'], n_permutations=n_permutations)
+    return n_permutations + 1
+
+# the pipeline benchmarks build their baselines in a fresh store per call, so repeats time the work, not cache hits
+def _bench_pipeline_single(x):
+    from run_double_top_pipeline import run_double_top_pipeline
+
+    with tempfile.TemporaryDirectory() as baseline_dir:
+        dt_events = run_double_top_pipeline(BENCH_TICKER, baseline_dir=baseline_dir)[0]
+    return len(dt_events)
+
+def _bench_pipeline_universe(x):
+    from run_double_top_pipeline import run_universe
+
+    with tempfile.TemporaryDirectory() as baseline_dir:
+        dt_events = run_universe(x['tickers'], workers=1, baseline_dir=baseline_dir)[0]
+    return len(dt_events)
+
+
+# name -> (setup, benchmarked call); the call returns the number of events it produced
+BENCHMARKS = {
+    'find_local_extrema': (_ticker_inputs, _bench_extrema),
+    'detect_double_tops': (_ticker_inputs, _bench_detect),
+    'confirm_double_tops': (_ticker_inputs, _bench_confirm),
+    'compute_forward_returns': (_ticker_inputs, _bench_forward_returns),
+    'ma_crossover_signals': (_ticker_inputs, _bench_ma_crossover),
+    'evaluate_all': (_ticker_inputs, _bench_evaluate_all),
+    'permutation_test_all_metrics': (_permutation_inputs, _bench_permutation),
+    'pipeline_1_ticker': (lambda: {}, _bench_pipeline_single),
+    f'pipeline_{N_UNIVERSE_TICKERS}_tickers': (lambda: {'tickers': list_tickers()[:N_UNIVERSE_TICKERS]}, _bench_pipeline_universe),
+}
+
+
+def run_benchmark(name, repeat=5):
+    """
+    Time one benchmark and measure its peak Python memory.
+
+    Parameters
+    ----------
+    name : str
+        Key of BENCHMARKS.
+    repeat : int
+        Number of timed calls; the median is reported (default is 5).
+
+    Returns
+    -------
+    dict
+        'wall_s' (median seconds per call), 'peak_mb' (tracemalloc peak of one call),
+        'events' and 'events_per_s'.
+    """
+    setup, call = BENCHMARKS[name]
+    inputs = setup()
+    events = call(inputs)  # warm-up: imports, caches, memory maps
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        call(inputs)
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    call(inputs)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    wall = statistics.median(times)
+    return {'wall_s': wall, 'peak_mb': peak / 1024**2, 'events': events,
+            'events_per_s': events / wall if wall > 0 else float('nan')}
+
+
+def check_regressions(results, history, threshold=0.25, window=5):
+    """
+    Compare results against the median of the last `window` recorded runs of each benchmark.
+
+    Regressed results are flagged with 'regressed': True, and flagged results in the history are left out of the
+    baseline, so a persistent regression keeps failing instead of becoming the new normal after `window` runs.
+
+    Parameters
+    ----------
+    results : dict
+        Output of this run, benchmark name -> run_benchmark dict.
+    history : list of dict
+        Previously recorded runs from the history file.
+    threshold : float
+        Allowed relative slowdown / memory growth before failing (default is 0.25, i.e. 25%).
+    window : int
+        Number of most recent runs forming the baseline (default is 5).
+
+    Returns
+    -------
+    list of str
+        One message per regression; empty when everything is within threshold.
+    """
+    regressions = []
+    for name, result in results.items():
+        past = [run['results'][name] for run in history
+                if name in run['results'] and not run['results'][name].get('regressed')][-window:]
+        if not past:
+            continue
+        for metric in ('wall_s', 'peak_mb'):
+            baseline = statistics.median(p[metric] for p in past)
+            if baseline > 0 and result[metric] > baseline * (1 + threshold):
+                result['regressed'] = True
+                regressions.append(f"{name}: {metric} {result[metric]:.4g} vs baseline {baseline:.4g} "
+                                   f"(+{100 * (result[metric] / baseline - 1):.0f}%)")
+    return regressions
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stage-level benchmarks with regression thresholds.")
+    parser.add_argument('--stages', nargs='+', default=list(BENCHMARKS), choices=list(BENCHMARKS))
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--threshold', type=float, default=0.25, help="allowed relative regression, e.g. 0.25 for 25%%")
+    parser.add_argument('--window', type=int, default=5, help="number of recent runs forming the baseline")
+    parser.add_argument('--history', default=HISTORY_FILE)
+    parser.add_argument('--no-record', action='store_true', help="do not append this run to the history")
+    args = parser.parse_args()
+
+    results = {}
+    for name in args.stages:
+        results[name] = run_benchmark(name, repeat=args.repeat)
+        r = results[name]
+        print(f"{name:32s} {1e3 * r['wall_s']:10.2f} ms  {r['peak_mb']:8.2f} MB  {r['events_per_s']:12.1f} events/s")
+
+    history = []
+    if os.path.exists(args.history):
+        with open(args.history) as f:
+            history = json.load(f)
+
+    regressions = check_regressions(results, history, threshold=args.threshold, window=args.window)
+
+    if not args.no_record:
+        history.append({
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'results': results,
+        })
+        with open(args.history, 'w') as f:
+            json.dump(history, f, indent=2)
+
+    if regressions:
+        print("Performance regressions:")
+        for message in regressions:
+            print(f"  {message}")
+        sys.exit(1)
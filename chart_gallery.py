@@ -0,0 +1,237 @@
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')  # files only; worker processes have no display
+import matplotlib.pyplot as plt
+import mplfinance as mpf
+
+from plot_candles import MAX_BARS, downsample_ohlc, marker_values
+from price_panel import load_price_data
+
+GALLERY_DIR = "outputs"
+
+# double top tables (dt_events, labeled events): point -> price field the marker sits on
+DOUBLE_TOP_POINTS = {'peak1': 'High', 'peak2': 'High', 'trough': 'Low', 'confirm': 'Close'}
+
+# marker groups drawn per chart: price field -> (offset factor, marker, color)
+MARKER_STYLES = {'High': (1.01, '^', 'lime'), 'Low': (0.99, 'o', 'orange'), 'Close': (1.01, 'v', 'red')}
+
+def event_points(events):
+    """
+    Bar positions of every marked point of each event, in one pass over the table's columns.
+
+    Understands double top tables (bar positions in 'peak1_pos'... or, before pos_to_date, in 'peak1_date'...)
+    and detect_patterns tables (points in '*_index' columns, span in 'start_pos'/'end_pos').
+
+    Returns
+    -------
+    positions : np.ndarray
+        (n_events x n_points) bar positions, -1 where an event has no such point.
+    fields : list of str
+        Price field ('High', 'Low' or 'Close') each point column is marked on.
+    start, end : np.ndarray
+        First and last bar of each event's pattern.
+    """
+    cols = events.columns
+    if 'start_pos' in cols:
+        names = [c for c in cols if c.endswith('_index')]
+        fields = ['Low' if 'trough' in c else 'High' for c in names]
+        start = events['start_pos'].to_numpy(dtype=float, na_value=-1).astype(np.int64)
+        end = events['end_pos'].to_numpy(dtype=float, na_value=-1).astype(np.int64)
+    else:
+        suffix = '_pos' if 'peak1_pos' in cols else '_date'
+        names = [f'{p}{suffix}' for p in DOUBLE_TOP_POINTS if f'{p}{suffix}' in cols]
+        fields = [DOUBLE_TOP_POINTS[c[:-len(suffix)]] for c in names]
+        start = events[names[0]].to_numpy(dtype=np.int64)
+        end = events[names[-1]].to_numpy(dtype=np.int64)
+    positions = np.column_stack([events[c].to_numpy(dtype=float, na_value=-1) for c in names]).astype(np.int64)
+    return positions, fields, start, end
+
+
+def event_trendlines(events):
+    """
+    (slope, intercept) arrays of every trendline in a detect_patterns table (lines over bar positions).
+    """
+    names = [c[:-len('_slope')] for c in events.columns if c.endswith('_trendline_slope')]
+    return [(events[f'{n}_slope'].to_numpy(dtype=float), events[f'{n}_intercept'].to_numpy(dtype=float)) for n in names]
+
+
+def chart_name(i, label):
+    """
+    File name of the i-th chart of a ticker, e.g. '01_Double_Top.png'.
+    """
+    label = label.replace('_', ' ').title() if label.islower() else label
+    return f"{i:02d}_{re.sub(r'[^0-9A-Za-z]+', '_', label).strip('_')}.png"
+
+
+def _render(df, markers, span, title, path, figsize, dpi, volume, lines=()):
+    """
+    One candlestick chart with marker groups, trendlines and a shaded pattern span, saved to path.
+    """
+    apds = [mpf.make_addplot(values, type='scatter', marker=marker, markersize=40, color=color,
+                             edgecolors='black', linewidths=1.0)
+            for values, marker, color in markers if not np.isnan(values).all()]
+    apds += [mpf.make_addplot(values, color='blue', width=1.5) for values in lines if not np.isnan(values).all()]
+    # y range covering the candles and the markers drawn just outside them
+    low = np.nanmin([df['Low'].min(), *(np.nanmin(v) for v, _, _ in markers if not np.isnan(v).all())])
+    high = np.nanmax([df['High'].max(), *(np.nanmax(v) for v, _, _ in markers if not np.isnan(v).all())])
+    pad = 0.03 * (high - low)
+    fig, _ = mpf.plot(
+        df,
+        type='candle',
+        style='yahoo',
+        volume=volume,
+        addplot=apds,
+        figsize=figsize,
+        ylim=(low - pad, high + pad),
+        scale_padding=dict(left=0.3, right=1.1, top=1.4, bottom=1.3),
+        fill_between=dict(y1=float(df['Low'].min()), y2=float(df['High'].max()), where=span, alpha=0.12, color='red'),
+        warn_too_much_data=len(df) + 1,
+        returnfig=True,
+    )
+    fig.suptitle(title, fontsize=10, fontweight='bold', y=0.99, va='top')
+    fig.savefig(path, dpi=dpi)
+    plt.close(fig)
+
+
+def _render_ticker(ticker, events, out_dir, pad, figsize, dpi, volume, overview, max_bars):
+    """
+    Worker for `render_gallery`: every chart of one ticker; returns the written paths.
+    """
+    df = load_price_data(ticker, date_index=True)
+    n = len(df)
+    prices = {f: df[f].to_numpy() for f in MARKER_STYLES}
+    positions, fields, start, end = event_points(events)
+    fields = np.array(fields)
+    trendlines = event_trendlines(events)
+
+    # every marker price of every event in one gather per field; missing points stay NaN
+    values = np.full(positions.shape, np.nan)
+    for field, (scale, _, _) in MARKER_STYLES.items():
+        cols = fields == field
+        p = positions[:, cols]
+        values[:, cols] = np.where((p >= 0) & (p < n), prices[field][np.clip(p, 0, n - 1)] * scale, np.nan)
+    lo = np.clip(np.minimum(start, end) - pad, 0, n - 1)
+    hi = np.clip(np.maximum(start, end) + pad, 0, n - 1)
+
+    folder = os.path.join(out_dir, f"{ticker}_candlestick_charts")
+    os.makedirs(folder, exist_ok=True)
+    labels = events['type'].astype(str).to_numpy() if 'type' in events else np.full(len(events), 'Double Top')
+    valid = events['valid'].to_numpy() if 'valid' in events else None
+    dates = df.index.strftime('%Y-%m-%d')
+    bars = np.arange(n)
+
+    paths = []
+    for i in range(len(events)):
+        window = slice(lo[i], hi[i] + 1)
+        w = hi[i] + 1 - lo[i]
+        markers = []
+        for field, (_, marker, color) in MARKER_STYLES.items():
+            cols = fields == field
+            markers.append((marker_values(w, positions[i, cols] - lo[i], values[i, cols]), marker, color))
+        span = (bars[window] >= start[i]) & (bars[window] <= end[i])
+        lines = [np.where(span, slope[i] * bars[window] + intercept[i], np.nan) for slope, intercept in trendlines]
+        label = labels[i].replace('_', ' ').title() if labels[i].islower() else labels[i]
+        status = '' if valid is None else (' - VALID' if valid[i] else ' - INVALID')
+        title = f"{ticker} - {label}{status}\n{dates[max(start[i], 0)]} to {dates[min(end[i], n - 1)]}"
+        path = os.path.join(folder, chart_name(i + 1, labels[i]))
+        _render(df.iloc[window], markers, span, title, path, figsize, dpi, volume, lines)
+        paths.append(path)
+
+    if overview:
+        # full history with every event, merged into at most max_bars candles
+        df_down, k = downsample_ohlc(df, max_bars)
+        m = len(df_down)
+        low_down, high_down = df_down['Low'].to_numpy(), df_down['High'].to_numpy()
+        markers = []
+        for field, (scale, marker, color) in MARKER_STYLES.items():
+            p = positions[:, fields == field].ravel()
+            p = np.where(p >= 0, p // k, -1)
+            source = low_down if field == 'Low' else (high_down if field == 'High' else df_down['Close'].to_numpy())
+            markers.append((marker_values(m, p, source[np.clip(p, 0, m - 1)], scale), marker, color))
+        inside = np.zeros(m + 1, dtype=np.int64)
+        np.add.at(inside, np.clip(start, 0, n - 1) // k, 1)
+        np.add.at(inside, np.clip(end, 0, n - 1) // k + 1, -1)
+        span = np.cumsum(inside)[:m] > 0
+        path = os.path.join(folder, "00_Overview.png")
+        _render(df_down, markers, span, f"{ticker} - {len(events)} events", path, (figsize[0] * 2, figsize[1]), dpi, volume)
+        paths.insert(0, path)
+    return paths
+
+
+def render_gallery(events, out_dir=GALLERY_DIR, pad=20, workers=None, figsize=(6, 3.5), dpi=80, volume=True,
+                   overview=False, max_bars=MAX_BARS):
+    """
+    Render a zoomed chart for every event into per-ticker folders, on a process pool.
+
+    Each event gets '{out_dir}/{symbol}_candlestick_charts/NN_{Type}.png' (numbered in table order within the
+    ticker): its pattern span shaded, `pad` bars on either side, and its peaks (^), troughs (o) and
+    confirmation (v) marked. Marker prices of all events are gathered in one pass per ticker. Each ticker is one
+    pool task, so its prices are loaded once.
+
+    Parameters
+    ----------
+    events : pd.DataFrame
+        Event table with a 'symbol' (or 'Ticker') column: dt_events from `run_universe`, the labeled events, or
+        a `detect_patterns` table (its 'type' and 'valid' go into the titles).
+    out_dir : str
+        Gallery root (default is 'outputs').
+    pad : int
+        Bars of context before and after each pattern (default is 20).
+    workers : int or None
+        Number of worker processes; None uses every core, 1 runs serially in this process.
+    figsize : tuple of float
+        Chart size in inches (default is (6, 3.5)).
+    dpi : int
+        Resolution of the saved PNGs (default is 80, thumbnail size).
+    volume : bool
+        Draw the volume panel (default is True).
+    overview : bool
+        Also render '00_Overview.png' per ticker: the full history, OHLC-downsampled to at most max_bars
+        candles, with every event marked (default is False).
+    max_bars : int
+        Candle limit of the overview charts (default is MAX_BARS).
+
+    Returns
+    -------
+    list of str
+        Paths of the written charts, by ticker in order of first appearance.
+    """
+    symbol = 'symbol' if 'symbol' in events else 'Ticker'
+    groups = [(t, g.reset_index(drop=True)) for t, g in events.groupby(symbol, sort=False, observed=True)]
+    if not groups:
+        return []
+    tickers, frames = zip(*groups)
+    n = len(groups)
+    args = ([out_dir] * n, [pad] * n, [figsize] * n, [dpi] * n, [volume] * n, [overview] * n, [max_bars] * n)
+    if workers == 1:
+        results = list(map(_render_ticker, tickers, frames, *args))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_render_ticker, tickers, frames, *args))
+    return [path for paths in results for path in paths]
+
+
+if __name__ == "__main__":
+    # thumbnails of the double tops of a slice of the universe, plus the AAPL pattern gallery
+    import tempfile
+    import time
+    from detect_patterns import detect_patterns
+    from price_panel import list_tickers
+    from run_double_top_pipeline import run_universe
+
+    dt_events = run_universe(list_tickers()[:40])[0]
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        paths = render_gallery(dt_events, out_dir=tmp, overview=True)
+        elapsed = time.perf_counter() - start
+        print(f"{len(paths)} charts for {dt_events['symbol'].nunique()} tickers in {elapsed:.1f} s "
+              f"({1e3 * elapsed / len(paths):.0f} ms per chart, {os.cpu_count()} cores)")
+
+    aapl = detect_patterns(load_price_data('AAPL'), symbol='AAPL')
+    aapl = aapl[aapl['start_date'] >= '2022-01-01'].reset_index(drop=True)
+    paths = render_gallery(aapl, out_dir=os.path.join(GALLERY_DIR, "gallery"), workers=1, figsize=(12, 6), dpi=100)
+    print(f"{len(paths)} AAPL pattern charts written to {os.path.dirname(paths[0])}")
@@ -0,0 +1,272 @@
+"""
+Single command-line entry point for the project: python chartpatterns.py <command> [options]
+
+    ingest    build the memory-mapped price panel from the raw CSVs
+    detect    confirmed double tops (or, with --patterns, every chart pattern) for some or all tickers
+    evaluate  double top returns against the random and MA crossover baselines, written as summary CSVs
+    train     run the prediction pipeline and save the model, feature names and labeled set
+    score     score candidates with the trained model, or serve the scorer over HTTP
+    plot      render a chart gallery for an event table
+
+Each command imports its modules when it runs, so a detection job never loads scipy, matplotlib, sklearn or
+xgboost. --profile-startup prints what the command's imports cost.
+"""
+import argparse
+import builtins
+import sys
+import time
+
+class ImportProfiler:
+    """
+    Times the first import of every top-level package while active.
+
+    Costs are cumulative (a package's time includes the packages it imports first); `total` only counts
+    imports made directly by the command, so it is the command's whole import overhead.
+    """
+
+    def __init__(self):
+        self.cost = {}
+        self.total = 0.0
+        self._depth = 0
+        self._import = builtins.__import__
+
+    def __enter__(self):
+        builtins.__import__ = self._timed
+        return self
+
+    def __exit__(self, *exc):
+        builtins.__import__ = self._import
+
+    def _timed(self, name, globals=None, locals=None, fromlist=(), level=0):
+        top = name.partition('.')[0]
+        if level or top in sys.modules:
+            return self._import(name, globals, locals, fromlist, level)
+        start = time.perf_counter()
+        self._depth += 1
+        try:
+            return self._import(name, globals, locals, fromlist, level)
+        finally:
+            self._depth -= 1
+            elapsed = time.perf_counter() - start
+            self.cost.setdefault(top, elapsed)
+            if self._depth == 0:
+                self.total += elapsed
+
+    def report(self, top=15, file=sys.stderr):
+        print(f"imports: {self.total:.3f} s for {len(self.cost)} packages (cumulative, slowest first)", file=file)
+        for name, cost in sorted(self.cost.items(), key=lambda kv: -kv[1])[:top]:
+            print(f"  {cost:8.3f} s  {name}", file=file)
+
+
+def _tickers(args):
+    from price_panel import list_tickers
+
+    return args.tickers or list_tickers()
+
+
+def _write_events(events, path):
+    """
+    Write an event table as .csv, .json (pattern records) or an event store directory (.events).
+    """
+    if path.endswith('.events'):
+        from event_store import save_events
+
+        save_events(events, path)
+    elif path.endswith('.json'):
+        from detect_patterns import save_patterns
+
+        save_patterns(events, path)
+    else:
+        events.to_csv(path, index=False)
+    print(f"wrote {len(events)} events to {path}")
+
+
+def _read_events(path):
+    from event_store import read_events
+
+    return read_events(path)
+
+
+def _confirmed_double_tops(ticker, max_confirm_days=40):
+    """
+    Worker for `detect`: the ticker's confirmed double tops at the pipeline's detection settings.
+    """
+    from detect_double_tops import detect_double_tops
+    from confirm_double_tops import confirm_double_tops
+    from price_panel import load_price_data
+
+    df = load_price_data(ticker)
+    confirmed = confirm_double_tops(df, detect_double_tops(df), max_confirm_days=max_confirm_days)
+    confirmed['symbol'] = ticker
+    return confirmed
+
+
+def cmd_ingest(args):
+    from price_panel import ingest_price_panel
+
+    kwargs = {k: v for k, v in (('src_dir', args.src), ('panel_dir', args.panel)) if v is not None}
+    panel = ingest_price_panel(**kwargs)
+    print(f"ingested {len(panel)} tickers over {len(panel.dates)} dates")
+
+
+def cmd_detect(args):
+    tickers = _tickers(args)
+    if args.patterns is not None:
+        from detect_patterns import MATCHERS, detect_patterns_universe
+
+        names = [name for value in args.patterns for name in value.split(',') if name]
+        unknown = set(names) - set(MATCHERS) - {'all'}
+        if unknown:
+            sys.exit(f"unknown patterns {sorted(unknown)}; choose from {sorted(MATCHERS)} or 'all'")
+        patterns = None if 'all' in names or not names else names
+        events = detect_patterns_universe(tickers, workers=args.workers, patterns=patterns)
+    else:
+        import pandas as pd
+
+        if args.workers == 1:
+            frames = list(map(_confirmed_double_tops, tickers))
+        else:
+            from concurrent.futures import ProcessPoolExecutor
+
+            with ProcessPoolExecutor(max_workers=args.workers) as pool:
+                frames = list(pool.map(_confirmed_double_tops, tickers, chunksize=8))
+        frames = [f for f in frames if not f.empty]
+        events = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+    if args.out:
+        _write_events(events, args.out)
+    else:
+        n_tickers = events['symbol'].nunique() if len(events) else 0
+        print(f"{len(events)} events across {n_tickers} of {len(tickers)} tickers")
+
+
+def cmd_evaluate(args):
+    from run_double_top_pipeline import run_universe
+
+    dt_events, _, ind_summary, comp_summary = run_universe(_tickers(args), workers=args.workers)
+    ind_summary.to_csv(args.ind_out, index=True)
+    comp_summary.to_csv(args.comp_out, index=True)
+    print(f"{len(dt_events)} double tops; summaries written to {args.ind_out} and {args.comp_out}")
+    if args.events_out:
+        _write_events(dt_events, args.events_out)
+
+
+def cmd_train(args):
+    from engineer_features import FEATURES
+    from feature_store import TECHNICAL_FEATURES
+    from prediction_pipeline import prediction_pipeline, save_training_outputs
+
+    labeled_data, best_model, results = prediction_pipeline(_tickers(args), search=args.search,
+                                                            technical_features=args.technical_features)
+    print(results)
+    features = FEATURES + TECHNICAL_FEATURES if args.technical_features else FEATURES
+    save_training_outputs(labeled_data, best_model, features, prefix=args.prefix)
+
+
+def cmd_score(args):
+    from batch_scorer import BatchScorer, serve
+
+    scorer = BatchScorer(args.model, args.features, threshold=args.threshold)
+    if args.serve:
+        serve(scorer, args.host, args.port)
+        return
+    if not args.events:
+        sys.exit("score: give an events file, or --serve")
+    scored = scorer.score_frame(_read_events(args.events))
+    if args.out:
+        scored.to_csv(args.out, index=False)
+        print(f"scored {len(scored)} candidates into {args.out} ({int(scored['predicted_label'].sum())} predicted)")
+    else:
+        print(scored[['prob', 'predicted_label']].describe())
+    print(scorer.stats(), file=sys.stderr)
+
+
+def cmd_plot(args):
+    from chart_gallery import render_gallery
+
+    events = _read_events(args.events)
+    if args.tickers:
+        symbol = 'symbol' if 'symbol' in events else 'Ticker'
+        events = events[events[symbol].isin(args.tickers)]
+    if args.limit:
+        events = events.head(args.limit)
+    start = time.perf_counter()
+    paths = render_gallery(events, out_dir=args.out_dir, pad=args.pad, workers=args.workers,
+                           overview=args.overview)
+    print(f"rendered {len(paths)} charts into {args.out_dir} in {time.perf_counter() - start:.1f} s")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='chartpatterns', description=__doc__.split('\n')[1])
+    parser.add_argument('--profile-startup', action='store_true',
+                        help="print the import cost of the command (to stderr) when it finishes")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    def add(name, func, help):
+        p = commands.add_parser(name, help=help)
+        p.set_defaults(func=func)
+        return p
+
+    def universe(p, workers=True):
+        p.add_argument('tickers', nargs='*', help="tickers to process (default: every ticker)")
+        if workers:
+            p.add_argument('--workers', type=int, default=None,
+                           help="worker processes (default: every core; 1 runs serially)")
+
+    p = add('ingest', cmd_ingest, "build the price panel from the raw CSVs")
+    p.add_argument('--src', help="directory of raw CSVs (default: sp500/sp500)")
+    p.add_argument('--panel', help="output panel directory (default: sp500/panel)")
+
+    p = add('detect', cmd_detect, "detect confirmed double tops, or every chart pattern with --patterns")
+    universe(p)
+    p.add_argument('--patterns', action='append', metavar='NAMES',
+                   help="use the multi-pattern engine; comma-separated names from detect_patterns.MATCHERS, "
+                        "or 'all' (repeatable)")
+    p.add_argument('-o', '--out', help="write the events to .csv, .json (patterns) or an .events store")
+
+    p = add('evaluate', cmd_evaluate, "double top returns against random and MA crossover baselines")
+    universe(p)
+    p.add_argument('--ind-out', default='ind_returns_all_horizons.csv')
+    p.add_argument('--comp-out', default='comp_returns_all_horizons.csv')
+    p.add_argument('--events-out', help="also write the double top events with forward returns")
+
+    p = add('train', cmd_train, "train the double top classifier and save it")
+    universe(p, workers=False)
+    p.add_argument('--search', choices=('random', 'halving'), default='random')
+    p.add_argument('--technical-features', action='store_true', help="also train on feature_store indicators")
+    p.add_argument('--prefix', default='', help="prefix for the saved model, feature names and labeled set")
+
+    p = add('score', cmd_score, "score candidates with the trained model")
+    p.add_argument('events', nargs='?', help="candidates as a CSV or .events store")
+    p.add_argument('-o', '--out', help="write the candidates with 'prob' and 'predicted_label'")
+    p.add_argument('--model', default='best_xgb_model.json')
+    p.add_argument('--features', default='feature_names.pkl')
+    p.add_argument('--threshold', type=float, default=0.5)
+    p.add_argument('--serve', action='store_true', help="serve POST /score and GET /stats instead")
+    p.add_argument('--host', default='127.0.0.1')
+    p.add_argument('--port', type=int, default=8765)
+
+    p = add('plot', cmd_plot, "render a chart gallery for an event table")
+    p.add_argument('events', help="events as a CSV or .events store (from detect, evaluate or the labeled set)")
+    p.add_argument('--tickers', nargs='*', help="only these tickers")
+    p.add_argument('--limit', type=int, help="only the first N events")
+    p.add_argument('--out-dir', default='outputs')
+    p.add_argument('--pad', type=int, default=20, help="bars of context around each pattern")
+    p.add_argument('--overview', action='store_true', help="also a downsampled full-history chart per ticker")
+    p.add_argument('--workers', type=int, default=None)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if not args.profile_startup:
+        return args.func(args)
+    with ImportProfiler() as profiler:
+        try:
+            return args.func(args)
+        finally:
+            profiler.report()
+
+
+if __name__ == "__main__":
+    main()
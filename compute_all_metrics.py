@@ -2,32 +2,146 @@
 # Used in conjunction with permutation test to ensure statistical signficance of model findings
 
 import numpy as np
-
-from sklearn.metrics import (
-    accuracy_score,
-    precision_score,
-    recall_score,
-    f1_score,
-    roc_auc_score,
-    average_precision_score,
-    brier_score_loss,
-)
+import pandas as pd
+from scipy.stats import rankdata
 
 def compute_all_metrics(y_true, y_prob, threshold=0.5):
     """
     Compute a suite of classification metrics from true labels and predicted probs.
     Assumes binary classification with positive class = 1.
     """
-    y_pred = (y_prob >= threshold).astype(int)
+    batch = compute_all_metrics_batch(y_true, np.asarray(y_prob, dtype=float)[:, None], threshold=threshold)
+    return {name: float(values[0]) for name, values in batch.items()}
+
+
+def compute_all_metrics_batch(y_true, prob_matrix, threshold=0.5):
+    """
+    Classification metrics for many prediction runs at once, e.g. every permutation of a permutation test.
+
+    Matches the sklearn metrics (zero_division=0) the permutation test used before: ROC-AUC from average ranks,
+    PR-AUC as sklearn's step-wise average precision, Brier score and the thresholded accuracy, precision,
+    recall and F1, all computed column-wise with array operations.
+
+    Parameters
+    ----------
+    y_true : array-like of shape (n_samples,)
+        Binary labels shared by every run.
+    prob_matrix : np.ndarray of shape (n_samples, n_runs)
+        Predicted positive-class probabilities, one column per run.
+    threshold : float
+        Probability threshold for classification (default is 0.5).
+
+    Returns
+    -------
+    dict[str, np.ndarray]
+        One array of length n_runs per metric.
+
+    Raises
+    ------
+    ValueError
+        If y_true holds only one class, where ROC-AUC and PR-AUC are undefined.
+    """
+    y = np.asarray(y_true).astype(bool)
+    probs = np.asarray(prob_matrix, dtype=float)
+    n = len(y)
+    n_pos = y.sum()
+    n_neg = n - n_pos
+    if n_pos == 0 or n_neg == 0:
+        raise ValueError("Only one class present in y_true. ROC AUC score is not defined in that case.")
+
+    # thresholded metrics from the confusion counts
+    pred = probs >= threshold
+    tp = (pred & y[:, None]).sum(axis=0)
+    fp = pred.sum(axis=0) - tp
+    fn = n_pos - tp
+    tn = n_neg - fp
+    with np.errstate(divide='ignore', invalid='ignore'):
+        precision = np.where(tp + fp > 0, tp / (tp + fp), 0.0)
+        recall = np.where(n_pos > 0, tp / n_pos, 0.0)
+        f1 = np.where(2 * tp + fp + fn > 0, 2 * tp / (2 * tp + fp + fn), 0.0)
+
+    # ROC-AUC: Mann-Whitney U of the positives' average ranks
+    ranks = rankdata(probs, axis=0)
+    roc_auc = (ranks[y].sum(axis=0) - n_pos * (n_pos + 1) / 2) / (n_pos * n_neg)
 
-    metrics = {
-        "accuracy": accuracy_score(y_true, y_pred),
-        "precision": precision_score(y_true, y_pred, zero_division=0),
-        "recall": recall_score(y_true, y_pred, zero_division=0),
-        "f1": f1_score(y_true, y_pred, zero_division=0),
-        "roc_auc": roc_auc_score(y_true, y_prob),
-        "pr_auc": average_precision_score(y_true, y_prob),
-        "brier": brier_score_loss(y_true, y_prob),
+    return {
+        "accuracy": (tp + tn) / n,
+        "precision": precision,
+        "recall": recall,
+        "f1": f1,
+        "roc_auc": roc_auc,
+        "pr_auc": _average_precision(y, probs),
+        "brier": ((probs - y[:, None]) ** 2).mean(axis=0),
     }
 
-    return metrics
\ No newline at end of file
+
+def _sorted_counts(y, probs):
+    """
+    Sort each column by descending probability and return cumulative tp/fp plus last-of-tie-group flags.
+    """
+    order = np.argsort(-probs, axis=0, kind='stable')
+    scores = np.take_along_axis(probs, order, axis=0)
+    hits = y[order]
+    tp = np.cumsum(hits, axis=0)
+    fp = np.arange(1, len(y) + 1)[:, None] - tp
+    boundary = np.ones(scores.shape, dtype=bool)
+    boundary[:-1] = scores[:-1] != scores[1:]
+    return scores, tp, fp, boundary
+
+
+def _average_precision(y, probs):
+    """
+    sklearn `average_precision_score` per column: sum over distinct thresholds of (recall step) x precision.
+    """
+    _, tp, fp, boundary = _sorted_counts(y, probs)
+    n_pos = y.sum()
+
+    # tp at the previous distinct threshold; tp is non-decreasing so a running max carries it forward
+    tp_at_boundary = np.maximum.accumulate(np.where(boundary, tp, 0), axis=0)
+    prev = np.zeros_like(tp_at_boundary)
+    prev[1:] = tp_at_boundary[:-1]
+    step = np.where(boundary, tp - prev, 0)
+    precision = tp / (tp + fp)
+    return (step * precision).sum(axis=0) / n_pos
+
+
+def threshold_curves(y_true, y_prob):
+    """
+    Thresholded metrics at every distinct operating threshold from a single sort.
+
+    Predictions are positive when prob >= threshold, as in `compute_all_metrics`.
+
+    Parameters
+    ----------
+    y_true : array-like of shape (n_samples,)
+        Binary labels.
+    y_prob : array-like of shape (n_samples,)
+        Predicted positive-class probabilities.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per distinct threshold (descending) with 'threshold', 'tp', 'fp', 'fn', 'tn',
+        'accuracy', 'precision', 'recall' and 'f1'.
+    """
+    y = np.asarray(y_true).astype(bool)
+    scores, tp, fp, boundary = _sorted_counts(y, np.asarray(y_prob, dtype=float)[:, None])
+    keep = boundary[:, 0]
+    tp, fp, thresholds = tp[keep, 0], fp[keep, 0], scores[keep, 0]
+
+    n_pos = y.sum()
+    fn = n_pos - tp
+    tn = (len(y) - n_pos) - fp
+    with np.errstate(divide='ignore', invalid='ignore'):
+        curves = pd.DataFrame({
+            'threshold': thresholds,
+            'tp': tp,
+            'fp': fp,
+            'fn': fn,
+            'tn': tn,
+            'accuracy': (tp + tn) / len(y),
+            'precision': np.where(tp + fp > 0, tp / (tp + fp), 0.0),
+            'recall': np.where(n_pos > 0, tp / n_pos, 0.0),
+            'f1': np.where(2 * tp + fp + fn > 0, 2 * tp / (2 * tp + fp + fn), 0.0),
+        })
+    return curves
@@ -4,6 +4,7 @@ def compute_forward_returns(df, events_df, predicted = False, horizons=(5, 20, 6
     """
     For each event (by confirm_date), compute forward returns at the given horizons.
     Returns are simple percentage returns: (Close[t+H] / Close[confirm]) - 1.
+    Horizons that run past the end of df (or anchors missing from df) give NaN.
 
     Parameters
     ----------
@@ -17,28 +18,29 @@ def compute_forward_returns(df, events_df, predicted = False, horizons=(5, 20, 6
         Forward-return horizons in trading days.
     """
     events_df = events_df.copy()
-    
-    # compute forward returns for each specified horizon
-    for h in horizons:
-        col = f'ret_{h}d'
-        vals = []
-        for _, row in events_df.iterrows():
-            
-            # index at double top confirmation date
-            if predicted:
-                t0 = row['peak2_pos'] + 1 # returns must be calculated from the first day after closing at a second peak
-            else:
-                t0 = row['confirm_date']
+    horizons = np.asarray(horizons, dtype=np.int64)
+    cols = [f'ret_{h}d' for h in horizons]
 
-            # index at the given horizon if t0 + h is within df index range; edge case to avoid erroring out
-            t_fwd = df.index[df.index.get_loc(t0) + h] if (df.index.get_loc(t0) + h) < len(df.index) else None
-            if t_fwd is None:
-                vals.append(np.nan)
-                continue
-            
-            # Calculating forward return from confirmation date to horizon date
-            price0 = df.loc[t0, 'Close']
-            price1 = df.loc[t_fwd, 'Close']
-            vals.append(price1 / price0 - 1.0)
-        events_df[col] = vals
+    if events_df.empty:
+        for col in cols:
+            events_df[col] = np.array([], dtype=float)
+        return events_df
+
+    # integer position of every event anchor, resolved once
+    if predicted:
+        anchors = events_df['peak2_pos'] + 1 # returns must be calculated from the first day after closing at a second peak
+    else:
+        anchors = events_df['confirm_date']
+    pos0 = df.index.get_indexer(anchors)
+
+    # (events x horizons) gather of Close; anchors or horizons past the end of df become NaN
+    close = df['Close'].to_numpy()
+    pos_fwd = pos0[:, None] + horizons[None, :]
+    valid = (pos0[:, None] >= 0) & (pos_fwd < len(close))
+    price0 = close[pos0][:, None]
+    price1 = close[np.where(valid, pos_fwd, 0)]
+    rets = np.where(valid, price1 / price0 - 1.0, np.nan)
+
+    for k, col in enumerate(cols):
+        events_df[col] = rets[:, k]
     return events_df
@@ -1,4 +1,6 @@
+import numpy as np
 import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
 
 def confirm_double_tops(df, events_df, max_confirm_days=20):
     """
@@ -13,36 +15,54 @@ def confirm_double_tops(df, events_df, max_confirm_days=20):
     max_confirm_days : int, optional
         Maximum number of days after the second peak to look for confirmation (default is 20).
     """
-    confirmed = []
-
-    for _, row in events_df.iterrows():
-        
-        # extracting relevant candidate event details
-        t2 = row['peak2_date']
-        neck_price = row['trough_price']
-
-        # defining window to search for confirmation
-        start = t2 + 1
-        end = t2 + max_confirm_days
-
-        # creating subset of data within the confirmation window
-        post = df.loc[(df.index >= start) & (df.index <= end)]
-
-        # checking for close below neckline; if found, record confirmation price and date
-        below = post[post['Close'] < neck_price]
-        if below.empty:
-            continue
-
-        confirm_date = below.index[0]
-        confirm_price = below.loc[confirm_date, 'Close']
-
-        # add confirmed event to return df with additional confirmation details
-        r = row.to_dict()
-        r.update({
-            'confirm_date': confirm_date,
-            'confirm_price': confirm_price
-        })
-        confirmed.append(r)
-
-    confirmed_df = pd.DataFrame(confirmed)
+    if events_df.empty:
+        return pd.DataFrame()
+
+    t2 = events_df['peak2_date'].to_numpy()
+    neck_price = events_df['trough_price'].to_numpy()
+    pos = first_close_below(df, t2, neck_price, max_confirm_days)
+    found = pos >= 0
+    if not found.any():
+        return pd.DataFrame()
+
+    confirm_pos = pos[found]
+    close = df['Close'].to_numpy()
+
+    # add confirmed event to return df with additional confirmation details
+    confirmed_df = events_df[found].reset_index(drop=True)
+    confirmed_df['confirm_date'] = df.index[confirm_pos]
+    confirmed_df['confirm_price'] = close[confirm_pos]
     return confirmed_df
+
+
+def first_close_below(df, t2, neck_price, max_confirm_days):
+    """
+    Position of the first close below each neckline within max_confirm_days after peak 2, or -1 if none.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        DataFrame containing stock price data for a single ticker.
+    t2 : np.ndarray
+        Index labels of the second peaks.
+    neck_price : np.ndarray
+        Neckline (trough) price of each candidate.
+    max_confirm_days : int
+        Maximum number of days after the second peak to look for confirmation.
+    """
+    if len(t2) == 0 or max_confirm_days < 1:
+        return np.full(len(t2), -1, dtype=np.int64)
+
+    # defining window to search for confirmation: index labels in [t2 + 1, t2 + max_confirm_days]
+    start = np.searchsorted(df.index, t2 + 1, side='left')
+    end = np.searchsorted(df.index, t2 + max_confirm_days, side='right')
+
+    # (candidates x max_confirm_days) view of closes after each second peak; padding never confirms
+    close = df['Close'].to_numpy()
+    padded = np.concatenate([close, np.full(max_confirm_days, np.nan)])
+    windows = sliding_window_view(padded, max_confirm_days)[start]
+    in_window = np.arange(max_confirm_days) < (end - start)[:, None]
+
+    # checking for first close below neckline
+    below = (windows < neck_price[:, None]) & in_window
+    return np.where(below.any(axis=1), start + below.argmax(axis=1), -1)
@@ -1,6 +1,7 @@
 import numpy as np
 import pandas as pd
 from find_local_extrema import find_local_extrema
+from range_argmin import build_sparse_table, range_argmin
 
 def detect_double_tops(
     df,
@@ -35,68 +36,118 @@ def detect_double_tops(
     """
 
     local_high, local_low = find_local_extrema(df, window=peak_window)
-    
-    peaks = df[local_high].copy()
-    troughs = df[local_low].copy()
-
-    peaks_idx = peaks.index
-    events = []
-
-    for i in range(len(peaks_idx)):
-        t1 = peaks_idx[i]
-        p1 = peaks.loc[t1]
-
-        # look for second peak within [min_peak_gap, max_peak_gap] days
-        min_date = t1 + min_peak_gap
-        max_date = t1 + max_peak_gap
-
-        candidate_peaks2 = peaks[(peaks.index >= min_date) & (peaks.index <= max_date)]
-        
-        # edge case for no candidate second peaks, like for the last peak in the data
-        if candidate_peaks2.empty:
-            continue
-
-        for t2, p2 in candidate_peaks2.iterrows():
-            price1 = p1['High']
-            price2 = p2['High']
-
-            # peaks similar in height
-            if abs(price2 - price1) / price1 > peak_tolerance:
-                continue
-
-            # trough between them
-            mid_troughs = troughs[(troughs.index > t1) & (troughs.index < t2)]
-            if mid_troughs.empty:
-                continue
-            
-            trough_date = mid_troughs['Low'].idxmin()
-            trough_price = mid_troughs.loc[trough_date, 'Low']
-
-            # trough must be meaningfully below peaks
-            avg_peak = (price1 + price2) / 2
-            if (avg_peak - trough_price) / avg_peak < min_trough_drop:
-                continue
-
-            # second peak trading volume must be lower than first
-            vol1 = p1['Volume']
-            vol2 = p2['Volume']
-            if require_lower_second_vol and not (vol2 < vol1):
-                continue
-
-            # add to return df
-            # all dates saved as index rather than actual date; relevant in later functions
-            events.append({
-                'peak1_date': t1,
-                'peak2_date': t2,
-                'trough_date': trough_date,
-                'peak1_price': price1,
-                'peak2_price': price2,
-                'trough_price': trough_price,
-                'peak_gap_days': (t2 - t1),
-                'vol1': vol1,
-                'vol2': vol2,
-                'vol2_vol1_ratio': vol2 / vol1 if vol1 > 0 else np.nan
-            })
-
-    events_df = pd.DataFrame(events)
+
+    pairs = enumerate_peak_pairs(df, local_high.to_numpy(), local_low.to_numpy(),
+                                 min_peak_gap, max_peak_gap, peak_tolerance)
+
+    # trough must be meaningfully below peaks
+    keep = ~(pairs['trough_drop'] < min_trough_drop)
+
+    # second peak trading volume must be lower than first
+    if require_lower_second_vol:
+        keep &= pairs['vol2'] < pairs['vol1']
+
+    if not keep.any():
+        return pd.DataFrame()
+
+    t1, t2 = pairs['t1'][keep], pairs['t2'][keep]
+    vol1, vol2 = pairs['vol1'][keep], pairs['vol2'][keep]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        vol_ratio = np.where(vol1 > 0, vol2 / vol1, np.nan)
+
+    events_df = pd.DataFrame({
+        'peak1_date': t1,
+        'peak2_date': t2,
+        'trough_date': pairs['trough_t'][keep],
+        'peak1_price': pairs['price1'][keep],
+        'peak2_price': pairs['price2'][keep],
+        'trough_price': pairs['trough_price'][keep],
+        'peak_gap_days': (t2 - t1),
+        'vol1': vol1,
+        'vol2': vol2,
+        'vol2_vol1_ratio': vol_ratio
+    })
     return events_df
+
+
+def enumerate_peak_pairs(df, local_high, local_low, min_peak_gap, max_peak_gap, peak_tolerance):
+    """
+    All (peak 1, peak 2) pairs within the gap and height tolerance that have a trough between them.
+
+    This is the parameter-independent core of `detect_double_tops`; the trough drop and volume rules
+    are cheap filters on its output, so parameter sweeps can enumerate the widest pair set once.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        DataFrame containing stock price data for a single ticker.
+    local_high, local_low : np.ndarray
+        Boolean extrema masks aligned with df, e.g. from `find_local_extrema`.
+    min_peak_gap, max_peak_gap : int
+        Allowed number of days between the two peaks.
+    peak_tolerance : float
+        Maximum allowed relative difference between the two peaks.
+
+    Returns
+    -------
+    dict[str, np.ndarray]
+        Parallel arrays 't1', 't2', 'trough_t' (index labels), 'price1', 'price2', 'trough_price',
+        'vol1', 'vol2', 'peak_diff' (relative peak difference) and 'trough_drop', in (peak 1, peak 2) order.
+    """
+    # all dates saved as index rather than actual date; relevant in later functions
+    t = df.index.to_numpy()
+    highs = df['High'].to_numpy()
+    lows = df['Low'].to_numpy()
+    volume = df['Volume'].to_numpy()
+
+    peak_pos = np.flatnonzero(local_high)
+    trough_pos = np.flatnonzero(local_low)
+    peak_t = t[peak_pos]
+    trough_t = t[trough_pos]
+
+    # every second peak within [min_peak_gap, max_peak_gap] days of each first peak
+    lo = np.searchsorted(peak_t, peak_t + min_peak_gap, side='left')
+    hi = np.searchsorted(peak_t, peak_t + max_peak_gap, side='right')
+    i, j = _expand_ranges(lo, hi)
+
+    # peaks similar in height
+    price1 = highs[peak_pos[i]]
+    price2 = highs[peak_pos[j]]
+    peak_diff = np.abs(price2 - price1) / price1
+    keep = peak_diff <= peak_tolerance
+    i, j, price1, price2, peak_diff = i[keep], j[keep], price1[keep], price2[keep], peak_diff[keep]
+
+    # trough between them: troughs strictly inside (t1, t2), lowest low wins (first on ties)
+    t_lo = np.searchsorted(trough_t, peak_t[i], side='right')
+    t_hi = np.searchsorted(trough_t, peak_t[j], side='left')
+    keep = t_hi > t_lo
+    i, j, price1, price2, peak_diff = i[keep], j[keep], price1[keep], price2[keep], peak_diff[keep]
+
+    trough_lows = lows[trough_pos]
+    k = range_argmin(trough_lows, build_sparse_table(trough_lows), t_lo[keep], t_hi[keep])
+    trough_price = trough_lows[k]
+    avg_peak = (price1 + price2) / 2
+
+    return {
+        't1': peak_t[i],
+        't2': peak_t[j],
+        'trough_t': trough_t[k],
+        'price1': price1,
+        'price2': price2,
+        'trough_price': trough_price,
+        'vol1': volume[peak_pos[i]],
+        'vol2': volume[peak_pos[j]],
+        'peak_diff': peak_diff,
+        'trough_drop': (avg_peak - trough_price) / avg_peak,
+    }
+
+
+def _expand_ranges(lo, hi):
+    """
+    Flatten per-row half-open ranges [lo, hi) into parallel (row, value) arrays, in row order.
+    """
+    counts = np.maximum(hi - lo, 0)
+    rows = np.repeat(np.arange(len(lo)), counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return rows, lo[rows] + offsets
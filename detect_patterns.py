@@ -0,0 +1,499 @@
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from find_local_extrema import find_local_extrema
+from price_panel import load_price_data, list_tickers
+
+# JSON layout of each event type, in key order (see outputs/aapl_patterns_3yr.json). A key with '_index',
+# '_date' and '_price' columns is a point, one with '_slope' and '_intercept' columns a trendline.
+_COMMON = ['type', 'valid', 'confidence', 'start_date', 'end_date', 'duration_days']
+_POLE = ['type', 'valid', 'confidence', 'pole_start_date', 'pole_end_date', 'pattern_start_date', 'pattern_end_date',
+         'pole_duration_days', 'pattern_duration_days', 'pole_change_pct', 'pole_start_price', 'pole_end_price',
+         'upper_trendline', 'lower_trendline', 'validation_reasons']
+_TRIANGLE = _COMMON + ['upper_trendline', 'lower_trendline', 'peak_indices', 'trough_indices', 'validation_reasons']
+LAYOUTS = {
+    'Head & Shoulders': _COMMON + ['left_shoulder', 'head', 'right_shoulder', 'left_trough', 'right_trough',
+                                   'neckline_level', 'validation_reasons'],
+    'Double Top': _COMMON + ['first_peak', 'second_peak', 'middle_trough', 'support_level', 'validation_reasons'],
+    'Double Bottom': _COMMON + ['first_trough', 'second_trough', 'middle_peak', 'resistance_level', 'validation_reasons'],
+    'Symmetric Triangle': _TRIANGLE,
+    'Ascending Triangle': _TRIANGLE,
+    'Descending Triangle': _TRIANGLE,
+    'Bull Pennant': _POLE,
+    'Bear Pennant': _POLE,
+    'Bull Flag': _POLE,
+    'Bear Flag': _POLE,
+}
+
+def detect_patterns(df, patterns=None, peak_window=10, params=None, symbol=None):
+    """
+    Detect every chart pattern type in one scan of a ticker.
+
+    `find_local_extrema` runs once and its peaks and troughs are reduced to one alternating sequence (runs of
+    consecutive peaks or troughs keep their most extreme member). Each pattern matcher is an array function
+    over that shared sequence and the price arrays, so adding a pattern adds a few vectorized comparisons
+    rather than another pass over the prices.
+
+    Every candidate formation is reported, valid or not, with the rules it failed ('validation_reasons').
+    The engine's 'Double Top' is this chart-pattern definition over consecutive extrema; the return studies
+    keep using `detect_double_tops`.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Price data for a single ticker with 'Date', 'High', 'Low', 'Close' and 'Volume' columns.
+    patterns : list of str or None
+        Keys of MATCHERS to run (default is all of them).
+    peak_window : int
+        Window for `find_local_extrema`, in days (default is 10).
+    params : dict or None
+        Per-matcher keyword overrides, e.g. {'double_top': {'tolerance': 0.02}}.
+    symbol : str or None
+        If given, added as a leading 'symbol' column.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per event: 'type', 'valid', 'confidence', 'start_pos', 'end_pos' (positions in df) and the
+        columns of each pattern's layout, with nested JSON objects flattened ('head_price', 'upper_trendline_slope', ...).
+        Columns of other pattern types are NA. See `patterns_to_records` for the JSON shape.
+    """
+    events = _typed(pd.DataFrame(_scan(df, patterns, peak_window, params)))
+    if symbol is not None:
+        events.insert(0, 'symbol', symbol)
+    return events
+
+
+def _scan(df, patterns=None, peak_window=10, params=None):
+    """
+    Columns of every matcher's events for one ticker, merged as arrays (the DataFrame is built by the caller).
+    """
+    patterns = list(MATCHERS) if patterns is None else list(patterns)
+    params = params or {}
+
+    bars = {
+        'high': df['High'].to_numpy(dtype=float),
+        'low': df['Low'].to_numpy(dtype=float),
+        'close': df['Close'].to_numpy(dtype=float),
+        'volume': df['Volume'].to_numpy(dtype=float),
+        'date': np.datetime_as_string(pd.to_datetime(df['Date']).to_numpy()),
+    }
+    local_high, local_low = find_local_extrema(df, window=peak_window)
+    seq = extrema_sequence(local_high.to_numpy(), local_low.to_numpy(), bars['high'], bars['low'])
+    return _combine([MATCHERS[name](seq, bars, **params.get(name, {})) for name in patterns])
+
+
+def _combine(parts):
+    """
+    Concatenate dicts of event columns; a column missing from a part is NaN (numbers) or None (everything else).
+    """
+    parts = [p for p in parts if len(p['type'])]
+    if not parts:
+        return {'type': np.zeros(0, dtype=object), 'valid': np.zeros(0, dtype=bool), 'confidence': np.zeros(0)}
+
+    out = {}
+    for key in dict.fromkeys(k for p in parts for k in p):
+        present = [p[key] for p in parts if key in p]
+        numeric = all(a.dtype.kind in 'iufb' for a in present)
+        out[key] = np.concatenate([
+            p[key] if key in p else np.full(len(p['type']), np.nan if numeric else None, dtype=float if numeric else object)
+            for p in parts])
+    return out
+
+
+def extrema_sequence(local_high, local_low, highs, lows):
+    """
+    Alternating peak/trough sequence from extrema masks.
+
+    A bar flagged as both comes as a peak then a trough; each run of consecutive peaks (troughs) keeps its
+    highest high (lowest low), the first one on ties.
+
+    Returns
+    -------
+    dict[str, np.ndarray]
+        'pos' (bar positions), 'price' (High at peaks, Low at troughs) and 'is_peak', in time order.
+    """
+    peak_pos, trough_pos = np.flatnonzero(local_high), np.flatnonzero(local_low)
+    pos = np.concatenate([peak_pos, trough_pos])
+    is_peak = np.concatenate([np.ones(len(peak_pos), bool), np.zeros(len(trough_pos), bool)])
+    order = np.lexsort((~is_peak, pos))
+    pos, is_peak = pos[order], is_peak[order]
+    price = np.where(is_peak, highs[pos], lows[pos])
+    if len(pos) == 0:
+        return {'pos': pos, 'price': price, 'is_peak': is_peak}
+
+    run = np.cumsum(np.r_[True, is_peak[1:] != is_peak[:-1]])
+    order = np.lexsort((pos, np.where(is_peak, -price, price), run))
+    pick = np.sort(order[np.r_[True, run[order][1:] != run[order][:-1]]])
+    return {'pos': pos[pick], 'price': price[pick], 'is_peak': is_peak[pick]}
+
+
+def match_double_tops(seq, bars, tolerance=0.03, min_duration=30, min_drop=0.03):
+    """
+    Double Top: peak, trough, peak. Peaks within `tolerance` of each other, at least `min_duration` days apart,
+    with the trough at least `min_drop` below them; the trough is the support level.
+    """
+    return _double_pattern(seq, bars, np.flatnonzero(seq['is_peak'][:-2]), 'Double Top',
+                           ('first_peak', 'second_peak', 'middle_trough', 'support_level'), 'Peaks', 'Trough',
+                           tolerance, min_duration, min_drop)
+
+
+def match_double_bottoms(seq, bars, tolerance=0.03, min_duration=30, min_drop=0.03):
+    """
+    Double Bottom: trough, peak, trough, mirroring `match_double_tops`; the peak is the resistance level.
+    """
+    return _double_pattern(seq, bars, np.flatnonzero(~seq['is_peak'][:-2]), 'Double Bottom',
+                           ('first_trough', 'second_trough', 'middle_peak', 'resistance_level'), 'Troughs', 'Peak',
+                           tolerance, min_duration, min_drop)
+
+
+def _double_pattern(seq, bars, i, label, names, sides, middle, tolerance, min_duration, min_drop):
+    pos, price = seq['pos'], seq['price']
+    first, second, mid = i, i + 2, i + 1
+    diff = np.abs(price[second] - price[first]) / price[first]
+    avg = (price[first] + price[second]) / 2
+    depth = np.abs(avg - price[mid]) / avg
+    duration = pos[second] - pos[first]
+
+    out = _frame(label, bars, pos[first], pos[second])
+    for name, k in zip(names, (first, second, mid)):
+        _point(out, name, bars, pos[k], price[k])
+    out[names[3]] = price[mid]
+    _validate(out, [
+        (diff > tolerance, lambda k: f"{sides} not similar: {diff[k]:.1%} difference"),
+        (depth < min_drop, lambda k: f"{middle} not pronounced: {depth[k]:.1%} from the {sides.lower()}"),
+        (duration < min_duration, lambda k: f"Pattern too short: {duration[k]} days"),
+    ], valid_confidence=1.0, invalid_confidence=0.5)
+    return out
+
+
+def match_head_and_shoulders(seq, bars, shoulder_tolerance=0.05, min_head_excess=0.03, neckline_tolerance=0.05,
+                             min_duration=60):
+    """
+    Head & Shoulders: peak, trough, peak, trough, peak with the middle peak (head) at least `min_head_excess`
+    above both shoulders, shoulders within `shoulder_tolerance`, troughs within `neckline_tolerance` of each
+    other (a flat neckline, at their mean) and at least `min_duration` days from shoulder to shoulder.
+    """
+    pos, price = seq['pos'], seq['price']
+    ls = np.flatnonzero(seq['is_peak'][:-4])
+    lt, head, rt, rs = ls + 1, ls + 2, ls + 3, ls + 4
+    shoulders = np.maximum(price[ls], price[rs])
+    shoulder_diff = np.abs(price[rs] - price[ls]) / price[ls]
+    neck_slope = np.abs(price[rt] - price[lt]) / price[lt]
+    duration = pos[rs] - pos[ls]
+
+    out = _frame('Head & Shoulders', bars, pos[ls], pos[rs])
+    for name, k in (('left_shoulder', ls), ('head', head), ('right_shoulder', rs), ('left_trough', lt),
+                    ('right_trough', rt)):
+        _point(out, name, bars, pos[k], price[k])
+    out['neckline_level'] = (price[lt] + price[rt]) / 2
+    _validate(out, [
+        (price[head] <= shoulders, "Head not higher than shoulders"),
+        (shoulder_diff > shoulder_tolerance, lambda k: f"Shoulders not similar: {shoulder_diff[k]:.1%} difference"),
+        (price[head] < shoulders * (1 + min_head_excess), "Head not significantly higher than shoulders"),
+        (neck_slope > neckline_tolerance, lambda k: f"Neckline too steep: {neck_slope[k]:.1%}"),
+        (duration < min_duration, lambda k: f"Pattern too short: {duration[k]} days"),
+    ], valid_confidence=0.9, invalid_confidence=0.5)
+    return out
+
+
+def match_triangles(seq, bars, touches=2, flat_tolerance=0.02, min_r_squared=0.8, min_duration=15):
+    """
+    Symmetric, ascending and descending triangles over every run of 2 x `touches` consecutive extrema.
+
+    Trendlines are least-squares fits through the run's peaks and troughs. A line is flat when it moves less
+    than `flat_tolerance` (relative to price) across the pattern; falling highs over rising lows make a
+    symmetric triangle, a flat top over rising lows an ascending one and falling highs over a flat bottom a
+    descending one. Other shapes are not triangles and are not reported.
+    """
+    pos, price, is_peak = seq['pos'], seq['price'], seq['is_peak']
+    width = 2 * touches
+    if len(pos) < width:
+        return _frame('Symmetric Triangle', bars, pos[:0], pos[:0])
+
+    # columns of each window holding its peaks / troughs
+    win = sliding_window_view(np.arange(len(pos)), width)
+    offsets = np.arange(touches) * 2
+    peak_first = is_peak[win[:, 0]]
+    peak_idx = win[np.arange(len(win))[:, None], np.where(peak_first[:, None], offsets, offsets + 1)]
+    trough_idx = win[np.arange(len(win))[:, None], np.where(peak_first[:, None], offsets + 1, offsets)]
+
+    upper = _fit_lines(pos[peak_idx], price[peak_idx])
+    lower = _fit_lines(pos[trough_idx], price[trough_idx])
+    start, end = pos[win[:, 0]], pos[win[:, -1]]
+    duration = end - start
+    level = price[win].mean(axis=1)
+    upper_move = upper[0] * duration / level
+    lower_move = lower[0] * duration / level
+
+    falling_top, flat_top = upper_move < -flat_tolerance, np.abs(upper_move) <= flat_tolerance
+    rising_bottom, flat_bottom = lower_move > flat_tolerance, np.abs(lower_move) <= flat_tolerance
+    kind = np.select([falling_top & rising_bottom, flat_top & rising_bottom, falling_top & flat_bottom],
+                     ['Symmetric Triangle', 'Ascending Triangle', 'Descending Triangle'], '')
+    keep = kind != ''
+
+    out = _frame(kind[keep], bars, start[keep], end[keep])
+    for name, (slope, intercept, r2) in (('upper_trendline', upper), ('lower_trendline', lower)):
+        out[f'{name}_slope'] = slope[keep]
+        out[f'{name}_intercept'] = intercept[keep]
+        out[f'{name}_r_squared'] = r2[keep]
+        out[f'{name}_touch_points'] = np.full(keep.sum(), touches)
+    out['peak_indices'] = _objects(list(map(int, row)) for row in pos[peak_idx][keep])
+    out['trough_indices'] = _objects(list(map(int, row)) for row in pos[trough_idx][keep])
+
+    # the lines must still be apart at the last touch
+    gap = (upper[0] - lower[0])[keep] * end[keep] + (upper[1] - lower[1])[keep]
+    fit = np.minimum(upper[2], lower[2])[keep]
+    d = duration[keep]
+    _validate(out, [
+        (fit < min_r_squared, lambda k: f"Trendline fit too weak: r_squared {fit[k]:.2f}"),
+        (gap <= 0, "Trendlines cross before the last touch"),
+        (d < min_duration, lambda k: f"Pattern too short: {d[k]} days"),
+    ], valid_confidence=0.9, invalid_confidence=0.45)
+    return out
+
+
+def match_pennants_and_flags(seq, bars, pole_days=10, pattern_days=20, min_pole_change=0.08, parallel_tolerance=0.02,
+                             max_volume_ratio=0.8, max_retrace=0.5):
+    """
+    Bull/Bear Pennants and Flags: a pole of `pole_days` days into a peak (bull) or trough (bear) moving at least
+    `min_pole_change`, then `pattern_days` days of consolidation bounded by least-squares lines through the
+    highs and lows. Converging lines make a pennant, lines within `parallel_tolerance` of parallel a flag;
+    diverging consolidations are not reported.
+
+    A valid formation has volume below `max_volume_ratio` of the pole's, drifts against (or sideways to) the
+    pole and spans less than `max_retrace` of the pole's move.
+    """
+    pos, is_peak = seq['pos'], seq['is_peak']
+    close, high, low, volume = bars['close'], bars['high'], bars['low'], bars['volume']
+    n = len(close)
+
+    anchor = (pos >= pole_days) & (pos + pattern_days < n)
+    end, bull = pos[anchor], is_peak[anchor]
+    begin = end - pole_days
+    change = close[end] / close[begin] - 1
+    keep = np.where(bull, change >= min_pole_change, change <= -min_pole_change)
+    end, begin, bull, change = end[keep], begin[keep], bull[keep], change[keep]
+
+    # consolidation bars end .. end + pattern_days
+    bars_idx = end[:, None] + np.arange(pattern_days + 1)
+    upper = _fit_lines(bars_idx, high[bars_idx])
+    lower = _fit_lines(bars_idx, low[bars_idx])
+    level = close[end]
+    spread_change = (upper[0] - lower[0]) * pattern_days / level
+    mid_move = (upper[0] + lower[0]) / 2 * pattern_days / level
+
+    flag = np.abs(spread_change) <= parallel_tolerance
+    pennant = spread_change < -parallel_tolerance
+    kind = np.where(bull, np.where(flag, 'Bull Flag', 'Bull Pennant'), np.where(flag, 'Bear Flag', 'Bear Pennant'))
+    keep = flag | pennant
+    end, begin, bull, change, kind, bars_idx = end[keep], begin[keep], bull[keep], change[keep], kind[keep], bars_idx[keep]
+    mid_move = mid_move[keep]
+
+    pole_volume = volume[begin[:, None] + np.arange(pole_days)].mean(axis=1)
+    pattern_volume = volume[bars_idx].mean(axis=1)
+    pattern_range = high[bars_idx].max(axis=1) - low[bars_idx].min(axis=1)
+    pole_move = np.abs(close[end] - close[begin])
+
+    out = _frame(kind, bars, begin, end + pattern_days)
+    del out['start_date'], out['end_date'], out['duration_days']
+    out['pole_start_date'] = bars['date'][begin]
+    out['pole_end_date'] = bars['date'][end]
+    out['pattern_start_date'] = bars['date'][end]
+    out['pattern_end_date'] = bars['date'][end + pattern_days]
+    out['pole_duration_days'] = end - begin
+    out['pattern_duration_days'] = np.full(len(end), pattern_days)
+    out['pole_change_pct'] = change * 100
+    out['pole_start_price'] = close[begin]
+    out['pole_end_price'] = close[end]
+    for name, (slope, intercept, _) in (('upper_trendline', upper), ('lower_trendline', lower)):
+        out[f'{name}_slope'] = slope[keep]
+        out[f'{name}_intercept'] = intercept[keep]
+    _validate(out, [
+        (pattern_volume >= max_volume_ratio * pole_volume, "Volume not decreasing sufficiently"),
+        (pattern_range > max_retrace * pole_move, "Pattern volatility too high"),
+        (np.where(bull, mid_move > parallel_tolerance, mid_move < -parallel_tolerance), "Pattern not counter-trend"),
+    ], valid_confidence=0.85, invalid_confidence=0.4)
+    return out
+
+
+# pattern families, in output order; each maps (sequence, bars, **params) to a dict of event columns
+MATCHERS = {
+    'head_and_shoulders': match_head_and_shoulders,
+    'double_top': match_double_tops,
+    'double_bottom': match_double_bottoms,
+    'triangle': match_triangles,
+    'pennant_flag': match_pennants_and_flags,
+}
+
+
+def _frame(kind, bars, start, end):
+    """
+    Columns shared by every event type.
+    """
+    n = len(start)
+    return {
+        'type': np.broadcast_to(np.asarray(kind, dtype=object), (n,)).copy(),
+        'valid': np.ones(n, dtype=bool),
+        'confidence': np.zeros(n),
+        'start_pos': start,
+        'end_pos': end,
+        'start_date': bars['date'][start],
+        'end_date': bars['date'][end],
+        'duration_days': end - start,
+    }
+
+
+def _point(out, name, bars, pos, price):
+    out[f'{name}_index'] = pos
+    out[f'{name}_date'] = bars['date'][pos]
+    out[f'{name}_price'] = price
+
+
+def _validate(out, checks, valid_confidence, invalid_confidence):
+    """
+    Fill 'valid', 'confidence' and 'validation_reasons' from (failed mask, message) checks; a message is a string
+    or a function of the row.
+    """
+    n = len(out['type'])
+    reasons = [[] for _ in range(n)]
+    failed_any = np.zeros(n, dtype=bool)
+    for failed, message in checks:
+        failed_any |= failed
+        for k in np.flatnonzero(failed):
+            reasons[k].append(message(k) if callable(message) else message)
+    out['valid'] = ~failed_any
+    out['confidence'] = np.where(failed_any, invalid_confidence, valid_confidence)
+    out['validation_reasons'] = _objects(r or ['All criteria met'] for r in reasons)
+
+
+def _objects(values):
+    """
+    1D object array of (list) values.
+    """
+    return np.fromiter(values, dtype=object)
+
+
+def _fit_lines(x, y):
+    """
+    Row-wise least-squares lines y = slope * x + intercept, with r_squared (1.0 for a perfect or flat fit).
+    """
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    xm, ym = x.mean(axis=1, keepdims=True), y.mean(axis=1, keepdims=True)
+    sxx = ((x - xm) ** 2).sum(axis=1)
+    sxy = ((x - xm) * (y - ym)).sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = sxy / sxx
+        intercept = ym[:, 0] - slope * xm[:, 0]
+        ss_res = ((y - (slope[:, None] * x + intercept[:, None])) ** 2).sum(axis=1)
+        ss_tot = ((y - ym) ** 2).sum(axis=1)
+        r_squared = np.where(ss_tot > 0, 1 - ss_res / ss_tot, 1.0)
+    return slope, intercept, r_squared
+
+
+def _typed(events):
+    """
+    Compact dtypes for the combined table: categorical 'type', nullable integers for positions and counts.
+    """
+    events['type'] = pd.Categorical(events['type'], categories=list(LAYOUTS))
+    events['valid'] = events['valid'].astype(bool)
+    for col in events.columns:
+        if col.endswith(('_pos', '_index', '_days', '_touch_points')):
+            events[col] = events[col].astype('Int64')
+    return events
+
+
+def patterns_to_records(events):
+    """
+    Events as a list of nested dicts in the layout of outputs/aapl_patterns_3yr.json (plus 'symbol' when present).
+    """
+    records = []
+    for row in events.to_dict('records'):
+        record = {'symbol': row['symbol']} if 'symbol' in row else {}
+        for key in LAYOUTS[row['type']]:
+            if f'{key}_index' in row:
+                record[key] = {'date': row[f'{key}_date'], 'price': row[f'{key}_price'], 'index': row[f'{key}_index']}
+            elif f'{key}_slope' in row:
+                record[key] = {attr: row[f'{key}_{attr}'] for attr in ('slope', 'intercept', 'r_squared', 'touch_points')
+                               if f'{key}_{attr}' in row and not pd.isna(row[f'{key}_{attr}'])}
+            else:
+                record[key] = row[key]
+        records.append(record)
+    return json.loads(json.dumps(records, default=_json_default))
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def save_patterns(events, path):
+    """
+    Save events as nested JSON records ('.json') or as the flat table ('.csv', list columns joined by '; ').
+    """
+    if path.endswith('.json'):
+        with open(path, 'w') as f:
+            json.dump(patterns_to_records(events), f, indent=2)
+    else:
+        flat = events.copy()
+        for col in ('peak_indices', 'trough_indices', 'validation_reasons'):
+            if col in flat:
+                flat[col] = flat[col].map(lambda v: '; '.join(map(str, v)) if isinstance(v, list) else v)
+        flat.to_csv(path, index=False)
+
+
+def _scan_ticker(ticker, patterns, peak_window, params):
+    """
+    Worker for `detect_patterns_universe`: the ticker's event columns.
+    """
+    columns = _scan(load_price_data(ticker), patterns, peak_window, params)
+    return {'symbol': np.full(len(columns['type']), ticker, dtype=object), **columns}
+
+
+def detect_patterns_universe(tickers=None, workers=None, patterns=None, peak_window=10, params=None):
+    """
+    Every pattern type for many tickers in one pass on a process pool.
+
+    Workers return plain column arrays, merged and typed once at the end.
+
+    Parameters
+    ----------
+    tickers : list of str or None
+        Ticker symbols (default is `list_tickers()`).
+    workers : int or None
+        Number of worker processes; None uses every core, 1 runs serially in this process.
+    patterns, peak_window, params
+        As in `detect_patterns`.
+    """
+    tickers = list(tickers) if tickers is not None else list_tickers()
+    n = len(tickers)
+    args = ([patterns] * n, [peak_window] * n, [params] * n)
+    if workers == 1:
+        results = list(map(_scan_ticker, tickers, *args))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_scan_ticker, tickers, *args, chunksize=8))
+    return _typed(pd.DataFrame(_combine(results)))
+
+
+if __name__ == "__main__":
+    import time
+
+    # last three years of AAPL, as in outputs/aapl_patterns_3yr.json
+    aapl = load_price_data('AAPL').iloc[-753:].reset_index(drop=True)
+    events = detect_patterns(aapl)
+    print(events.groupby('type', observed=True)['valid'].agg(['size', 'sum']))
+
+    start = time.perf_counter()
+    detect_patterns_universe(workers=1, patterns=['double_top'])
+    t_one = time.perf_counter() - start
+    start = time.perf_counter()
+    universe = detect_patterns_universe(workers=1)
+    t_all = time.perf_counter() - start
+    print(f"{len(universe)} events of {universe['type'].nunique()} types over {universe['symbol'].nunique()} tickers; "
+          f"one pattern {t_one:.1f} s, all patterns {t_all:.1f} s")
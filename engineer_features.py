@@ -0,0 +1,44 @@
+import pandas as pd
+
+# model inputs, in training order (also saved to feature_names.pkl by prediction_pipeline)
+FEATURES = ['peak1_price', 'peak2_price', 'trough_price', 'peak_gap_days', 'vol1',
+            'vol2', 'vol2_vol1_ratio', 'peak_height_diff', 'peak_height_diff_pct',
+            'retracement_depth1', 'retracement_depth2', 'volume_diff',
+            'peak1_to_trough', 'trough_to_peak2']
+
+def engineer_features(events: pd.DataFrame) -> pd.DataFrame:
+    """
+    Add the engineered model features to double top candidates.
+
+    Parameters
+    ----------
+    events : pd.DataFrame or dict of np.ndarray
+        Candidates from detect_double_tops, with positions either in 'peak1_pos', 'trough_pos', 'peak2_pos'
+        (after pos_to_date) or still in 'peak1_date', 'trough_date', 'peak2_date' (straight from detection).
+        A dict of column arrays skips pandas overhead for small batches.
+
+    Returns
+    -------
+    pd.DataFrame or dict of np.ndarray
+        Copy of events with the columns of FEATURES that detection does not provide.
+    """
+    events = events.copy()
+    pos = {k: events[f'{k}_pos'] if f'{k}_pos' in events else events[f'{k}_date'] for k in ('peak1', 'trough', 'peak2')}
+
+    # Peak Height Difference (raw and pct)
+    events['peak_height_diff'] = events['peak2_price'] - events['peak1_price']
+    events['peak_height_diff_pct'] = events['peak_height_diff'] / events['peak1_price']
+
+    # Retracement Depth (relative to first and second peak)
+    events['retracement_depth1'] = (events['peak1_price'] - events['trough_price']) / events['peak1_price']
+    events['retracement_depth2'] = (events['peak2_price'] - events['trough_price']) / events['peak2_price']
+
+    # Raw Volume Difference
+    events['volume_diff'] = events['vol1'] - events['vol2']
+
+    # Time Intervals (days between peaks and troughs)
+    events['peak1_to_trough'] = (pos['trough'] - pos['peak1'])
+    events['trough_to_peak2'] = (pos['peak2'] - pos['trough'])
+
+    # Momentum Indicators: per-bar technical features are joined at peak 2 by feature_store.add_technical_features
+    return events
@@ -2,19 +2,11 @@ import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 
-from sklearn.metrics import (
-    accuracy_score,
-    precision_score,
-    recall_score,
-    f1_score,
-    roc_auc_score,
-    average_precision_score,
-    brier_score_loss,
-)
-
+from compute_all_metrics import compute_all_metrics, threshold_curves
+from training_matrices import fit_from_matrix
 from walk_forward_split import WalkForwardSplit
 
-def evaluate_classifier(model, X_train, y_train, X_test, y_test, threshold=0.5,):
+def evaluate_classifier(model, X_train, y_train, X_test, y_test, threshold=0.5, return_curves=False, matrices=None):
     """
     Run walk-forward cross-validation and compute classification metrics to evaluate classifier performance.
 
@@ -28,24 +20,23 @@ def evaluate_classifier(model, X_train, y_train, X_test, y_test, threshold=0.5,)
         Feature matrix and labels for testing.
     threshold : 
         Probability threshold for classification
+    return_curves : bool
+        If True, also return the thresholded metrics at every distinct threshold (see `threshold_curves`)
+        so an operating point can be chosen from the full curve.
+    matrices : TrainingMatrices or None
+        Prebuilt quantized matrices of X_train (XGBoost models only), reused instead of re-quantizing X_train.
     """
 
-    model.fit(X_train, y_train)
+    if matrices is not None:
+        fit_from_matrix(model, matrices.full())
+    else:
+        model.fit(X_train, y_train)
 
     # Predict probabilities for positive class
     probs = model.predict_proba(X_test)[:, 1]
-    preds = (probs >= threshold).astype(int)
 
     # Compute metrics for classifier
-    results = {}
-
-    results["accuracy"] = accuracy_score(y_test, preds)
-    results["precision"] = precision_score(y_test, preds, zero_division=0)
-    results["recall"] = recall_score(y_test, preds, zero_division=0)       
-    results["f1"] = f1_score(y_test, preds, zero_division=0)
-    results["roc_auc"] = roc_auc_score(y_test, probs)
-    results["pr_auc"] = average_precision_score(y_test, probs)
-    results["brier"] = brier_score_loss(y_test, probs)
+    results = compute_all_metrics(y_test, probs, threshold=threshold)
 
     print(
             f"Best Model Results:"
@@ -58,4 +49,6 @@ def evaluate_classifier(model, X_train, y_train, X_test, y_test, threshold=0.5,)
             f"brier={results['brier']:.3f}"       
         )
     
+    if return_curves:
+        return results, threshold_curves(y_test, probs)
     return results
@@ -1,17 +1,22 @@
 import pandas as pd
-from xgboost import XGBClassifier
-import joblib
-import os
+
+from batch_scorer import BatchScorer
 
 from compute_forward_returns import compute_forward_returns
-from evaluate_all import evaluate_all
+from grouped_statistics import evaluate_grouped, stack_returns
 from sample_random_events import sample_random_events
 from ma_crossover_signals import ma_crossover_signals
+from price_panel import load_price_data, list_tickers
+from baseline_store import open_baseline_store
+from event_store import read_events
 
-def evaluating_returns_for_predictions(data_file:str, model_name:str, feature_name:str, ind_full_summary:pd.DataFrame, comp_full_summary:pd.DataFrame):
+def evaluating_returns_for_predictions(data_file:str, model_name:str, feature_name:str, ind_full_summary:pd.DataFrame, comp_full_summary:pd.DataFrame, horizons=(5, 20, 60), use_baseline_cache: bool = True):
     """
     Using the trained model, evaluate the returns for the predicted positive events and compare to moving average baseline.
 
+    Predicted events are grouped by ticker once and baselines are built once per ticker; the returns of every
+    ticker are stacked and summarized in one pass (see grouped_statistics.py).
+
     Parameters
     ----------
     data_file: str
@@ -20,83 +25,63 @@ def evaluating_returns_for_predictions(data_file:str, model_name:str, feature_na
         Name of the trained model file (without extension).
     feature_name: str
         Name of the feature file (without extension).
+    ind_full_summary, comp_full_summary: pd.DataFrame
+        Summaries to extend (pass empty DataFrames to start fresh).
+    horizons: tuple of int
+        Forward-return horizons in trading days (default is (5, 20, 60))
+    use_baseline_cache: bool
+        If True, serve the random and MA crossover baselines from the persistent baseline store (see baseline_store.py);
+        price data is then only loaded for tickers with predicted events (the other tickers' stored baselines are
+        keyed on the price digest recorded at ingest).
     """
     # load predictions
-    df = pd.read_csv(data_file)
+    df = read_events(data_file)
     
-    # load trained model
-    model = XGBClassifier()
-    model.load_model(f"{model_name}.json")
-    features = joblib.load(f"{feature_name}.pkl")
+    # load trained model once; it builds the engineered features itself
+    scorer = BatchScorer(f"{model_name}.json", f"{feature_name}.pkl")
 
     split_index = int(len(df) * 0.8)
-    train_data = df.iloc[:split_index]
-    test_data = df.iloc[split_index:]
+    test_data = df.iloc[split_index:].copy()
 
-    X_train = train_data[features]
-    y_train = train_data['label']
-    
-    X_test = test_data[features]
-    y_test = test_data['label']
+    probs = scorer.score(test_data)
+    test_data['predicted_label'] = (probs >= scorer.threshold).astype(int)
 
-    probs = model.predict_proba(X_test)[:, 1]
-    preds = (probs >= 0.5).astype(int)
+    predicted_events = test_data.where(test_data['predicted_label'] == 1).dropna()
+    predicted_by_ticker = dict(tuple(predicted_events.groupby('Ticker', sort=False, observed=True)))
 
-    test_data['predicted_label'] = preds
+    baselines = open_baseline_store() if use_baseline_cache else None
 
-    predicted_events = test_data.where(test_data['predicted_label'] == 1).dropna()
+    tickers, returns = list_tickers(), []
+    for ticker in tickers:
+        predicted_dt_events = predicted_by_ticker.get(ticker)
+
+        # pulling price data for ticker (zero-copy from the price panel when ingested), only when it is needed
+        df = load_price_data(ticker) if predicted_dt_events is not None or baselines is None else None
 
-    for name in os.listdir('./sp500/sp500'):
-        if os.path.isfile(os.path.join('./sp500/sp500', name)):
-            ticker = name.split('.')[0]
-
-            # pulling price data for ticker
-            df = pd.read_csv(f"sp500/sp500/{ticker}.csv", 
-                     header=0, 
-                     skiprows=[1],
-                     dtype={
-                        "Open": float,
-                        "High": float,
-                        "Low": float,
-                        "Close": float,
-                        "Volume": float
-                        }
-            )
-            
-            # Filtering predicted events for this ticker
-            predicted_dt_events = predicted_events[predicted_events['Ticker'] == ticker]
-            
-            # compute forward returns for predicted events, if any
-            if not predicted_dt_events.empty:
-                predicted_forward_returns = compute_forward_returns(df, predicted_dt_events, predicted = True, horizons=[5, 20, 60])
-                predicted_forward_returns['symbol'] = ticker
-            
+        if baselines is not None:
+            ma_events = baselines.ma_events(ticker, df=df, horizons=horizons)
+        else:
+            ma_events = ma_crossover_signals(df, horizons=horizons)
+        events = {'ma_crossover': ma_events}
+
+        # without predicted (or random) events every statistic but the moving average's own is NaN and dropped below
+        if predicted_dt_events is not None:
+            # compute forward returns for predicted events and baseline
+            events['double_top'] = compute_forward_returns(df, predicted_dt_events, predicted = True, horizons=horizons)
+
+            if baselines is not None:
+                events['random'] = baselines.random_events(ticker, n_events=len(predicted_dt_events), df=df, horizons=horizons)
             else:
-                predicted_forward_returns = pd.DataFrame(columns=['peak1_pos', 'trough_pos', 'peak2_pos', 'peak1_price', 'peak2_price',
-                    'trough_price', 'peak_gap_days', 'vol1', 'vol2', 'vol2_vol1_ratio',
-                    'label', 'peak1_date', 'trough_date', 'peak2_date', 'Ticker',
-                    'peak_height_diff', 'peak_height_diff_pct', 'retracement_depth1',
-                    'retracement_depth2', 'volume_diff', 'peak1_to_trough',
-                    'trough_to_peak2', 'predicted_label', 'ret_5d', 'ret_20d', 'ret_60d',
-                    'symbol'])
-
-            # compute forward returns for baseline
-            rand_events = sample_random_events(df, n_events=len(predicted_dt_events), horizons=[5, 20, 60])
-            rand_events["symbol"] = ticker
-
-            ma_events = ma_crossover_signals(df, horizons=[5, 20, 60])
-            ma_events["symbol"] = ticker
-
-            # record individual and comparison return statistics
-            ind_return_summary_df, comp_return_summary_df = evaluate_all(predicted_forward_returns, rand_events, ma_events, horizons=[5, 20, 60])
-            ind_return_summary_df["symbol"] = ticker
-            comp_return_summary_df["symbol"] = ticker
-
-            ind_full_summary = pd.concat([ind_full_summary, ind_return_summary_df], ignore_index=True).dropna()
-            comp_full_summary = pd.concat([comp_full_summary, comp_return_summary_df], ignore_index=True).dropna()
-                
-        # break #testing only first file
-    
+                events['random'] = sample_random_events(df, n_events=len(predicted_dt_events), horizons=horizons)
+
+        returns.append(stack_returns(events, ticker, horizons=horizons))
+
+    # record individual and comparison return statistics
+    ind_return_summary_df, comp_return_summary_df = evaluate_grouped(pd.concat(returns, ignore_index=True),
+                                                                     symbols=tickers, horizons=horizons)
+
+    ind_full_summary = pd.concat([ind_full_summary, ind_return_summary_df], ignore_index=True).dropna()
+    comp_full_summary = pd.concat([comp_full_summary, comp_return_summary_df], ignore_index=True).dropna()
     return ind_full_summary, comp_full_summary
 
     
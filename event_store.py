@@ -0,0 +1,302 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+STORE_SUFFIX = ".events"  # labeled_double_top_events.csv -> labeled_double_top_events.events/
+
+class EventTable:
+    """
+    Growable columnar event table with compact dtypes.
+
+    Each column is one preallocated NumPy array: positions and counts as int32, prices and features as float32,
+    dates as datetime64[D], flags as bool, and text columns (ticker, event type) as categorical codes with one
+    shared category list per column. Appends write into the free capacity, which doubles when it runs out, so
+    building a universe-wide table costs amortized O(rows) instead of a DataFrame concat per ticker.
+
+    Saved tables are a directory with one .npy file per column (like the price panel) plus 'schema.json';
+    `load` memory-maps the columns and `to_frame` wraps them without copying.
+
+    Parameters
+    ----------
+    schema : dict[str, str]
+        Column name -> 'int32', 'int64', 'float32', 'float64', 'bool', 'datetime64[D]' or 'category', in column order.
+    capacity : int
+        Initial number of rows allocated (default is 1024).
+    """
+
+    def __init__(self, schema, capacity=1024):
+        self.schema = dict(schema)
+        self.categories = {c: [] for c, kind in self.schema.items() if kind == 'category'}
+        self._codes = {c: {} for c in self.categories}
+        self._columns = {c: np.empty(capacity, dtype=_storage_dtype(kind)) for c, kind in self.schema.items()}
+        self._n = 0
+
+    def __len__(self):
+        return self._n
+
+    @property
+    def capacity(self):
+        return len(next(iter(self._columns.values()))) if self._columns else 0
+
+    @classmethod
+    def from_frame(cls, df, capacity=None, exact=()):
+        """
+        Compact table holding df, with the schema inferred by `compact_schema(df, exact)`.
+        """
+        table = cls(compact_schema(df, exact), capacity=max(capacity or len(df), 1))
+        table.append(df)
+        return table
+
+    def append(self, df):
+        """
+        Append the rows of a DataFrame (or dict of arrays) holding every schema column.
+        """
+        n = len(df[next(iter(self.schema))]) if self.schema else 0
+        if n == 0:
+            return self
+        self._reserve(self._n + n)
+        rows = slice(self._n, self._n + n)
+        for col, kind in self.schema.items():
+            values = df[col]
+            if kind == 'category':
+                self._columns[col][rows] = self._encode(col, values)
+            elif kind == 'datetime64[D]':
+                self._columns[col][rows] = pd.to_datetime(values).to_numpy().astype('datetime64[D]')
+            else:
+                self._columns[col][rows] = np.asarray(values)
+        self._n += n
+        return self
+
+    def _reserve(self, n):
+        if n <= self.capacity:
+            return
+        capacity = max(n, 2 * self.capacity)
+        for col, values in self._columns.items():
+            grown = np.empty(capacity, dtype=values.dtype)
+            grown[:self._n] = values[:self._n]
+            self._columns[col] = grown
+
+    def _encode(self, col, values):
+        """
+        Category codes of values, adding unseen categories in order of appearance.
+        """
+        codes = self._codes[col]
+        inverse, uniques = pd.factorize(np.asarray(values, dtype=object))
+        for value in uniques:
+            if value not in codes:
+                codes[value] = len(codes)
+                self.categories[col].append(value)
+        lookup = np.array([codes[value] for value in uniques], dtype=self._columns[col].dtype)
+        return lookup[inverse]
+
+    def column(self, name):
+        """
+        Stored array of one column (category codes for categorical columns); a view, not a copy.
+        """
+        return self._columns[name][:self._n]
+
+    def to_frame(self):
+        """
+        DataFrame over the stored columns. Numeric columns are views of the table's arrays (read-only when the
+        table was loaded from disk without `writable`), categorical columns are rebuilt from their codes and dates come back as
+        datetime64[s].
+        """
+        data = {}
+        for col, kind in self.schema.items():
+            values = self.column(col)
+            if kind == 'category':
+                data[col] = pd.Categorical.from_codes(values, categories=self.categories[col])
+            elif kind == 'datetime64[D]':
+                data[col] = values.astype('datetime64[s]')
+            else:
+                data[col] = values
+        return pd.DataFrame(data, copy=False)
+
+    def nbytes(self):
+        """
+        Bytes held by the stored rows (excluding spare capacity and category lists).
+        """
+        return sum(self.column(c).nbytes for c in self.schema)
+
+    def save(self, path, source=None):
+        """
+        Write one .npy per column and then 'schema.json' into the directory `path`.
+
+        `source` is the file the table was converted from (e.g. its CSV); its size and mtime are recorded so
+        `read_events` can tell when the file has changed since.
+        """
+        os.makedirs(path, exist_ok=True)
+        for i, col in enumerate(self.schema):
+            np.save(os.path.join(path, f"{i:03d}.npy"), self.column(col))
+        meta = {'length': self._n, 'schema': self.schema, 'categories': self.categories}
+        if source is not None:
+            meta['source'] = _file_signature(source)
+        with open(os.path.join(path, "schema.json"), "w") as f:
+            json.dump(meta, f)
+
+    @classmethod
+    def load(cls, path, mmap=True, writable=False):
+        """
+        Table saved by `save`; columns are memory-mapped read-only unless mmap=False.
+
+        With `writable`, the maps are copy-on-write: columns can be modified in place, pages are copied as they
+        are written and the files on disk never change.
+        """
+        with open(os.path.join(path, "schema.json")) as f:
+            meta = json.load(f)
+        table = cls(meta['schema'], capacity=0)
+        table.categories = meta['categories']
+        table._codes = {c: {v: i for i, v in enumerate(cats)} for c, cats in table.categories.items()}
+        table._columns = {col: np.load(os.path.join(path, f"{i:03d}.npy"), mmap_mode=("c" if writable else "r") if mmap else None)
+                          for i, col in enumerate(table.schema)}
+        table._n = meta['length']
+        return table
+
+
+def compact_schema(df, exact=()):
+    """
+    Compact storage kind for every column of df.
+
+    Integers become int32 (int64 if they do not fit), floats float32, booleans bool, datetimes and text columns
+    named '*_date' datetime64[D], and any other text or categorical column a category. Float columns listed in
+    `exact` stay float64, e.g. model inputs whose float32 rounding would move scores across the threshold.
+    """
+    schema = {}
+    for col in df.columns:
+        values = df[col]
+        if pd.api.types.is_bool_dtype(values):
+            schema[col] = 'bool'
+        elif pd.api.types.is_integer_dtype(values):
+            fits = values.empty or (values.min() >= np.iinfo(np.int32).min and values.max() <= np.iinfo(np.int32).max)
+            schema[col] = 'int32' if fits else 'int64'
+        elif pd.api.types.is_float_dtype(values):
+            schema[col] = 'float64' if col in exact else 'float32'
+        elif pd.api.types.is_datetime64_any_dtype(values) or str(col).endswith('_date'):
+            schema[col] = 'datetime64[D]'
+        else:
+            schema[col] = 'category'
+    return schema
+
+
+def _storage_dtype(kind):
+    return np.dtype('int32') if kind == 'category' else np.dtype(kind)
+
+
+def _file_signature(path):
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+
+def save_events(df, path, exact=(), source=None):
+    """
+    Save an event DataFrame as a compact EventTable directory (float columns in `exact` kept as float64).
+
+    Pass the CSV df was written to as `source` so `read_events` serves the store only while that CSV is unchanged.
+    """
+    EventTable.from_frame(df, exact=exact).save(path, source=source)
+
+
+def load_events(path, mmap=True, writable=False):
+    """
+    Event DataFrame from an EventTable directory, memory-mapped and without copying numeric columns.
+
+    Numeric columns are read-only unless `writable` (copy-on-write maps; see `EventTable.load`).
+    """
+    return EventTable.load(path, mmap=mmap, writable=writable).to_frame()
+
+
+def store_path(csv_path):
+    """
+    EventTable directory kept next to an events CSV.
+    """
+    return os.path.splitext(csv_path)[0] + STORE_SUFFIX
+
+
+def read_events(path):
+    """
+    Events from a CSV, served from the binary store next to it while the store is up to date.
+
+    The store is up to date when the CSV still has the size and mtime recorded at conversion, or, for stores
+    saved without a source, when its 'schema.json' (written last) is at least as new as the CSV. Otherwise the
+    CSV is read with the store's integer, date and categorical dtypes.
+
+    `path` may also be an EventTable directory. Columns served from a store are copy-on-write memory maps, so
+    the frame can be modified in place like one read from the CSV, without changing the store.
+    """
+    if os.path.isdir(path):
+        return load_events(path, writable=True)
+    store = store_path(path)
+    if _store_is_fresh(store, path):
+        return load_events(store, writable=True)
+    return _read_csv(path)
+
+
+def _store_is_fresh(store, csv_path):
+    schema = os.path.join(store, "schema.json")
+    if not os.path.exists(schema):
+        return False
+    with open(schema) as f:
+        source = json.load(f).get('source')
+    if source is not None:
+        return source == _file_signature(csv_path)
+    return os.stat(schema).st_mtime_ns >= os.stat(csv_path).st_mtime_ns
+
+
+def _read_csv(path):
+    """
+    Events CSV with the dtypes `to_frame` gives the store's columns; floats stay float64, as for `exact` columns.
+    """
+    df = pd.read_csv(path)
+    for col, kind in compact_schema(df, exact=df.columns).items():
+        if kind == 'category':
+            df[col] = pd.Categorical(df[col], categories=pd.unique(df[col].dropna()))
+        elif kind == 'datetime64[D]':
+            df[col] = pd.to_datetime(df[col]).to_numpy().astype('datetime64[D]').astype('datetime64[s]')
+        else:
+            df[col] = df[col].astype(kind)
+    return df
+
+
+if __name__ == "__main__":
+    # one-time conversion of the labeled set, with size, load time and a round-trip check
+    import time
+    from engineer_features import FEATURES
+
+    csv = 'labeled_double_top_events.csv'
+    start = time.perf_counter()
+    labeled = pd.read_csv(csv)
+    t_csv = time.perf_counter() - start
+
+    # the labeled set feeds the model, so its features keep full precision
+    save_events(labeled, store_path(csv), exact=FEATURES, source=csv)
+    table = EventTable.load(store_path(csv))
+    start = time.perf_counter()
+    events = load_events(store_path(csv))
+    t_store = time.perf_counter() - start
+
+    frame_bytes = labeled.memory_usage(deep=True, index=False).sum()
+    print(f"{len(labeled)} events: {frame_bytes / len(labeled):.0f} bytes/event as parsed from CSV, "
+          f"{table.nbytes() / len(labeled):.0f} bytes/event in the store")
+    print(f"reload: read_csv {t_csv * 1e3:.1f} ms, store {t_store * 1e3:.2f} ms")
+
+    # round trip: exact up to float32 rounding, dates and categories restored
+    compact = EventTable.from_frame(labeled)
+    print(f"{compact.nbytes() / len(labeled):.0f} bytes/event with every float column as float32")
+    for col, kind in table.schema.items():
+        if kind == 'float32':
+            assert np.array_equal(events[col].to_numpy(), labeled[col].to_numpy(dtype=np.float32), equal_nan=True), col
+        elif kind == 'datetime64[D]':
+            assert (events[col].dt.strftime('%Y-%m-%d') == labeled[col]).all(), col
+        else:
+            assert (events[col].astype(labeled[col].dtype) == labeled[col]).all(), col
+
+    # growth from many small appends matches one bulk conversion
+    grown = EventTable(table.schema, capacity=16)
+    for _, group in labeled.groupby('Ticker', sort=False):
+        grown.append(group)
+    order = labeled.groupby('Ticker', sort=False).ngroup().sort_values(kind='stable').index
+    bulk = EventTable.from_frame(labeled.loc[order], exact=FEATURES).to_frame()
+    pd.testing.assert_frame_equal(grown.to_frame(), bulk)
+    print(f"round trip ok; appended per ticker into capacity {grown.capacity}")
@@ -0,0 +1,281 @@
+import hashlib
+import inspect
+import os
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.signal import lfilter
+
+from price_panel import PANEL_DIR, load_price_data, open_price_panel
+from stage_graph import StageCache
+
+FEATURE_DIR = ".feature_cache"
+
+# per-bar technical features, in the order they are added to candidates
+TECHNICAL_FEATURES = ['rsi_14', 'atr_14_pct', 'volatility_20', 'volume_z_20', 'ma20_dist', 'ma50_dist',
+                      'ret_5d_into', 'ret_20d_into']
+
+# bars of history any windowed feature looks back over (the 50-day moving average)
+LOOKBACK = 50
+
+def technical_features(arrays, start=0, state=None):
+    """
+    Technical features for the bars `start:` of one ticker, using only each bar and the bars before it.
+
+    Rolling windows are computed over stride views of the bars they need, and the Wilder averages of RSI and
+    ATR are first-order recursions run with `lfilter`, continued from `state` when extending a previous call.
+
+    Features (NaN until a bar has a full window of history):
+        rsi_14         14-day RSI with Wilder smoothing, 0-100
+        atr_14_pct     14-day Wilder average true range as a fraction of the close
+        volatility_20  standard deviation of the last 20 daily log returns
+        volume_z_20    z-score of the bar's volume against the last 20 bars (including itself)
+        ma20_dist      close / 20-day moving average - 1
+        ma50_dist      close / 50-day moving average - 1
+        ret_5d_into    close / close 5 bars earlier - 1 (at peak 2: the return into the peak)
+        ret_20d_into   close / close 20 bars earlier - 1
+
+    Parameters
+    ----------
+    arrays : dict[str, np.ndarray]
+        The ticker's full 'Close', 'High', 'Low' and 'Volume' history (e.g. `PricePanel.arrays`).
+    start : int
+        First bar to compute (default is 0). Bars before it only serve as history.
+    state : dict or None
+        The state returned by the call that computed bars `:start`; required when start > 0.
+
+    Returns
+    -------
+    columns : dict[str, np.ndarray]
+        One float64 array per TECHNICAL_FEATURES name, for bars `start:`.
+    state : dict
+        Smoothing state after the last bar, to continue from when more bars arrive.
+    """
+    close, high, low, volume = (np.asarray(arrays[f], dtype=np.float64) for f in ('Close', 'High', 'Low', 'Volume'))
+    n = len(close)
+    lo = max(start - LOOKBACK, 0)  # history the windows of the first new bar reach back to
+    c, v = close[lo:], volume[lo:]
+    bars = np.arange(lo, n)
+    new = slice(start - lo, None)
+
+    columns = {}
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Wilder averages: avg[t] = avg[t-1] + (x[t] - avg[t-1]) / 14, seeded with the first value
+        prev_close = np.concatenate(([close[start - 1]] if start > 0 else [np.nan], close[start:-1]))
+        delta = close[start:] - prev_close
+        true_range = np.fmax(high[start:] - low[start:],
+                             np.fmax(np.abs(high[start:] - prev_close), np.abs(low[start:] - prev_close)))
+        state = dict(state) if state is not None else {}
+        gain, state['gain'] = _wilder(np.clip(delta, 0, None), state.get('gain'), skip_first=start == 0)
+        loss, state['loss'] = _wilder(np.clip(-delta, 0, None), state.get('loss'), skip_first=start == 0)
+        atr, state['atr'] = _wilder(true_range, state.get('atr'))
+        columns['rsi_14'] = np.where(loss == 0, 100.0, 100 - 100 / (1 + gain / loss))
+        columns['atr_14_pct'] = atr / close[start:]
+        warm = np.arange(start, n) < 14
+        columns['rsi_14'][warm] = np.nan
+        columns['atr_14_pct'][warm] = np.nan
+
+        log_ret = np.diff(np.log(c), prepend=np.nan)
+        columns['volatility_20'] = _rolling(log_ret, 20, lambda w: w.std(axis=1, ddof=1))[new]
+        v_mean = _rolling(v, 20, lambda w: w.mean(axis=1))
+        v_std = _rolling(v, 20, lambda w: w.std(axis=1, ddof=1))
+        columns['volume_z_20'] = ((v - v_mean) / v_std)[new]
+        columns['ma20_dist'] = (c / _rolling(c, 20, lambda w: w.mean(axis=1)) - 1)[new]
+        columns['ma50_dist'] = (c / _rolling(c, 50, lambda w: w.mean(axis=1)) - 1)[new]
+        for k in (5, 20):
+            back = np.full(len(c), np.nan)
+            back[k:] = c[k:] / c[:-k] - 1
+            columns[f'ret_{k}d_into'] = np.where(bars >= k, back, np.nan)[new]
+    return columns, state
+
+
+def _wilder(x, last=None, period=14, skip_first=False):
+    """
+    Wilder average of x continued from the previous average `last` (seeded with x's first value when None).
+
+    With skip_first, x[0] has no prior close, so the average starts at x[1] and bar 0 is NaN.
+    """
+    out = np.full(len(x), np.nan)
+    if skip_first:
+        x, out_view = x[1:], out[1:]
+    else:
+        out_view = out
+    if len(x) == 0:
+        return out, last
+    if last is None:
+        last = x[0]
+    alpha = 1.0 / period
+    out_view[:], _ = lfilter([alpha], [1.0, alpha - 1.0], x, zi=[(1 - alpha) * last])
+    return out, out_view[-1]
+
+
+def _rolling(x, window, reduce):
+    """
+    reduce applied over each full window of x ending at every bar; NaN where the window is incomplete.
+    """
+    out = np.full(len(x), np.nan)
+    if len(x) >= window:
+        out[window - 1:] = reduce(sliding_window_view(x, window))
+    return out
+
+
+class FeatureStore:
+    """
+    Persistent per-ticker technical features, one row per bar, extended incrementally.
+
+    A stored entry records how many bars it covers and a hash of those bars. When a ticker's history has grown
+    and its stored bars are unchanged, only the new tail is computed (continuing the Wilder averages from the
+    stored state and reading LOOKBACK bars of history for the rolling windows); a rewritten history or edited
+    feature code is recomputed from scratch.
+
+    Parameters
+    ----------
+    cache : StageCache or None
+        Backing pickle store (default is a StageCache in '.feature_cache').
+    """
+
+    def __init__(self, cache=None):
+        self.cache = cache if cache is not None else StageCache(FEATURE_DIR)
+        self._memory = {}
+        self.stats = {'hits': 0, 'extended': 0, 'computed': 0}
+
+    def features(self, ticker, arrays=None):
+        """
+        Dict of TECHNICAL_FEATURES arrays over every bar of the ticker (positions as in `load_price_data`).
+
+        `arrays` is the ticker's price history (loaded from the panel when None); do not modify the result.
+        """
+        if arrays is None:
+            arrays = _price_arrays(ticker)
+        n = len(arrays['Close'])
+        key = self._key(ticker)
+
+        entry = self._memory.get(key)
+        if entry is None:
+            try:
+                entry = self.cache.get(key)
+            except KeyError:
+                pass
+        if entry is not None and entry['n'] <= n and entry['digest'] == _bars_digest(arrays, entry['n']):
+            if entry['n'] == n:
+                self.stats['hits'] += 1
+                self._memory[key] = entry
+                return entry['columns']
+            tail, state = technical_features(arrays, start=entry['n'], state=entry['state'])
+            columns = {c: np.concatenate((entry['columns'][c], tail[c])) for c in TECHNICAL_FEATURES}
+            self.stats['extended'] += 1
+        else:
+            columns, state = technical_features(arrays)
+            self.stats['computed'] += 1
+
+        entry = {'n': n, 'digest': _bars_digest(arrays, n), 'columns': columns, 'state': state}
+        self.cache.put(key, entry)
+        self._memory[key] = entry
+        return columns
+
+    def _key(self, ticker):
+        h = hashlib.sha256()
+        h.update(f"technical:{ticker}".encode())
+        h.update(_code_hash().encode())
+        return h.hexdigest()
+
+
+def _price_arrays(ticker):
+    """
+    The ticker's price history as arrays, as zero-copy panel views when ingested.
+    """
+    if os.path.exists(os.path.join(PANEL_DIR, "tickers.json")):
+        panel = open_price_panel()
+        if ticker in panel and not panel.is_stale(ticker):
+            return panel.arrays(ticker)
+    df = load_price_data(ticker)
+    return {f: df[f].to_numpy() for f in ('Close', 'High', 'Low', 'Volume')}
+
+
+def _bars_digest(arrays, n):
+    """
+    sha256 of the first n bars of the fields the features read.
+    """
+    h = hashlib.sha256()
+    for f in ('Close', 'High', 'Low', 'Volume'):
+        h.update(np.ascontiguousarray(arrays[f][:n], dtype=np.float64).tobytes())
+    return h.hexdigest()
+
+
+@lru_cache(maxsize=1)
+def _code_hash():
+    h = hashlib.sha256()
+    for obj in (technical_features, _wilder, _rolling):
+        h.update(inspect.getsource(obj).encode())
+    return h.hexdigest()
+
+
+@lru_cache(maxsize=None)
+def open_feature_store(cache_dir=FEATURE_DIR):
+    """
+    Shared FeatureStore for this process.
+    """
+    return FeatureStore(StageCache(cache_dir))
+
+
+def add_technical_features(events, store=None, pos_col='peak2_pos'):
+    """
+    Add TECHNICAL_FEATURES to candidates, read point-in-time at each candidate's second peak.
+
+    The value joined for a candidate is the feature of bar `pos_col`, which only uses bars up to and including
+    that bar, so nothing after peak 2 leaks in. Positions outside the ticker's history give NaN.
+
+    Parameters
+    ----------
+    events : pd.DataFrame
+        Candidates with a 'Ticker' column and integer bar positions in `pos_col`.
+    store : FeatureStore or None
+        Feature source (default is the shared store from `open_feature_store`).
+    pos_col : str
+        Column of bar positions to read the features at (default is 'peak2_pos').
+
+    Returns
+    -------
+    pd.DataFrame
+        Copy of events with one column per TECHNICAL_FEATURES name.
+    """
+    store = store if store is not None else open_feature_store()
+    events = events.copy()
+    out = {c: np.full(len(events), np.nan) for c in TECHNICAL_FEATURES}
+    codes, tickers = pd.factorize(np.asarray(events['Ticker'], dtype=object))
+    pos = events[pos_col].to_numpy()
+
+    # rows of each ticker, from one stable sort of the ticker codes
+    groups = np.split(np.argsort(codes, kind='stable'), np.cumsum(np.bincount(codes, minlength=len(tickers)))[:-1])
+    for ticker, rows in zip(tickers, groups):
+        columns = store.features(ticker)
+        p = pos[rows]
+        ok = (p >= 0) & (p < len(columns[TECHNICAL_FEATURES[0]]))
+        for c in TECHNICAL_FEATURES:
+            out[c][rows[ok]] = columns[c][p[ok].astype(np.int64)]
+
+    for c in TECHNICAL_FEATURES:
+        events[c] = out[c]
+    return events
+
+
+if __name__ == "__main__":
+    # the labeled set joined from scratch and from the stored features
+    import tempfile
+    import time
+    from event_store import read_events
+
+    labeled = read_events('labeled_double_top_events.csv')
+    n_tickers = labeled['Ticker'].nunique()
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        joined = add_technical_features(labeled, store=FeatureStore(StageCache(tmp)))
+        elapsed = time.perf_counter() - start
+        print(f"features for {len(labeled)} labeled events over {n_tickers} tickers computed in {elapsed:.2f} s "
+              f"({1e3 * elapsed / n_tickers:.1f} ms per ticker)")
+        start = time.perf_counter()
+        add_technical_features(labeled, store=FeatureStore(StageCache(tmp)))
+        print(f"served from the stored features in {time.perf_counter() - start:.2f} s")
+    print(joined[TECHNICAL_FEATURES].describe().T[['mean', 'std', 'min', 'max']])
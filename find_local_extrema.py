@@ -3,6 +3,9 @@
 # This is significantly optimized, and given the amount of times it runs in my pipeline,
 # I wanted to ensure it was as fast as possible.
 
+import numpy as np
+import pandas as pd
+
 def find_local_extrema(df, window=3):
     """
     Identify local max and mins in the 'High' and 'Low' columns of df.
@@ -14,10 +17,125 @@ def find_local_extrema(df, window=3):
     window : int, optional
         Window size for detecting local peaks and troughs (default is 3). Measured in days.
     """
-    highs = df['High']
-    lows = df['Low']
+    highs = df['High'].to_numpy(dtype=float)
+    lows = df['Low'].to_numpy(dtype=float)
+
+    local_high = highs == centered_rolling_extreme(highs, window, kind='max')
+    local_low = lows == centered_rolling_extreme(lows, window, kind='min')
+
+    return pd.Series(local_high, index=df.index, name='High'), pd.Series(local_low, index=df.index, name='Low')
+
+
+def centered_rolling_extreme(values, window, kind='max'):
+    """
+    Centered rolling max/min over 2*window+1 bars using the van Herk/Gil-Werman block scheme.
+
+    Cost is O(n) whatever the window size. Bars whose window runs past either end, or contains NaN,
+    come back as NaN, matching `pd.Series.rolling(2*window+1, center=True)`.
+
+    Parameters
+    ----------
+    values : np.ndarray
+        1D array of prices, or a 2D (tickers x dates) panel processed row by row.
+    window : int
+        Half-width of the centered window, in bars.
+    kind : str
+        'max' or 'min'.
+    """
+    values = np.asarray(values, dtype=float)
+    n = values.shape[-1]
+    lead = values.shape[:-1]
+    size = 2 * window + 1
+    out = np.full(values.shape, np.nan)
+    if n < size:
+        return out
+
+    ufunc = np.maximum if kind == 'max' else np.minimum
+
+    # split into blocks of `size`; prefix extreme within each block running forwards and backwards
+    n_blocks = -(-n // size)
+    padded = np.full(lead + (n_blocks * size,), np.nan)
+    padded[..., :n] = values
+    blocks = padded.reshape(lead + (n_blocks, size))
+    forward = ufunc.accumulate(blocks, axis=-1).reshape(lead + (-1,))
+    backward = ufunc.accumulate(blocks[..., ::-1], axis=-1)[..., ::-1].reshape(lead + (-1,))
+
+    # any window [s, s + size - 1] spans at most two blocks: backward[s] covers its head, forward[s + size - 1] its tail
+    starts = np.arange(n - size + 1)
+    out[..., window:n - window] = ufunc(backward[..., starts], forward[..., starts + size - 1])
+    return out
+
+
+def extremum_radius(values, kind='max'):
+    """
+    Per-bar largest window for which the bar is a local extremum.
 
-    local_high = (highs == highs.rolling(window*2+1, center=True).max())
-    local_low = (lows == lows.rolling(window*2+1, center=True).min())
+    `find_local_extrema(df, w)` flags bar i exactly when radius[i] >= w, so a single radius
+    array answers every `peak_window` at once. Bars that are NaN get -1.
+    Computed with binary lifting over a sparse table of range extremes, O(n log n) overall.
 
-    return local_high.fillna(False), local_low.fillna(False)
+    Parameters
+    ----------
+    values : np.ndarray
+        1D array of prices ('High' for peaks, 'Low' for troughs).
+    kind : str
+        'max' for local highs, 'min' for local lows.
+    """
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+    if kind == 'min':
+        values = -values
+
+    # NaN never counts as an extremum and blocks any window that contains it
+    valid = ~np.isnan(values)
+    filled = np.where(valid, values, np.inf)
+
+    # table[k, i] = max(filled[i : i + 2**k]), stacked into one 2D array for single-gather lookups
+    levels = [filled]
+    span = 1
+    while 2 * span <= n:
+        prev = levels[-1]
+        levels.append(np.concatenate([np.maximum(prev[:n - span], prev[span:]), np.full(span, np.inf)]))
+        span *= 2
+    table = np.stack(levels)
+
+    pos = np.arange(n)
+    limit = np.minimum(pos, n - 1 - pos)
+    radius = np.zeros(n, dtype=np.int64)
+
+    # greedily extend each radius by decreasing powers of two while the window max stays at the bar's value
+    step = 1 << (len(levels) - 1)
+    while step >= 1:
+        idx = np.flatnonzero(radius + step <= limit)
+        r = radius[idx] + step
+        level = np.log2(2 * r + 1).astype(np.int64)
+        window_max = np.maximum(table[level, idx - r], table[level, idx + r + 1 - (1 << level)])
+        grow = window_max <= filled[idx]
+        radius[idx[grow]] = r[grow]
+        step //= 2
+
+    radius[~valid] = -1
+    return radius
+
+
+def find_local_extrema_multi(highs, lows, windows):
+    """
+    Local highs/lows for several `peak_window` values from one shared computation on NumPy arrays.
+
+    Parameters
+    ----------
+    highs, lows : np.ndarray
+        1D arrays of 'High' and 'Low' prices for a single ticker.
+    windows : iterable of int
+        Window sizes to evaluate, as passed to `find_local_extrema`.
+
+    Returns
+    -------
+    dict[int, tuple[np.ndarray, np.ndarray]]
+        Boolean (local_high, local_low) masks keyed by window.
+    """
+    high_radius = extremum_radius(highs, kind='max')
+    low_radius = extremum_radius(lows, kind='min')
+    return {w: (high_radius >= w, low_radius >= w) for w in windows}
@@ -0,0 +1,421 @@
+import math
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+TYPES = ('double_top', 'random', 'ma_crossover')
+COMPARISONS = (('double_top', 'ma_crossover'), ('double_top', 'random'), ('ma_crossover', 'random'))
+MIN_N = 5  # small-sample cutoff of summarize_returns and compare_distributions
+
+# same selection rules as scipy's method='auto'
+MWU_EXACT_MAX_N = 8
+KS_EXACT_MAX_N = 10_000
+
+def stack_returns(events_by_type, symbol, horizons=(5, 20, 60)):
+    """
+    One ticker's event returns as a long (symbol, type, horizon, ret) table, NaN returns dropped.
+
+    Parameters
+    ----------
+    events_by_type : dict[str, pd.DataFrame]
+        Events with 'ret_{h}d' columns per event type, e.g. {'double_top': dt_events, 'random': rand_events, ...}.
+    symbol : str
+        Ticker symbol.
+    horizons : tuple of int
+        Forward-return horizons in trading days (default is (5, 20, 60)).
+    """
+    rets, labels, hs = [], [], []
+    for label, events in events_by_type.items():
+        for h in horizons:
+            ret = events[f'ret_{h}d'].to_numpy(dtype=float)
+            ret = ret[~np.isnan(ret)]
+            rets.append(ret)
+            labels.append(np.full(len(ret), label, dtype=object))
+            hs.append(np.full(len(ret), h))
+    return pd.DataFrame({'symbol': symbol, 'type': np.concatenate(labels), 'horizon': np.concatenate(hs),
+                         'ret': np.concatenate(rets)})
+
+
+def evaluate_grouped(returns, symbols=None, horizons=(5, 20, 60), types=TYPES, comparisons=COMPARISONS,
+                     effect_size=False, p_adjust=None):
+    """
+    `evaluate_all` for every symbol at once, from one long table of returns.
+
+    Every (symbol, type, horizon) group is summarized with segment reductions over the table sorted by group,
+    and every (symbol, horizon, comparison) pair is tested in one pass over the pairs' merged, sorted returns:
+    average ranks with tie correction for Mann-Whitney U, ECDF differences at the end of each run of equal
+    values for Kolmogorov-Smirnov, and Welch's t from the group moments. P-values follow scipy's defaults
+    (exact Mann-Whitney for small samples without ties, exact KS up to 10,000 returns per side), so the
+    tables match `evaluate_all` run symbol by symbol.
+
+    Parameters
+    ----------
+    returns : pd.DataFrame
+        Long table with 'symbol', 'type', 'horizon' and 'ret' columns (see `stack_returns`).
+    symbols : list of str or None
+        Symbols to report, in output order (default is the order of appearance in `returns`). Groups without
+        returns are reported with n=0, like `evaluate_all` does for an empty frame.
+    horizons : tuple of int
+        Forward-return horizons in trading days (default is (5, 20, 60)).
+    types : tuple of str
+        Event types, in output order within each horizon.
+    comparisons : tuple of (str, str)
+        Pairs of event types to compare, named '{a}_vs_{b}'.
+    effect_size : bool
+        Add a 'cohen_d' column (`cohen_d_two_sample` of the pair) to the comparisons.
+    p_adjust : {'bonferroni', 'holm', 'fdr_bh'} or None
+        Add '_adj' columns with p-values corrected across symbols, within each (type, horizon) for the
+        summaries and each (comparison, horizon) for the comparisons.
+
+    Returns
+    -------
+    ind_summary_df : pd.DataFrame
+        The `summarize_returns` statistics per symbol, horizon and type, in the ind_returns_all_horizons.csv layout.
+    comp_summary_df : pd.DataFrame
+        The `compare_distributions` statistics per symbol, horizon and comparison, in the
+        comp_returns_all_horizons.csv layout.
+    """
+    symbols = list(symbols) if symbols is not None else list(pd.unique(returns['symbol']))
+    horizons, types = list(horizons), list(types)
+    S, H, T = len(symbols), len(horizons), len(types)
+
+    # group code (symbol, horizon, type), the row order of evaluate_all
+    s = pd.Index(symbols).get_indexer(returns['symbol'])
+    h = pd.Index(horizons).get_indexer(returns['horizon'])
+    t = pd.Index(types).get_indexer(returns['type'])
+    ret = returns['ret'].to_numpy(dtype=float)
+    keep = (s >= 0) & (h >= 0) & (t >= 0) & ~np.isnan(ret)
+    code = ((s * H + h) * T + t)[keep]
+    ret = ret[keep]
+
+    order = np.lexsort((ret, code))
+    x, g = ret[order], code[order]
+    G = S * H * T
+    n = np.bincount(g, minlength=G)
+    start = np.cumsum(n) - n
+
+    moments = _group_moments(x, g, n)
+    ind = _summaries(x, g, n, *moments)
+    ind['horizon'] = np.tile(np.repeat(horizons, T), S)
+    ind['type'] = np.tile(types, S * H)
+    ind['symbol'] = np.repeat(symbols, H * T)
+
+    # comparison rows (symbol, horizon, comparison) and the groups they compare
+    a_type = np.array([types.index(a) for a, _ in comparisons])
+    b_type = np.array([types.index(b) for _, b in comparisons])
+    base = (np.arange(S * H) * T)[:, None]
+    ga, gb = (base + a_type).ravel(), (base + b_type).ravel()
+    comp = _comparisons(x, n, start, ga, gb, *moments, effect_size=effect_size)
+    comp['horizon'] = np.tile(np.repeat(horizons, len(comparisons)), S)
+    comp['comparison'] = np.tile([f'{a}_vs_{b}' for a, b in comparisons], S * H)
+    comp['symbol'] = np.repeat(symbols, H * len(comparisons))
+
+    if p_adjust is not None:
+        ind['p_value_adj'] = _adjust_within(ind, 'p_value', ['type', 'horizon'], p_adjust)
+        for col in ('mw_p', 'ks_p', 't_p'):
+            comp[f'{col}_adj'] = _adjust_within(comp, col, ['comparison', 'horizon'], p_adjust)
+    return ind, comp
+
+
+def adjust_pvalues(p, method='fdr_bh'):
+    """
+    Multiple-testing corrected p-values; NaN entries are left out of the family and stay NaN.
+
+    Parameters
+    ----------
+    p : array-like
+        P-values of one family of tests.
+    method : {'bonferroni', 'holm', 'fdr_bh'}
+        Bonferroni, Holm's step-down (both control the family-wise error rate) or Benjamini-Hochberg
+        (false discovery rate). Default is 'fdr_bh'.
+    """
+    p = np.asarray(p, dtype=float)
+    out = np.full(p.shape, np.nan)
+    ok = ~np.isnan(p)
+    q = p[ok]
+    m = len(q)
+    if m == 0:
+        return out
+
+    order = np.argsort(q, kind='stable')
+    ranked = q[order]
+    if method == 'bonferroni':
+        adjusted = ranked * m
+    elif method == 'holm':
+        adjusted = np.maximum.accumulate(ranked * (m - np.arange(m)))
+    elif method == 'fdr_bh':
+        adjusted = np.minimum.accumulate((ranked * m / np.arange(1, m + 1))[::-1])[::-1]
+    else:
+        raise ValueError(f"Unknown p_adjust method {method!r}; use 'bonferroni', 'holm' or 'fdr_bh'")
+
+    q_adj = np.empty(m)
+    q_adj[order] = np.minimum(adjusted, 1.0)
+    out[ok] = q_adj
+    return out
+
+
+def _adjust_within(table, col, family, method):
+    out = np.full(len(table), np.nan)
+    for idx in table.groupby(family, sort=False).indices.values():
+        out[idx] = adjust_pvalues(table[col].to_numpy()[idx], method)
+    return out
+
+
+def _group_moments(x, g, n):
+    """
+    Mean and sample variance per group (NaN where undefined).
+    """
+    G = len(n)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = np.bincount(g, weights=x, minlength=G) / n
+        var = np.bincount(g, weights=(x - mean[g]) ** 2, minlength=G) / (n - 1)
+    return mean, var
+
+
+def _summaries(x, g, n, mean, var):
+    """
+    `summarize_returns` for every group.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        std = np.sqrt(var)
+        t_stat = mean / (std / np.sqrt(n))
+        p_value = 2 * stats.t.sf(np.abs(t_stat), n - 1)
+        hit_ratio_neg = np.bincount(g, weights=x < 0, minlength=len(n)) / n
+        sharpe = np.where(std > 0, mean / std, np.nan)
+
+    out = pd.DataFrame({
+        'n': n,
+        'mean': mean,
+        'std': std,
+        't_stat': t_stat,
+        'p_value': p_value,
+        'hit_ratio_neg': hit_ratio_neg,
+        'sharpe': sharpe,
+        'cohen_d': sharpe  # same formula
+    })
+    out.loc[n < MIN_N, 'mean':] = np.nan
+    return out
+
+
+def _comparisons(x, n, start, ga, gb, mean, var, effect_size=False):
+    """
+    `compare_distributions` (and optionally `cohen_d_two_sample`) for every pair of groups (ga[k], gb[k]).
+    """
+    C = len(ga)
+    out = {c: np.full(C, np.nan) for c in ('mw_u', 'mw_p', 'ks_stat', 'ks_p', 't_stat', 't_p')}
+    if effect_size:
+        out['cohen_d'] = np.full(C, np.nan)
+
+    valid = np.flatnonzero((n[ga] >= MIN_N) & (n[gb] >= MIN_N))
+    if len(valid):
+        ga, gb = ga[valid], gb[valid]
+        na, nb = n[ga], n[gb]
+
+        mw_u, mw_p, ks_stat, ks_p = _rank_tests(x, start[ga], na, start[gb], nb)
+        for col, values in (('mw_u', mw_u), ('mw_p', mw_p), ('ks_stat', ks_stat), ('ks_p', ks_p)):
+            out[col][valid] = values
+
+        # Welch's t, as scipy's ttest_ind(equal_var=False)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            vna, vnb = var[ga] / na, var[gb] / nb
+            df = (vna + vnb) ** 2 / (vna ** 2 / (na - 1) + vnb ** 2 / (nb - 1))
+            df = np.where(np.isnan(df), 1, df)
+            t_stat = (mean[ga] - mean[gb]) / np.sqrt(vna + vnb)
+            out['t_stat'][valid] = t_stat
+            out['t_p'][valid] = 2 * stats.t.sf(np.abs(t_stat), df)
+
+            if effect_size:
+                pooled = np.sqrt(((na - 1) * var[ga] + (nb - 1) * var[gb]) / (na + nb - 2))
+                out['cohen_d'][valid] = np.where(pooled > 0, (mean[ga] - mean[gb]) / pooled, np.nan)
+
+    return pd.DataFrame(out)
+
+
+def _rank_tests(x, start_a, na, start_b, nb):
+    """
+    Mann-Whitney U (statistic of the first sample, two-sided p) and two-sample KS for every pair of segments
+    x[start_a[k]:start_a[k] + na[k]] vs x[start_b[k]:start_b[k] + nb[k]], both sorted.
+    """
+    K = len(na)
+    m = na + nb
+
+    # each pair's returns, a then b, merged into sorted order within the pair
+    lengths = np.column_stack([na, nb]).ravel()
+    starts = np.column_stack([start_a, start_b]).ravel()
+    idx = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths) + np.arange(lengths.sum())
+    pair = np.repeat(np.arange(K), m)
+    in_a = np.repeat(np.tile([True, False], K), lengths)
+    v = x[idx]
+    order = np.lexsort((v, pair))
+    v, in_a = v[order], in_a[order]
+
+    # runs of equal values within a pair
+    new_run = np.r_[True, (v[1:] != v[:-1]) | (pair[1:] != pair[:-1])]
+    run_first = np.flatnonzero(new_run)
+    run_len = np.diff(np.r_[run_first, len(v)])
+    run_last = run_first + run_len - 1
+    run_pair = pair[run_first]
+    run_id = np.cumsum(new_run) - 1
+    pair_start = np.cumsum(m) - m
+
+    # Mann-Whitney U from average ranks, with the tie term of the normal approximation
+    pos = run_first - pair_start[run_pair]
+    rank = (pos + (run_len - 1) / 2 + 1)[run_id]
+    u1 = np.bincount(pair, weights=rank * in_a, minlength=K) - na * (na + 1) / 2
+    u = np.maximum(u1, na * nb - u1)
+    tie_term = np.bincount(run_pair, weights=run_len.astype(float) ** 3 - run_len, minlength=K)
+    has_ties = np.bincount(run_pair, weights=run_len > 1, minlength=K) > 0
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sd = np.sqrt(na * nb / 12 * ((m + 1) - tie_term / (m * (m - 1))))
+        mw_p = 2 * stats.norm.sf((u - na * nb / 2 - 0.5) / sd)
+    for k in np.flatnonzero((np.minimum(na, nb) <= MWU_EXACT_MAX_N) & ~has_ties):
+        mw_p[k] = 2 * _mwu_exact_sf(int(u[k]), int(na[k]), int(nb[k]))
+    mw_p = np.clip(mw_p, 0, 1)
+
+    # KS: ECDF difference after each run of equal values
+    count_a = np.cumsum(in_a)
+    count_b = np.cumsum(~in_a)
+    before_a = np.r_[0, count_a][pair_start]
+    before_b = np.r_[0, count_b][pair_start]
+    diff = ((count_a[run_last] - before_a[run_pair]) / na[run_pair]
+            - (count_b[run_last] - before_b[run_pair]) / nb[run_pair])
+    first_run = np.flatnonzero(np.r_[True, run_pair[1:] != run_pair[:-1]])
+    max_s = np.maximum.reduceat(diff, first_run)
+    min_s = np.clip(-np.minimum.reduceat(diff, first_run), 0, 1)
+    ks_stat = np.where(min_s > max_s, min_s, max_s)
+    ks_stat, ks_p = _ks_pvalues(ks_stat, na, nb)
+
+    return u1, mw_p, ks_stat, ks_p
+
+
+def _ks_pvalues(d, na, nb):
+    """
+    Two-sided two-sample KS p-values as scipy's ks_2samp(method='auto'): exact path counting up to 10,000
+    returns per side (the statistic is then reported on the lattice, h / lcm(na, nb)), Smirnov's asymptotic
+    distribution otherwise or when the exact probability falls outside [0, 1].
+
+    The exact probability depends only on (na, nb, h), so it is counted once per distinct triple.
+    """
+    d = d.astype(float).copy()
+    p = np.full(len(d), np.nan)
+    exact = np.maximum(na, nb) <= KS_EXACT_MAX_N
+    if exact.any():
+        g = np.gcd(na[exact], nb[exact])
+        lcm = na[exact] // g * nb[exact]
+        h = np.round(d[exact] * lcm).astype(np.int64)
+        d[exact] = h / lcm
+        small, large = np.minimum(na[exact], nb[exact]), np.maximum(na[exact], nb[exact])
+        keys, inverse = np.unique(np.column_stack([small, large, h]), axis=0, return_inverse=True)
+        p[exact] = _ks_exact_sf(*keys.T)[inverse.ravel()]
+    asymp = ~exact | ~((p >= 0) & (p <= 1))
+    if asymp.any():
+        big, small = np.maximum(na, nb)[asymp].astype(float), np.minimum(na, nb)[asymp].astype(float)
+        p[asymp] = stats.kstwo.sf(d[asymp], np.round(big * small / (big + small)))
+    return d, np.clip(p, 0, 1)
+
+
+def _ks_exact_sf(n_small, n_large, h, chunk=256):
+    """
+    P(D >= h / lcm) under the null for each (n_small, n_large, h), by counting lattice paths.
+
+    A path from (0, 0) to (n_small, n_large) takes one step per sorted observation; it leaves the band where
+    |i n_large - j n_small| < h gcd(n_small, n_large) exactly when D reaches h / lcm. The share of paths that have
+    left it by (i, j) is the step-weighted mean of its two predecessors (1 outside the band), as in scipy's
+    recursion. All triples advance together, one antidiagonal i + j = s per step, in chunks of similar size.
+    Equal sizes use `_ks_square_sf`.
+    """
+    n_small, n_large, h = (np.asarray(v, dtype=np.int64) for v in (n_small, n_large, h))
+    p = np.ones(len(h))
+    square = (n_small == n_large) & (h > 0)
+    for k in np.flatnonzero(square):
+        p[k] = _ks_square_sf(int(n_small[k]), int(h[k]))
+    todo = np.flatnonzero((h > 0) & ~square)  # D >= 0 always
+    todo = todo[np.argsort(n_small[todo] + n_large[todo], kind='stable')]
+    for block in np.array_split(todo, max(1, -(-len(todo) // chunk))):
+        if len(block) == 0:
+            continue
+        a, b = n_small[block, None], n_large[block, None]
+        band = h[block, None] * np.gcd(a, b)
+        i = np.arange(a.max() + 1)[None, :]
+        total = (a + b).ravel()
+        outside = np.zeros((len(block), i.shape[1]))
+        for s in range(1, total.max() + 1):
+            shifted = np.pad(outside[:, :-1], ((0, 0), (1, 0)))
+            outside = (i * shifted + (s - i) * outside) / s
+            outside[np.abs(i * b - (s - i) * a) >= band] = 1.0
+            outside[np.broadcast_to(i > s, outside.shape)] = 0.0
+            done = total == s
+            if done.any():
+                p[block[done]] = outside[done, a[done, 0]]
+    return p
+
+
+def _ks_square_sf(n, h):
+    """
+    P(D >= h / n) for two samples of n, from the alternating sum of binomial ratios scipy uses for equal sizes
+    (so its rounding, and its fallback when that lands just above 1, are the same).
+    """
+    p = 0.0
+    for k in range(n // h, -1, -1):
+        term = 1.0
+        for j in range(h):
+            term = (n - k * h - j) * term / (n + k * h + j + 1)
+        p = term * (1.0 - p)
+    return 2 * p
+
+
+def _mwu_exact_sf(u, n1, n2):
+    """
+    P(U >= u) under the null for samples of n1 and n2 without ties.
+    """
+    counts = _mwu_exact_counts(min(n1, n2), max(n1, n2))
+    return sum(counts[u:]) / math.comb(n1 + n2, n1)
+
+
+@lru_cache(maxsize=None)
+def _mwu_exact_counts(n1, n2):
+    """
+    Number of rankings with each U in 0..n1*n2: the coefficients of the Gaussian binomial
+    prod_{i<=n1} (1 - q^(n2+i)) / (1 - q^i), in exact integers.
+    """
+    c = np.zeros(n1 * n2 + 1, dtype=object)
+    c[0] = 1
+    for i in range(1, n1 + 1):
+        k = n2 + i
+        c[k:] = c[k:] - c[:-k]
+        # dividing by (1 - q^i) is a running sum over every i-th coefficient
+        for r in range(i):
+            c[r::i] = np.cumsum(c[r::i])
+    return tuple(c.tolist())
+
+
+if __name__ == "__main__":
+    # timing against evaluate_all ticker by ticker (equivalence is checked in tests/test_equivalence.py)
+    import time
+    import warnings
+    from baseline_store import open_baseline_store
+    from evaluate_all import evaluate_all
+    from price_panel import list_tickers
+    from run_double_top_pipeline import run_universe
+
+    warnings.filterwarnings('ignore')
+    dt_events = run_universe(list_tickers())[0]
+    baselines = open_baseline_store()
+    inputs = {}
+    for ticker, dt in dt_events.groupby('symbol', sort=False):
+        inputs[ticker] = (dt, baselines.random_events(ticker, n_events=len(dt)), baselines.ma_events(ticker))
+
+    start = time.perf_counter()
+    for dt, rand, ma in inputs.values():
+        evaluate_all(dt, rand, ma)
+    t_loop = time.perf_counter() - start
+
+    start = time.perf_counter()
+    returns = pd.concat([stack_returns({'double_top': dt, 'random': rand, 'ma_crossover': ma}, ticker)
+                         for ticker, (dt, rand, ma) in inputs.items()], ignore_index=True)
+    evaluate_grouped(returns, symbols=list(inputs))
+    t_grouped = time.perf_counter() - start
+    print(f"{len(inputs)} tickers: evaluate_all loop {t_loop:.2f} s, grouped {t_grouped:.2f} s")
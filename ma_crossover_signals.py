@@ -22,24 +22,20 @@ def ma_crossover_signals(df, short_window=20, long_window=50, horizons=(5, 20, 6
     horizons : tuple of int
         Forward-return horizons in trading days (default is (5, 20, 60))
     """
-    data = df.copy()
-    data['ma_short'] = data['Close'].rolling(short_window).mean()
-    data['ma_long'] = data['Close'].rolling(long_window).mean()
+    # rolling means of the close only; the full frame is never copied
+    close = df['Close']
+    ma_short = close.rolling(short_window).mean()
+    ma_long = close.rolling(long_window).mean()
 
     # short MA crossing from above to below long MA, indicating a downward turn in the market
-    
-    # begin ChatGPT section
-    prev = data.shift(1)
-    cond_prev = prev['ma_short'] > prev['ma_long']
-    cond_now = data['ma_short'] <= data['ma_long']
-    signals = data[cond_prev & cond_now].dropna()
-    # end ChatGPT section
+    cond_prev = ma_short.shift(1) > ma_long.shift(1)
+    cond_now = ma_short <= ma_long
+    signals = (cond_prev & cond_now & df.notna().all(axis=1)).to_numpy()
 
-    # for all determined ma crossovers, loop through price data to get date and priec
-    events = []
-    for t0, row in signals.iterrows():
-        events.append({'confirm_date': t0, 'confirm_price': row['Close']})
-    ma_df = pd.DataFrame(events)
+    # date and price of every crossover
+    ma_df = pd.DataFrame()
+    if signals.any():
+        ma_df = pd.DataFrame({'confirm_date': df.index[signals], 'confirm_price': close.to_numpy()[signals]})
 
     # compute forward returns for these ma crossover events
     ma_df = compute_forward_returns(df, ma_df, horizons=horizons)
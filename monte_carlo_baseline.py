@@ -0,0 +1,218 @@
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from baseline_store import open_baseline_store
+
+def draw_index_matrix(rng, n_valid, n_events, n_replicates, block=1024):
+    """
+    (n_replicates x n_events) matrix of anchor indices, each row drawn without replacement from range(n_valid).
+
+    Each row holds the positions of the n_events smallest of n_valid uniform random keys, i.e. a uniformly random
+    n_events-subset as with `rng.choice(..., replace=False)` (in arbitrary order; every statistic drawn from it is
+    order-free). Keys are generated `block` rows at a time, so the work is O(n_replicates x n_valid) with bounded
+    memory whatever the ratio of events to anchors.
+    """
+    n_events = min(n_events, n_valid)
+    idx = np.empty((n_replicates, n_events), dtype=np.int64)
+    if n_events == 0:
+        return idx
+    for start in range(0, n_replicates, block):
+        keys = rng.random((min(block, n_replicates - start), n_valid))
+        idx[start:start + len(keys)] = np.argpartition(keys, n_events - 1, axis=1)[:, :n_events]
+    return idx
+
+
+def mann_whitney_u(x, anchor_returns, idx):
+    """
+    Mann-Whitney U of `x` against every replicate sample anchor_returns[idx[k]], with ties counted as 1/2
+    (scipy's U1 for x).
+
+    U is a sum over the sample of each anchor's score (the number of x above it, plus half the ties), so the
+    scores are computed once for all anchors and U is a gather-and-sum of the index matrix.
+    """
+    x = np.sort(x[~np.isnan(x)])
+    below = np.searchsorted(x, anchor_returns, side='left')
+    not_above = np.searchsorted(x, anchor_returns, side='right')
+    score = (len(x) - not_above) + 0.5 * (not_above - below)
+    score[np.isnan(anchor_returns)] = 0.0
+    return score[idx].sum(axis=1)
+
+
+def monte_carlo_random_baseline(anchor_returns, event_returns, n_replicates=10_000, rng=None):
+    """
+    Null distributions of random-baseline statistics from many replicate random samples at once.
+
+    Each replicate draws as many random anchors as there are events (without replacement, like
+    `sample_random_events`); all replicates form one (n_replicates x n_events) index matrix whose
+    forward returns are gathered in a single indexing operation per horizon.
+
+    Parameters
+    ----------
+    anchor_returns : dict[str, np.ndarray]
+        Forward returns of every eligible random anchor, one array per 'ret_{h}d' column.
+    event_returns : dict[str, np.ndarray]
+        Forward returns of the events being compared (e.g. confirmed double tops), same keys.
+    n_replicates : int
+        Number of replicate random samples K (default is 10,000).
+    rng : np.random.Generator or None
+        Random stream for the draws.
+
+    Returns
+    -------
+    dict[str, dict[str, np.ndarray]]
+        Per return column, arrays of length K for 'mean', 'median', 'hit_ratio_neg' (share of negative
+        returns), 'mw_u' (Mann-Whitney U of the events against the replicate sample) and 'mw_auc' (U over
+        the number of (event, draw) pairs with finite returns, i.e. the probability an event beats a draw).
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    n_valid = len(next(iter(anchor_returns.values())))
+    n_events = len(next(iter(event_returns.values())))
+    idx = draw_index_matrix(rng, n_valid, n_events, n_replicates)
+
+    nulls = {}
+    for col, returns in anchor_returns.items():
+        samples = returns[idx]
+        if np.isnan(returns).any():
+            # horizons beyond the buffer leave some anchors without a return
+            with np.errstate(invalid='ignore'):
+                mean, median = np.nanmean(samples, axis=1), np.nanmedian(samples, axis=1)
+            n_finite = (~np.isnan(samples)).sum(axis=1)
+        else:
+            mean, median = samples.mean(axis=1), np.median(samples, axis=1)
+            n_finite = np.full(len(samples), samples.shape[1])
+        mw_u = mann_whitney_u(event_returns[col], returns, idx)
+        n_pairs = n_finite * np.count_nonzero(~np.isnan(event_returns[col]))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            nulls[col] = {
+                'mean': mean,
+                'median': median,
+                'hit_ratio_neg': (samples < 0).sum(axis=1) / np.maximum(n_finite, 1),
+                'mw_u': mw_u,
+                'mw_auc': np.where(n_pairs > 0, mw_u / n_pairs, np.nan),
+            }
+    return nulls
+
+
+def ticker_seed(seed, ticker):
+    """
+    SeedSequence of one ticker's replicate stream, derived from the root seed and the symbol itself.
+    """
+    return np.random.SeedSequence([seed, int.from_bytes(hashlib.sha256(ticker.encode()).digest()[:8], 'little')])
+
+
+def _summarize_null(event_returns, nulls, horizons, n_sample):
+    """
+    Observed event statistics against their Monte Carlo null, one record per horizon.
+    """
+    records = []
+    for h in horizons:
+        col = f'ret_{h}d'
+        x = event_returns[col][~np.isnan(event_returns[col])]
+        null = nulls[col]
+        observed = {'mean': x.mean(), 'median': np.median(x), 'hit_ratio_neg': (x < 0).mean()} if len(x) else {}
+        record = {'horizon': h, 'n_events': len(x), 'n_random': n_sample, 'n_replicates': len(null['mean'])}
+        for stat in ('mean', 'median', 'hit_ratio_neg'):
+            obs = observed.get(stat, np.nan)
+            dist = null[stat]
+            # two-sided Monte Carlo p-value of the observed statistic under the random null
+            extreme = np.abs(dist - np.nanmean(dist)) >= abs(obs - np.nanmean(dist))
+            record[f'obs_{stat}'] = obs
+            record[f'null_{stat}'] = np.nanmean(dist)
+            record[f'p_{stat}'] = (extreme.sum() + 1) / (len(dist) + 1) if len(x) else np.nan
+        # U over the (event, draw) pairs with finite returns is the probability an event return beats a random one
+        record['mw_u_median'] = np.median(null['mw_u'])
+        record['mw_auc_median'] = np.nanmedian(null['mw_auc']) if len(x) else np.nan
+        records.append(record)
+    return records
+
+
+def _monte_carlo_ticker(ticker, event_returns, seed_seq, n_replicates, horizons):
+    """
+    Worker for `monte_carlo_universe`: the ticker's nulls and summary records.
+    """
+    anchors = open_baseline_store().eligible_anchors(ticker, horizons=horizons)
+    cols = [f'ret_{h}d' for h in horizons]
+    if len(anchors) == 0 or len(next(iter(event_returns.values()))) == 0:
+        return ticker, None, []
+
+    anchor_returns = {c: anchors[c].to_numpy() for c in cols}
+    nulls = monte_carlo_random_baseline(anchor_returns, event_returns, n_replicates, np.random.default_rng(seed_seq))
+    n_sample = min(len(next(iter(event_returns.values()))), len(anchors))
+    records = _summarize_null(event_returns, nulls, horizons, n_sample)
+    for r in records:
+        r['symbol'] = ticker
+    return ticker, nulls, records
+
+
+def monte_carlo_universe(events, n_replicates=10_000, horizons=(5, 20, 60), seed=42, tickers=None,
+                         workers=None, return_nulls=False):
+    """
+    Monte Carlo random baselines for every ticker's events.
+
+    Each ticker's replicate stream is seeded from (seed, its symbol) by `ticker_seed`, so its draws do not depend
+    on which other tickers are in the run, and serial and parallel runs match.
+
+    Parameters
+    ----------
+    events : pd.DataFrame
+        Events with forward returns and a 'symbol' column, e.g. dt_events from `run_universe`.
+    n_replicates : int
+        Replicate random samples per ticker (default is 10,000).
+    horizons : tuple of int
+        Forward-return horizons in trading days (default is (5, 20, 60)).
+    seed : int
+        Root seed (default is 42).
+    tickers : list of str or None
+        Only these tickers (default is every symbol in events).
+    workers : int or None
+        Number of worker processes; None uses every core, 1 runs serially in this process.
+    return_nulls : bool
+        Also return the full null arrays per ticker (K floats per statistic and horizon).
+
+    Returns
+    -------
+    summary : pd.DataFrame
+        One row per (symbol, horizon): observed mean, median and negative hit ratio of the events, the null
+        means, two-sided Monte Carlo p-values, and the median Mann-Whitney U (also as a probability).
+    nulls : dict[str, dict], only when return_nulls
+        Per ticker, the `monte_carlo_random_baseline` output.
+    """
+    cols = [f'ret_{h}d' for h in horizons]
+    by_symbol = {s: g for s, g in events.groupby('symbol', observed=True)} if not events.empty else {}
+    tickers = list(tickers) if tickers is not None else list(by_symbol)
+
+    jobs = [(t, {c: by_symbol[t][c].to_numpy(dtype=float) for c in cols}, ticker_seed(seed, t))
+            for t in tickers if t in by_symbol]
+    args = (*zip(*jobs), [n_replicates] * len(jobs), [tuple(horizons)] * len(jobs)) if jobs else ()
+
+    if not jobs:
+        results = []
+    elif workers == 1:
+        results = list(map(_monte_carlo_ticker, *args))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_monte_carlo_ticker, *args, chunksize=8))
+
+    summary = pd.DataFrame([r for _, _, records in results for r in records])
+    if return_nulls:
+        return summary, {t: nulls for t, nulls, _ in results if nulls is not None}
+    return summary
+
+
+if __name__ == "__main__":
+    # timing and per-horizon summary (draws and seeding are checked in tests/test_monte_carlo_baseline.py)
+    import time
+    from price_panel import list_tickers
+    from run_double_top_pipeline import run_universe
+
+    tickers = list_tickers()
+    dt_events = run_universe(tickers)[0]
+
+    start = time.perf_counter()
+    summary = monte_carlo_universe(dt_events, n_replicates=10_000, tickers=tickers)
+    print(f"K=10,000 random baselines for {summary['symbol'].nunique()} tickers in {time.perf_counter() - start:.1f} s")
+
+    print(summary.groupby('horizon')[['p_mean', 'p_median', 'p_hit_ratio_neg', 'mw_auc_median']].median())
@@ -0,0 +1,197 @@
+import numpy as np
+import pandas as pd
+
+from find_local_extrema import centered_rolling_extreme
+from price_panel import open_price_panel, PANEL_DIR
+
+def _checked_panel(panel=None, tickers=None):
+    """
+    The panel (default: the one in 'sp500/panel'), after checking that none of `tickers` (default: all) has a
+    source CSV that changed since ingest.
+
+    The panel functions work on whole (tickers x dates) matrices and cannot swap one ticker's row for its CSV
+    the way `load_price_data` does, so a stale panel is an error rather than a silent wrong answer.
+    """
+    panel = panel if panel is not None else open_price_panel(PANEL_DIR)
+    stale = [t for t in (panel.tickers if tickers is None else tickers) if panel.is_stale(t)]
+    if stale:
+        raise ValueError(f"{len(stale)} tickers changed since the panel in {panel.panel_dir} was ingested "
+                         f"(e.g. {stale[:5]}); re-run ingest_price_panel")
+    return panel
+
+
+def _panel_events(panel, mask):
+    """
+    Long (symbol, position) table of the True cells of a (tickers x dates) mask.
+
+    Positions are per-ticker, counted from each ticker's first bar, matching the integer index of `load_price_data`.
+    """
+    rows, cols = np.nonzero(mask)
+    return rows, cols, pd.DataFrame({
+        'symbol': pd.Categorical.from_codes(rows, categories=panel.tickers),
+        'position': cols - panel.starts[rows],
+    })
+
+
+def panel_local_extrema(panel=None, window=3):
+    """
+    `find_local_extrema` for every ticker at once on the (tickers x dates) panel.
+
+    Raises ValueError when a ticker's source CSV changed since the panel was ingested.
+
+    Tickers that listed later are NaN before their first bar, which never counts as an extremum,
+    so each row matches the per-ticker result.
+
+    Parameters
+    ----------
+    panel : PricePanel or None
+        Ingested price panel (default is the panel in 'sp500/panel').
+    window : int
+        Window size for detecting local peaks and troughs (default is 3). Measured in days.
+
+    Returns
+    -------
+    local_high, local_low : np.ndarray
+        Boolean (tickers x dates) masks.
+    extrema : pd.DataFrame
+        Long table with 'symbol', 'position', 'kind' ('high' or 'low') and 'price', ordered by ticker then position.
+    """
+    panel = _checked_panel(panel)
+    highs = np.asarray(panel.field('High'))
+    lows = np.asarray(panel.field('Low'))
+
+    local_high = highs == centered_rolling_extreme(highs, window, kind='max')
+    local_low = lows == centered_rolling_extreme(lows, window, kind='min')
+
+    r, c, high_events = _panel_events(panel, local_high)
+    high_events['kind'] = 'high'
+    high_events['price'] = highs[r, c]
+    r, c, low_events = _panel_events(panel, local_low)
+    low_events['kind'] = 'low'
+    low_events['price'] = lows[r, c]
+
+    extrema = pd.concat([high_events, low_events], ignore_index=True)
+    extrema = extrema.sort_values(['symbol', 'position'], kind='stable').reset_index(drop=True)
+    return local_high, local_low, extrema
+
+
+def panel_forward_returns(panel, rows, cols, horizons=(5, 20, 60)):
+    """
+    Forward returns for events given as (ticker row, date column) cells of the panel, in one 2D gather.
+
+    Returns are simple percentage returns: (Close[t+H] / Close[t]) - 1; horizons past the last date give NaN.
+
+    Parameters
+    ----------
+    panel : PricePanel
+        Ingested price panel.
+    rows, cols : np.ndarray
+        Ticker rows and shared-date-axis columns of the event anchors.
+    horizons : tuple of int
+        Forward-return horizons in trading days.
+
+    Returns
+    -------
+    dict[str, np.ndarray]
+        One 'ret_{h}d' array per horizon, aligned with rows/cols.
+    """
+    close = np.asarray(panel.field('Close'))
+    horizons = np.asarray(horizons, dtype=np.int64)
+    rows = np.asarray(rows, dtype=np.int64)
+    cols = np.asarray(cols, dtype=np.int64)
+
+    fwd = cols[:, None] + horizons[None, :]
+    valid = fwd < close.shape[1]
+    price0 = close[rows, cols][:, None]
+    price1 = close[rows[:, None], np.where(valid, fwd, 0)]
+    rets = np.where(valid, price1 / price0 - 1.0, np.nan)
+    return {f'ret_{h}d': rets[:, k] for k, h in enumerate(horizons)}
+
+
+def panel_events_forward_returns(panel, events_df, predicted=False, horizons=(5, 20, 60)):
+    """
+    `compute_forward_returns` for a long, multi-ticker events table in one pass.
+
+    Raises ValueError when a ticker's source CSV changed since the panel was ingested.
+
+    Parameters
+    ----------
+    panel : PricePanel
+        Ingested price panel.
+    events_df : pd.DataFrame
+        Events with a 'symbol' column and per-ticker 'confirm_date' positions (or 'peak2_pos' when predicted).
+    predicted : bool
+        If True, returns are measured from the first day after peak 2, as in `compute_forward_returns`.
+    horizons : tuple of int
+        Forward-return horizons in trading days.
+    """
+    _checked_panel(panel, events_df['symbol'].unique())
+    events_df = events_df.copy()
+    rows = np.array([panel.row[s] for s in events_df['symbol']], dtype=np.int64)
+    anchor = events_df['peak2_pos'] + 1 if predicted else events_df['confirm_date']
+    cols = panel.starts[rows] + anchor.to_numpy().astype(np.int64)
+
+    # anchors past the end of the ticker's history give NaN, like a missing label in compute_forward_returns
+    in_range = cols < len(panel.dates)
+    rets = panel_forward_returns(panel, rows[in_range], cols[in_range], horizons)
+    for col, values in rets.items():
+        full = np.full(len(events_df), np.nan)
+        full[in_range] = values
+        events_df[col] = full
+    return events_df
+
+
+def panel_ma_crossover_signals(panel=None, short_window=20, long_window=50, horizons=(5, 20, 60)):
+    """
+    `ma_crossover_signals` for every ticker at once on the (tickers x dates) panel.
+
+    Raises ValueError when a ticker's source CSV changed since the panel was ingested.
+
+    Parameters
+    ----------
+    panel : PricePanel or None
+        Ingested price panel (default is the panel in 'sp500/panel').
+    short_window : int
+        Window size for the short-term moving average (default is 20 days).
+    long_window : int
+        Window size for the long-term moving average (default is 50 days).
+    horizons : tuple of int
+        Forward-return horizons in trading days (default is (5, 20, 60))
+
+    Returns
+    -------
+    pd.DataFrame
+        Long table of crossover events with 'symbol', 'confirm_date' (per-ticker position), 'confirm_price',
+        one 'ret_{h}d' column per horizon and 'type', ordered by ticker then position.
+    """
+    panel = _checked_panel(panel)
+    close = np.asarray(panel.field('Close'))
+
+    # pandas rolling on the transposed panel runs the same per-column algorithm as the per-ticker version;
+    # the NaN prefix of later listings never enters a full window
+    closes = pd.DataFrame(close.T)
+    ma_short = closes.rolling(short_window).mean().to_numpy().T
+    ma_long = closes.rolling(long_window).mean().to_numpy().T
+
+    # short MA crossing from above to below long MA, indicating a downward turn in the market
+    cross = np.zeros(close.shape, dtype=bool)
+    cross[:, 1:] = (ma_short[:, :-1] > ma_long[:, :-1]) & (ma_short[:, 1:] <= ma_long[:, 1:])
+
+    rows, cols, ma_df = _panel_events(panel, cross)
+    ma_df = ma_df.rename(columns={'position': 'confirm_date'})
+    ma_df['confirm_price'] = close[rows, cols]
+    for col, values in panel_forward_returns(panel, rows, cols, horizons).items():
+        ma_df[col] = values
+    ma_df['type'] = 'ma_crossover'
+    return ma_df
+
+
+if __name__ == "__main__":
+    # timing (equivalence with the per-ticker versions is checked in tests/test_equivalence.py)
+    import time
+
+    panel = open_price_panel(PANEL_DIR)
+    start = time.perf_counter()
+    local_high, local_low, extrema = panel_local_extrema(panel, window=3)
+    ma_events = panel_ma_crossover_signals(panel)
+    print(f"panel extrema + MA crossovers for {len(panel)} tickers in {time.perf_counter() - start:.3f} s")
@@ -2,15 +2,25 @@
 # I wanted to ensure the statistical significance of my model's findings
 # Due to the importance of this test for my results, I wanted to ensure it was done correctly
 
+import hashlib
+import os
+from contextlib import nullcontext
+
 import numpy as np
+import pandas as pd
+from scipy import stats
 
-from sklearn.model_selection import train_test_split
 from sklearn.base import clone
 from sklearn.utils import shuffle
+from joblib import Parallel, delayed
+
+from xgboost import XGBModel
 
-from xgboost import XGBClassifier
+from compute_all_metrics import compute_all_metrics, compute_all_metrics_batch
+from training_matrices import TrainingMatrices, train_booster
 
-from compute_all_metrics import compute_all_metrics
+HIGHER_IS_BETTER = {"accuracy", "precision", "recall", "f1", "roc_auc", "pr_auc"}
+LOWER_IS_BETTER = {"brier"}
 
 def permutation_test_all_metrics(
     base_model,
@@ -19,6 +29,13 @@ def permutation_test_all_metrics(
     X_test,
     y_test,
     n_permutations=500,
+    n_jobs=1,
+    sequential=False,
+    alpha=0.05,
+    confidence=0.999,
+    batch_size=50,
+    checkpoint=None,
+    matrices=None,
 ):
     """
     Run a permutation test for multiple metrics at once.
@@ -30,71 +47,181 @@ def permutation_test_all_metrics(
     X_train, y_train, X_test, y_test : pd.DataFrame();
         pre-split labeled events, respecting dates of events
     n_permutations : int
-        Number of label-shuffle runs.
+        Number of label-shuffle runs (the maximum when `sequential` is True).
+    n_jobs : int
+        Number of worker processes for the refits; -1 uses every core. The model's own thread count
+        (e.g. XGBoost `n_jobs`) is reduced so workers x threads does not exceed the core count.
+    sequential : bool
+        If True, stop early once every metric's p-value is clearly above or below `alpha`
+        (sequential Monte Carlo testing in the style of Besag & Clifford, 1991).
+    alpha : float
+        Significance level the sequential stopping rule decides against (default is 0.05).
+    confidence : float
+        Confidence of the Clopper-Pearson bound on each p-value used by the stopping rule (default is 0.999).
+    batch_size : int
+        Permutations run between stopping checks and checkpoint writes (default is 50).
+    checkpoint : str or None
+        Path of an .npz file holding the null distributions ('.npz' is appended if missing, as `np.savez` does).
+        An existing checkpoint for the same data and model is resumed, so a run can be extended from 500 to 5000
+        permutations without repeating the first 500; one with more than `n_permutations` is cut to the first
+        `n_permutations`.
+    matrices : TrainingMatrices or None
+        Prebuilt quantized matrices of X_train for XGBoost models, used for the real fit and serial permutations.
+        If None, one is built here. With n_jobs > 1 every worker quantizes X_train once for the whole test and
+        reuses it across batches; every permutation only swaps the labels.
 
     Returns
     -------
     metrics_real : dict
         Metric values for the real (unshuffled) labels.
     metrics_null : dict[str, np.ndarray]
-        Null distributions for each metric (length = n_permutations).
+        Null distributions for each metric (length = number of permutations run).
     p_values : dict
         p-value for each metric, based on the null distribution.
     """
-    
+
     # 1. Train REAL model
-    model_real = clone(base_model)
-    model_real.fit(X_train, y_train)
-    y_prob_real = model_real.predict_proba(X_test)[:, 1]
+    if isinstance(base_model, XGBModel):
+        matrices = matrices if matrices is not None else TrainingMatrices(X_train, y_train)
+        y_prob_real = train_booster(base_model, matrices.full()).inplace_predict(X_test)
+    else:
+        model_real = clone(base_model)
+        model_real.fit(X_train, y_train)
+        y_prob_real = model_real.predict_proba(X_test)[:, 1]
 
     metrics_real = compute_all_metrics(y_test, y_prob_real)
 
-    # 2. Prepare storage for null distributions
-    metrics_null = {name: np.zeros(n_permutations) for name in metrics_real.keys()}
+    # 2. Prepare storage for null distributions, resuming from a checkpoint if one matches
+    fingerprint = _fingerprint(base_model, X_train, y_train, X_test, y_test)
+    metrics_null = {name: np.zeros(0) for name in metrics_real.keys()}
+    if checkpoint is not None:
+        # np.savez writes 'name.npz' for 'name'; look for the file it actually writes
+        checkpoint = os.fspath(checkpoint)
+        checkpoint = checkpoint if checkpoint.endswith(".npz") else checkpoint + ".npz"
+    if checkpoint is not None and os.path.exists(checkpoint):
+        with np.load(checkpoint) as saved:
+            if str(saved["fingerprint"]) != fingerprint:
+                raise ValueError(f"Checkpoint {checkpoint} was written for different data or model parameters")
+            metrics_null = {name: saved[name][:n_permutations] for name in metrics_real.keys()}
+    done = len(next(iter(metrics_null.values())))
+
+    # never run more model threads than cores across all workers
+    n_workers = os.cpu_count() if n_jobs == -1 else max(1, n_jobs)
+    if n_workers > 1 and "n_jobs" in base_model.get_params():
+        base_model = clone(base_model).set_params(n_jobs=max(1, (os.cpu_count() or 1) // n_workers))
+
+    # 3. Permutation loop, in batches so we can stop early and checkpoint; one Parallel context keeps the
+    #    same worker processes (and their quantized X_train) for every batch
+    with (Parallel(n_jobs=n_workers) if n_workers > 1 else nullcontext()) as parallel:
+        while done < n_permutations:
+            if sequential and done > 0 and _all_decided(metrics_real, metrics_null, alpha, confidence):
+                break
+
+            seeds = np.arange(done, min(done + batch_size, n_permutations))
+            if n_workers > 1:
+                # one chunk of seeds per worker; workers keep their matrices for X_train between batches
+                chunks = parallel(
+                    delayed(_permuted_probs)(base_model, X_train, y_train, X_test, chunk, key=fingerprint)
+                    for chunk in np.array_split(seeds, min(n_workers, len(seeds))))
+                probs = [p for chunk in chunks for p in chunk]
+            else:
+                probs = _permuted_probs(base_model, X_train, y_train, X_test, seeds, matrices)
+
+            # score the whole batch at once on the SAME test set, then store each metric
+            batch = compute_all_metrics_batch(y_test, np.column_stack(probs))
+            for name in metrics_null.keys():
+                metrics_null[name] = np.concatenate([metrics_null[name], batch[name]])
+            done += len(probs)
+
+            if checkpoint is not None:
+                np.savez(checkpoint, fingerprint=fingerprint, **metrics_null)
+
+    # 4. Compute p-values for each metric over the permutations actually run
+    #    For "higher is better": p = P(null >= real)
+    #    For "lower is better" (Brier): p = P(null <= real)
+    n_run = len(next(iter(metrics_null.values())))
+    counts = _exceedances(metrics_real, metrics_null)
+
+    # Preventing hard zero for p-values
+    p_values = {k: ((float(v) + 1) / (n_run + 1)) for k, v in counts.items()}
+
 
-    # 3. Permutation loop
-    for i in range(n_permutations):
+    return metrics_real, metrics_null, p_values
+
+
+def _permuted_probs(base_model, X_train, y_train, X_test, seeds, matrices=None, key=None):
+    """
+    Refit on labels shuffled with each seed and predict the test set; seeds make serial and parallel runs identical.
+
+    In a worker, `key` identifies the test so its quantized X_train is built on the first batch and reused after.
+    """
+    if isinstance(base_model, XGBModel) and matrices is None:
+        matrices = _worker_matrices(key, X_train, y_train) if key is not None else TrainingMatrices(X_train, y_train)
+
+    probs = []
+    for seed in seeds:
         # Shuffle the training labels
-        y_perm = shuffle(y_train, random_state=i)
+        y_perm = shuffle(y_train, random_state=int(seed))
 
-        # Refit model on permuted labels
-        model_perm = clone(base_model)
-        model_perm.fit(X_train, y_perm)
+        # Refit model on permuted labels and predict on the SAME test set
+        if matrices is not None:
+            probs.append(train_booster(base_model, matrices.full(y_perm)).inplace_predict(X_test))
+        else:
+            model_perm = clone(base_model)
+            model_perm.fit(X_train, y_perm)
+            probs.append(model_perm.predict_proba(X_test)[:, 1])
+    return probs
 
-        # Predict on the SAME test set
-        y_prob_perm = model_perm.predict_proba(X_test)[:, 1]
-        m_perm = compute_all_metrics(y_test, y_prob_perm)
 
-        # Store each metric
-        for name in metrics_null.keys():
-            metrics_null[name][i] = m_perm[name]
+_worker_state = {}
 
+def _worker_matrices(key, X_train, y_train):
+    """
+    TrainingMatrices of X_train for this worker process, kept for the latest test key only.
+    """
+    if _worker_state.get('key') != key:
+        _worker_state.clear()
+        _worker_state.update(key=key, matrices=TrainingMatrices(X_train, y_train))
+    return _worker_state['matrices']
 
-    # 4. Compute p-values for each metric
-    #    For "higher is better": p = P(null >= real)
-    #    For "lower is better" (Brier): p = P(null <= real)
-    higher_is_better = {"accuracy", "precision", "recall", "f1", "roc_auc", "pr_auc"}
-    lower_is_better = {"brier"}
 
-    p_values = {}
+def _exceedances(metrics_real, metrics_null):
+    """
+    Number of null values at least as good as the real value, per metric.
+    """
+    counts = {}
     for name, real_value in metrics_real.items():
         null_vals = metrics_null[name]
 
-        if name in higher_is_better:
-            p = np.mean(null_vals >= real_value)
-        elif name in lower_is_better:
-            p = np.mean(null_vals <= real_value)
+        if name in LOWER_IS_BETTER:
+            counts[name] = np.sum(null_vals <= real_value)
         else:
             # default to higher_is_better, but you can adjust
-            p = np.mean(null_vals >= real_value)
+            counts[name] = np.sum(null_vals >= real_value)
+    return counts
 
-        p_values[name] = p
-
-    # Preventing hard zero for p-values
-    p_values = {k: ((float(v) + 1) / (n_permutations + 1))  for k, v in p_values.items()}
-
-
-    return metrics_real, metrics_null, p_values
 
+def _all_decided(metrics_real, metrics_null, alpha, confidence):
+    """
+    True when the Clopper-Pearson interval of every metric's p-value lies entirely above or below alpha.
+    """
+    n_run = len(next(iter(metrics_null.values())))
+    tail = (1 - confidence) / 2
+    for g in _exceedances(metrics_real, metrics_null).values():
+        lower = stats.beta.ppf(tail, g, n_run - g + 1) if g > 0 else 0.0
+        upper = stats.beta.ppf(1 - tail, g + 1, n_run - g) if g < n_run else 1.0
+        if lower <= alpha <= upper:
+            return False
+    return True
 
 
+def _fingerprint(base_model, X_train, y_train, X_test, y_test):
+    """
+    Hash of the data and model parameters, so a checkpoint is only resumed for the same experiment.
+    """
+    h = hashlib.sha256()
+    for obj in (X_train, y_train, X_test, y_test):
+        h.update(pd.util.hash_pandas_object(pd.DataFrame(obj), index=True).values.tobytes())
+    params = {k: v for k, v in base_model.get_params().items() if k != "n_jobs"}
+    h.update(repr(sorted(params.items())).encode())
+    return h.hexdigest()
@@ -1,8 +1,56 @@
 import numpy as np
 import pandas as pd
 import mplfinance as mpf
-from run_double_top_pipeline import run_double_top_pipeline
 from pos_to_date import pos_to_date
+from price_panel import load_price_data
+
+# mplfinance warns above 599 bars; longer views are downsampled to at most this many candles
+MAX_BARS = 500
+
+def downsample_ohlc(df, max_bars=MAX_BARS):
+    """
+    Merge runs of consecutive bars so that at most max_bars candles remain, preserving OHLC semantics.
+
+    Each candle of the result covers k = ceil(len(df) / max_bars) bars: the first Open, the highest High,
+    the lowest Low, the last Close and the summed Volume, dated at its first bar. Bar position p of df falls
+    in candle p // k.
+
+    Returns
+    -------
+    df_down : pd.DataFrame
+        The merged candles (df itself when it is short enough).
+    k : int
+        Bars per candle.
+    """
+    n = len(df)
+    if max_bars is None or n <= max_bars:
+        return df, 1
+    k = -(-n // max_bars)
+    starts = np.arange(0, n, k)
+    ends = np.minimum(starts + k, n) - 1
+    data = {
+        'Open': df['Open'].to_numpy()[starts],
+        'High': np.maximum.reduceat(df['High'].to_numpy(), starts),
+        'Low': np.minimum.reduceat(df['Low'].to_numpy(), starts),
+        'Close': df['Close'].to_numpy()[ends],
+    }
+    if 'Volume' in df:
+        data['Volume'] = np.add.reduceat(df['Volume'].to_numpy(), starts)
+    return pd.DataFrame(data, index=df.index[starts]), k
+
+
+def marker_values(n_bars, pos, prices, scale=1.0):
+    """
+    Marker series for `mpf.make_addplot`: NaN everywhere except prices * scale at bar positions pos.
+
+    Positions outside [0, n_bars) are skipped, so events can be passed unfiltered.
+    """
+    values = np.full(n_bars, np.nan)
+    pos = np.asarray(pos)
+    ok = (pos >= 0) & (pos < n_bars)
+    values[pos[ok]] = np.asarray(prices, dtype=float)[ok] * scale
+    return values
+
 
 def plot_candles(
     df,
@@ -12,7 +60,8 @@ def plot_candles(
     date_range=None,
     fig_size=(8, 4),
     save_path=None,
-    addplot_size = [200,200,180,240]
+    addplot_size = [200,200,180,240],
+    max_bars=MAX_BARS
 ):
     """
     Plot a candlestick chart and overlay Double Top peaks, troughs, and confirmations.
@@ -48,6 +97,10 @@ def plot_candles(
     save_path : str or None
         If provided, saves the figure to this path.
 
+    max_bars : int or None
+        Views longer than this are drawn with OHLC-downsampled candles (see downsample_ohlc), so full-history
+        charts render in bounded time (moving averages are then taken over the merged candles); None draws every bar.
+
     Assists in visualizing detected Double Top patterns on candlestick charts.
     
     Function originally by ChatGPT, modified by me to make sure that DTs were being detected correctly. 
@@ -78,34 +131,23 @@ def plot_candles(
         print("No data in selected date range.")
         return
 
-    # Initialize marker series (index aligned with df_plot)
-    idx = df_plot.index
-    peak1_series = pd.Series(np.nan, index=idx)
-    peak2_series = pd.Series(np.nan, index=idx)
-    trough_series = pd.Series(np.nan, index=idx)
-    confirm_series = pd.Series(np.nan, index=idx)
-
-    # Fill marker positions from dt_events
-    for _, row in events_plot.iterrows():
-        # Peaks plotted slightly above the high for visibility
-        for col, series in [("peak1_date", peak1_series),
-                            ("peak2_date", peak2_series)]:
-            d = row[col]
-            if d in df_plot.index:
-                price = df_plot.loc[d, "High"]
-                series.loc[d] = price * 1.01  # 1% above high
-
-        # Trough plotted slightly below the low
-        d_trough = row["trough_date"]
-        if d_trough in df_plot.index:
-            price = df_plot.loc[d_trough, "Low"]
-            trough_series.loc[d_trough] = price * 0.99  # 1% below low
-
-        # Confirmation plotted slightly above the close
-        d_conf = row["confirm_date"]
-        if d_conf in df_plot.index:
-            price = df_plot.loc[d_conf, "Close"]
-            confirm_series.loc[d_conf] = price * 1.01  # 1% above close
+    # Bar positions of every event point, resolved in one lookup per column
+    pos = {col: df_plot.index.get_indexer(events_plot[col]) for col in ["peak1_date", "peak2_date", "trough_date", "confirm_date"]}
+
+    # Long views are merged into at most max_bars candles; markers move to the candle holding their bar
+    df_plot, k = downsample_ohlc(df_plot, max_bars)
+    pos = {col: np.where(p >= 0, p // k, -1) for col, p in pos.items()}
+    n_bars = len(df_plot)
+    high, low, close = (df_plot[c].to_numpy() for c in ("High", "Low", "Close"))
+
+    def at(p, values):
+        return values[np.clip(p, 0, n_bars - 1)]
+
+    # Peaks plotted 1% above the high, the trough 1% below the low, the confirmation 1% above the close
+    peak1_series = pd.Series(marker_values(n_bars, pos["peak1_date"], at(pos["peak1_date"], high), 1.01), index=df_plot.index)
+    peak2_series = pd.Series(marker_values(n_bars, pos["peak2_date"], at(pos["peak2_date"], high), 1.01), index=df_plot.index)
+    trough_series = pd.Series(marker_values(n_bars, pos["trough_date"], at(pos["trough_date"], low), 0.99), index=df_plot.index)
+    confirm_series = pd.Series(marker_values(n_bars, pos["confirm_date"], at(pos["confirm_date"], close), 1.01), index=df_plot.index)
 
     # Build addplots (big, bold markers so they stand out)
     apds = []
@@ -177,26 +219,17 @@ def plot_candles(
         figsize=fig_size,
         tight_layout=True,
         savefig=save_path,
-        warn_too_much_data=1000000000
+        warn_too_much_data=n_bars + 1
     )
 
 if __name__ == "__main__":
-    df_aapl = pd.read_csv("./sp500/sp500/AAPL.csv", 
-                 parse_dates=["Date"], 
-                 index_col="Date",
-                 dtype={
-                    "Open": float,
-                    "High": float,
-                    "Low": float,
-                    "Close": float,
-                    "Volume": float
-                },
-                header = 0,
-                skiprows=[1]
-    )
+    from stage_graph import DEFAULT_RUN_PARAMS, double_top_graph
+
+    df_aapl = load_price_data("AAPL", date_index=True)
 
-    ind_return_summary_df, comp_return_summary_df = pd.DataFrame(), pd.DataFrame()
-    dt_events, rand_events, ma_events, summary_df, text_summary, full_summary = run_double_top_pipeline('AAPL',ind_full_summary=ind_return_summary_df, comp_full_summary=comp_return_summary_df)
+    # only the detection stages, served from the stage cache when they have run before
+    params = {**DEFAULT_RUN_PARAMS, 'horizons': tuple(DEFAULT_RUN_PARAMS['horizons']), 'ticker': 'AAPL'}
+    dt_events = double_top_graph().run(['dt_events'], params)[0]['dt_events']
     plot_candles(df_aapl, dt_events, mav=(20,50), fig_size=(12, 6), save_path="aapl_chart.png", addplot_size = [50,50,45,60])
     plot_candles(df_aapl, dt_events, mav=None, date_range=('2020-Dec-16', '2021-Jun-16'), save_path="aapl_chart_zoomed.png")
 
@@ -5,20 +5,20 @@ from detect_double_tops import detect_double_tops
 from confirm_double_tops import confirm_double_tops
 from pos_to_date import pos_to_date
 from label_events import label_events
-from xgboost import XGBClassifier
-from sklearn.model_selection import RandomizedSearchCV
-import joblib
-
+from engineer_features import engineer_features, FEATURES
+from event_store import save_events, store_path
+from feature_store import add_technical_features, TECHNICAL_FEATURES
+from price_panel import load_price_data
 from walk_forward_split import WalkForwardSplit
-from evaluate_classifier import evaluate_classifier
-from permutation_test_all_metrics import permutation_test_all_metrics
 
 
 def prediction_pipeline(
     tickers: list,
     param_dict: dict = {'peak_window': 3, 'peak_tolerance': 0.01,
                         'min_peak_gap': 15, 'max_peak_gap': 30,
-                        'min_trough_drop': 0.03, 'require_lower_second_vol': True}
+                        'min_trough_drop': 0.03, 'require_lower_second_vol': True},
+    search: str = "random",
+    technical_features: bool = False
 ):
     """
     Pipeline function to detect and label double top events across multiple tickers.
@@ -31,24 +31,28 @@ def prediction_pipeline(
         list of ticker symbols to process
     param_dict: dict
         optional parameter to adjust double top detection settings for further testing
+    search: str
+        "random" for exhaustive RandomizedSearchCV, or "halving" for successive halving with boosting rounds
+        as the resource (see SuccessiveHalvingSearch), which drops weak configurations on the earliest folds
+    technical_features: bool
+        If True, also train on the per-bar technical features at the second peak (RSI, ATR, volatility, volume
+        z-score, MA distances, returns into the peak; see feature_store.py). The saved model and BatchScorer use
+        the geometric features only, so this is off by default.
     """
-    # Step 1: initialize an empty DataFrame to hold all labeled data
-    labeled_data = pd.DataFrame()
+    # model stack imported on use, so importing this module for its helpers stays light
+    from xgboost import XGBClassifier
+    from sklearn.model_selection import RandomizedSearchCV
+    from successive_halving_search import SuccessiveHalvingSearch
+    from training_matrices import TrainingMatrices
+    from evaluate_classifier import evaluate_classifier
+    from permutation_test_all_metrics import permutation_test_all_metrics
+
+    # Step 1: initialize a list to collect each ticker's labeled events (concatenated once below)
+    labeled_data = []
 
     # Step 2: iterate over each ticker and process data to find candidate events and confirmed double tops
     for ticker in tickers:
-        df = pd.read_csv(f"sp500/sp500/{ticker}.csv", 
-                     header=0, 
-                     skiprows=[1],
-                     dtype={
-                        "Date": str,
-                        "Open": float,
-                        "High": float,
-                        "Low": float,
-                        "Close": float,
-                        "Volume": float
-                        }
-            )
+        df = load_price_data(ticker)
         
         dt_candidates = detect_double_tops(df, 
                                            peak_window=param_dict['peak_window'], 
@@ -71,25 +75,15 @@ def prediction_pipeline(
         all_events = pos_to_date(df, all_events, confirm_pos=False)
         all_events['Ticker'] = ticker
 
-        labeled_data = pd.concat([labeled_data, all_events])
+        labeled_data.append(all_events)
 
-    # Step 3: feature engineering 
-    # Peak Height Difference (raw and pct)
-    labeled_data['peak_height_diff'] = labeled_data['peak2_price'] - labeled_data['peak1_price']
-    labeled_data['peak_height_diff_pct'] = labeled_data['peak_height_diff'] / labeled_data['peak1_price']
+    labeled_data = pd.concat(labeled_data) if labeled_data else pd.DataFrame()
 
-    # Retracement Depth (relative to first and second peak)
-    labeled_data['retracement_depth1'] = (labeled_data['peak1_price'] - labeled_data['trough_price']) / labeled_data['peak1_price']
-    labeled_data['retracement_depth2'] = (labeled_data['peak2_price'] - labeled_data['trough_price']) / labeled_data['peak2_price']
-
-    # Raw Volume Difference
-    labeled_data['volume_diff'] = labeled_data['vol1'] - labeled_data['vol2']
-
-    # Time Intervals (days between peaks and troughs)
-    labeled_data['peak1_to_trough'] = (labeled_data['trough_pos'] - labeled_data['peak1_pos'])
-    labeled_data['trough_to_peak2'] = (labeled_data['peak2_pos'] - labeled_data['trough_pos'])
-    
-    # Momentum Indicators (need to add to initial dataset; opportunity for future improvement)
+    # Step 3: feature engineering (peak height difference, retracement depth, volume difference, time intervals)
+    labeled_data = engineer_features(labeled_data)
+    if technical_features:
+        # point-in-time technical features at peak 2, from the incremental per-ticker feature store
+        labeled_data = add_technical_features(labeled_data)
 
     # Step 4: Sort by peak2_date to prevent leakage
     labeled_data = labeled_data.sort_values(by='peak2_date', ascending=True).reset_index(drop=True)
@@ -104,10 +98,7 @@ def prediction_pipeline(
         # However, this package is not compatible with Python 3.12, so I implemented a basic time-based split
         # Source: López de Prado (2018), Advances in Financial Machine Learning, Chapter 7: Purged K-Fold CV (Wiley).
 
-    features = ['peak1_price', 'peak2_price', 'trough_price', 'peak_gap_days', 'vol1',
-                'vol2', 'vol2_vol1_ratio', 'peak_height_diff', 'peak_height_diff_pct', 
-                'retracement_depth1', 'retracement_depth2', 'volume_diff', 
-                'peak1_to_trough', 'trough_to_peak2']
+    features = FEATURES + TECHNICAL_FEATURES if technical_features else FEATURES
     
     X_train = train_data[features]
     y_train = train_data['label']
@@ -115,6 +106,9 @@ def prediction_pipeline(
 
     splitter = WalkForwardSplit(n_splits=5, times=times)
 
+    # quantized XGBoost matrices per fold and for the full train set, shared by the search, permutation test and evaluation
+    matrices = TrainingMatrices(X_train, y_train, cv=splitter)
+
     model = XGBClassifier(
         objective="binary:logistic",
         n_jobs=-1,
@@ -132,27 +126,55 @@ def prediction_pipeline(
         "reg_alpha": [0, 0.1, 1.0],
     }
 
-    search = RandomizedSearchCV(
-        estimator=model,
-        param_distributions=param_distributions,
-        n_iter=50,
-        scoring="roc_auc",
-        cv=splitter,
-        n_jobs=-1,
-        refit=True
-    )
-
-    best_model = search.fit(X_train, y_train).best_estimator_
+    if search == "halving":
+        search = SuccessiveHalvingSearch(
+            estimator=model,
+            param_distributions=param_distributions,
+            n_iter=50,
+            scoring="roc_auc",
+            cv=splitter,
+            n_jobs=-1,
+            refit=True
+        )
+        best_model = search.fit(X_train, y_train, matrices=matrices).best_estimator_
+        print(f"Successive halving trained {search.compute_['trained']:,} round-rows vs "
+              f"{search.compute_['exhaustive']:,} for exhaustive search ({100 * search.compute_['saved_fraction']:.0f}% saved)")
+    else:
+        search = RandomizedSearchCV(
+            estimator=model,
+            param_distributions=param_distributions,
+            n_iter=50,
+            scoring="roc_auc",
+            cv=splitter,
+            n_jobs=-1,
+            refit=True
+        )
+        best_model = search.fit(X_train, y_train).best_estimator_
 
     X_eval = test_data[features]
     y_eval = test_data['label']
 
-    metrics_real, metrics_null, p_values = permutation_test_all_metrics(best_model, X_train, y_train, X_eval, y_eval)
+    metrics_real, metrics_null, p_values = permutation_test_all_metrics(best_model, X_train, y_train, X_eval, y_eval, n_jobs=-1,
+                                                                         matrices=matrices)
     
-    results = evaluate_classifier(best_model, X_train, y_train, X_eval, y_eval)
+    results = evaluate_classifier(best_model, X_train, y_train, X_eval, y_eval, matrices=matrices)
 
     return labeled_data, best_model, results
 
+def save_training_outputs(labeled_data, best_model, features=FEATURES, prefix=''):
+    """
+    Save the trained model, its feature names and the labeled set (CSV plus compact event store copy)
+    under the file names BatchScorer and the evaluation scripts read.
+    """
+    import joblib
+
+    best_model.save_model(f'{prefix}best_xgb_model.json')
+    joblib.dump(features, f'{prefix}feature_names.pkl')
+    csv = f'{prefix}labeled_double_top_events.csv'
+    labeled_data.to_csv(csv, index=False)
+    # compact binary copy read by read_events (features kept at full precision for the model)
+    save_events(labeled_data, store_path(csv), exact=FEATURES, source=csv)
+
 if __name__ == "__main__":
     directory = "./sp500/sp500"
 
@@ -163,17 +185,12 @@ if __name__ == "__main__":
     
     labeled_data, best_model, results = prediction_pipeline(tickers)
 
-    features = ['peak1_price', 'peak2_price', 'trough_price', 'peak_gap_days', 'vol1',
-                'vol2', 'vol2_vol1_ratio', 'peak_height_diff', 'peak_height_diff_pct', 
-                'retracement_depth1', 'retracement_depth2', 'volume_diff', 
-                'peak1_to_trough', 'trough_to_peak2']
+    features = FEATURES
     
     print(results)
     
     # save the best model
-    best_model.save_model('best_xgb_model.json')
-    joblib.dump(features, 'feature_names.pkl')
-    labeled_data.to_csv('labeled_double_top_events.csv', index=False)
+    save_training_outputs(labeled_data, best_model, features)
 
     
 
@@ -0,0 +1,274 @@
+import hashlib
+import os
+import json
+import warnings
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+PRICE_DIR = "sp500/sp500"
+PANEL_DIR = "sp500/panel"
+FIELDS = ("Close", "High", "Low", "Open", "Volume")
+
+def read_price_csv(ticker, src_dir=PRICE_DIR):
+    """
+    Read a single ticker's price history from the raw yfinance CSV export.
+
+    Parameters
+    ----------
+    ticker : str
+        Ticker symbol, e.g. "AAPL".
+    src_dir : str
+        Directory holding one `{ticker}.csv` per symbol (default is 'sp500/sp500').
+    """
+    return pd.read_csv(f"{src_dir}/{ticker}.csv",
+                       header=0,
+                       skiprows=[1],
+                       dtype={
+                           "Date": str,
+                           "Open": float,
+                           "High": float,
+                           "Low": float,
+                           "Close": float,
+                           "Volume": float
+                           }
+    )
+
+
+def ingest_price_panel(src_dir=PRICE_DIR, panel_dir=PANEL_DIR):
+    """
+    One-time conversion of the per-ticker CSVs into a columnar, memory-mappable panel.
+
+    Every field is stored as one (tickers x dates) float64 .npy matrix on a shared date axis.
+    Tickers that listed later (e.g. ABNB) are NaN before their first bar, so each ticker's
+    history is the contiguous tail `matrix[row, start:]`. The size and mtime of every source CSV
+    are recorded in 'tickers.json', so loads can tell when a CSV changed after ingest, together with
+    each ticker's `frame_digest`, so cache keys need not re-read the prices.
+
+    Parameters
+    ----------
+    src_dir : str
+        Directory holding one `{ticker}.csv` per symbol (default is 'sp500/sp500').
+    panel_dir : str
+        Output directory for the panel files (default is 'sp500/panel').
+    """
+    tickers = sorted(name[:-4] for name in os.listdir(src_dir) if name.endswith(".csv"))
+    frames = [read_price_csv(ticker, src_dir) for ticker in tickers]
+
+    # shared date axis across the universe; every ticker trades through the last date
+    dates = np.array(sorted(set().union(*(f["Date"] for f in frames))))
+    date_pos = pd.Index(dates)
+
+    starts = np.empty(len(tickers), dtype=np.int64)
+    panel = {field: np.full((len(tickers), len(dates)), np.nan) for field in FIELDS}
+
+    for row, frame in enumerate(frames):
+        pos = date_pos.get_indexer(frame["Date"])
+        if (np.diff(pos) != 1).any() or pos[-1] != len(dates) - 1:
+            raise ValueError(f"{tickers[row]} has gaps relative to the shared date axis")
+        starts[row] = pos[0]
+        for field in FIELDS:
+            panel[field][row, pos[0]:] = frame[field].to_numpy()
+
+    os.makedirs(panel_dir, exist_ok=True)
+    for field, values in panel.items():
+        np.save(os.path.join(panel_dir, f"{field}.npy"), values)
+    np.save(os.path.join(panel_dir, "dates.npy"), dates.astype("U10"))
+    np.save(os.path.join(panel_dir, "starts.npy"), starts)
+    sources = {ticker: _source_signature(os.path.join(src_dir, f"{ticker}.csv")) for ticker in tickers}
+    digests = {ticker: frame_digest(frame) for ticker, frame in zip(tickers, frames)}
+    with open(os.path.join(panel_dir, "tickers.json"), "w") as f:
+        json.dump({"tickers": tickers, "src_dir": src_dir, "sources": sources, "digests": digests}, f)
+
+    open_price_panel.cache_clear()
+    _loaded_digest.cache_clear()
+    return open_price_panel(panel_dir)
+
+
+def _source_signature(path):
+    """
+    (size, mtime in ns) of a source CSV, or None when it does not exist.
+    """
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+
+class PricePanel:
+    """
+    Read-only view over an ingested price panel.
+
+    Field matrices are opened with `mmap_mode='r'`, so only the pages of tickers that are
+    actually touched get read from disk.
+
+    Parameters
+    ----------
+    panel_dir : str
+        Directory written by `ingest_price_panel`.
+    """
+
+    def __init__(self, panel_dir=PANEL_DIR):
+        self.panel_dir = panel_dir
+        meta_path = os.path.join(panel_dir, "tickers.json")
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if isinstance(meta, list):
+            # panels ingested before source signatures were recorded: judge CSVs against the ingest time
+            meta = {"tickers": meta, "src_dir": PRICE_DIR, "sources": {}}
+        self.tickers = meta["tickers"]
+        self.src_dir = meta["src_dir"]
+        self.sources = meta["sources"]
+        self.digests = meta.get("digests", {})
+        self.ingested_ns = os.stat(meta_path).st_mtime_ns
+        self.row = {ticker: i for i, ticker in enumerate(self.tickers)}
+        self.starts = np.load(os.path.join(panel_dir, "starts.npy"))
+        self.dates = pd.Index(np.load(os.path.join(panel_dir, "dates.npy")).astype(object), name="Date")
+        self._fields = {}
+
+    def __contains__(self, ticker):
+        return ticker in self.row
+
+    def __len__(self):
+        return len(self.tickers)
+
+    def is_stale(self, ticker, src_dir=None):
+        """
+        True when the ticker's source CSV changed (size or mtime) since the panel was ingested.
+
+        A ticker whose CSV is gone is served from the panel. For panels without recorded signatures, a CSV
+        modified after the ingest counts as changed.
+        """
+        current = _source_signature(os.path.join(src_dir or self.src_dir, f"{ticker}.csv"))
+        if current is None:
+            return False
+        recorded = self.sources.get(ticker)
+        if recorded is None:
+            return current[1] > self.ingested_ns
+        return current != recorded
+
+    def field(self, name):
+        """
+        Full (tickers x dates) matrix for one of 'Close', 'High', 'Low', 'Open', 'Volume'.
+        """
+        if name not in self._fields:
+            self._fields[name] = np.load(os.path.join(self.panel_dir, f"{name}.npy"), mmap_mode="r")
+        return self._fields[name]
+
+    def arrays(self, ticker):
+        """
+        Zero-copy views of one ticker's history, keyed by field name.
+        """
+        row, start = self.row[ticker], self.starts[self.row[ticker]]
+        return {field: np.asarray(self.field(field)[row, start:]) for field in FIELDS}
+
+    def load(self, ticker, date_index=False):
+        """
+        Return one ticker as the same OHLCV DataFrame the CSV reader produces, backed by the panel.
+
+        Parameters
+        ----------
+        ticker : str
+            Ticker symbol, e.g. "AAPL".
+        date_index : bool
+            If True, index by a DatetimeIndex instead of a 'Date' column, as plot_candles expects (default is False).
+        """
+        start = self.starts[self.row[ticker]]
+        data = self.arrays(ticker)
+        if date_index:
+            index = pd.DatetimeIndex(self.dates[start:], name="Date")
+            return pd.DataFrame(data, index=index, copy=False)
+        data = {"Date": self.dates[start:].to_numpy(), **data}
+        return pd.DataFrame(data, copy=False)
+
+
+@lru_cache(maxsize=None)
+def open_price_panel(panel_dir=PANEL_DIR):
+    """
+    Cached PricePanel per directory so repeated loads share one set of memory maps.
+    """
+    return PricePanel(panel_dir)
+
+
+def load_price_data(ticker, date_index=False, panel_dir=PANEL_DIR, src_dir=PRICE_DIR):
+    """
+    Load one ticker's OHLCV data, from the ingested panel when available and the raw CSV otherwise.
+
+    A ticker whose CSV changed after the panel was ingested is read from the CSV, with a warning to re-ingest.
+
+    Parameters
+    ----------
+    ticker : str
+        Ticker symbol, e.g. "AAPL".
+    date_index : bool
+        If True, index by a DatetimeIndex instead of a 'Date' column (default is False).
+    panel_dir : str
+        Directory written by `ingest_price_panel` (default is 'sp500/panel').
+    src_dir : str
+        Fallback directory of raw CSVs (default is 'sp500/sp500').
+    """
+    if os.path.exists(os.path.join(panel_dir, "tickers.json")):
+        panel = open_price_panel(panel_dir)
+        if ticker in panel:
+            if not panel.is_stale(ticker, src_dir):
+                return panel.load(ticker, date_index=date_index)
+            warnings.warn(f"{ticker}.csv in {src_dir} changed since the panel in {panel_dir} was ingested; "
+                          f"reading the CSV (re-run ingest_price_panel to refresh the panel)", stacklevel=2)
+
+    df = read_price_csv(ticker, src_dir)
+    if date_index:
+        df = df.set_index(pd.DatetimeIndex(df.pop("Date"), name="Date"))
+    return df
+
+
+def price_digest(ticker, panel_dir=PANEL_DIR, src_dir=PRICE_DIR):
+    """
+    sha256 of the dates and OHLCV values `load_price_data` serves for the ticker.
+
+    Identifies the data itself rather than a file, so it follows whichever source (panel or CSV) is actually
+    read and does not change when other tickers are re-ingested. Tickers served from the panel use the digest
+    recorded at ingest; otherwise the prices are hashed once per source signature (the CSV's size and mtime,
+    or the panel's ingest time) and the result is kept for the process.
+    """
+    signature = None
+    if os.path.exists(os.path.join(panel_dir, "tickers.json")):
+        panel = open_price_panel(panel_dir)
+        if ticker in panel and not panel.is_stale(ticker, src_dir):
+            if ticker in panel.digests:
+                return panel.digests[ticker]
+            signature = ("panel", panel.ingested_ns)
+    if signature is None:
+        signature = ("csv", tuple(_source_signature(os.path.join(src_dir, f"{ticker}.csv")) or ()))
+    return _loaded_digest(ticker, panel_dir, src_dir, signature)
+
+
+@lru_cache(maxsize=None)
+def _loaded_digest(ticker, panel_dir, src_dir, signature):
+    return frame_digest(load_price_data(ticker, panel_dir=panel_dir, src_dir=src_dir))
+
+
+def frame_digest(df):
+    """
+    sha256 of the 'Date' column and OHLCV values of a price DataFrame as returned by `load_price_data`.
+    """
+    h = hashlib.sha256()
+    h.update(np.asarray(df["Date"], dtype="U10").tobytes())
+    for field in FIELDS:
+        h.update(np.ascontiguousarray(df[field], dtype=np.float64).tobytes())
+    return h.hexdigest()
+
+
+def list_tickers(panel_dir=PANEL_DIR, src_dir=PRICE_DIR):
+    """
+    Tickers available locally, taken from the panel when it has been ingested.
+    """
+    if os.path.exists(os.path.join(panel_dir, "tickers.json")):
+        return list(open_price_panel(panel_dir).tickers)
+    return sorted(name[:-4] for name in os.listdir(src_dir) if name.endswith(".csv"))
+
+
+if __name__ == "__main__":
+    panel = ingest_price_panel()
+    print(f"Ingested {len(panel)} tickers over {len(panel.dates)} dates into {PANEL_DIR}")
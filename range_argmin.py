@@ -0,0 +1,51 @@
+import numpy as np
+
+def build_sparse_table(values):
+    """
+    Build a sparse table for O(1) range-argmin queries over a 1D array.
+
+    Level k holds, for each start i, the position of the minimum of values[i : i + 2**k].
+    Ties resolve to the leftmost position, matching pandas `idxmin`.
+
+    Parameters
+    ----------
+    values : np.ndarray
+        1D array of values to query, e.g. trough lows.
+    """
+    values = np.asarray(values)
+    table = [np.arange(len(values))]
+    span = 1
+    while 2 * span <= len(values):
+        prev = table[-1]
+        left, right = prev[:len(prev) - span], prev[span:]
+        table.append(np.where(values[left] <= values[right], left, right))
+        span *= 2
+    return table
+
+
+def range_argmin(values, table, lo, hi):
+    """
+    Position of the minimum of values[lo:hi] for every (lo, hi) pair at once.
+
+    Parameters
+    ----------
+    values : np.ndarray
+        Array the sparse table was built from.
+    table : list of np.ndarray
+        Output of `build_sparse_table(values)`.
+    lo, hi : np.ndarray
+        Half-open query bounds; every range must be non-empty (hi > lo).
+    """
+    lo = np.asarray(lo, dtype=np.int64)
+    hi = np.asarray(hi, dtype=np.int64)
+    out = np.empty(len(lo), dtype=np.int64)
+    if len(lo) == 0:
+        return out
+
+    level = np.floor(np.log2(hi - lo)).astype(np.int64)
+    for k in np.unique(level):
+        sel = level == k
+        left = table[k][lo[sel]]
+        right = table[k][hi[sel] - (1 << k)]
+        out[sel] = np.where(values[left] <= values[right], left, right)
+    return out
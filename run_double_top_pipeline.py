@@ -2,15 +2,17 @@
 # As the scope of this project changed, much of this skeleton was altered with new logic
 
 import pandas as pd
-import os
+from concurrent.futures import ProcessPoolExecutor
 from detect_double_tops import detect_double_tops
 from confirm_double_tops import confirm_double_tops
 from compute_forward_returns import compute_forward_returns
 from sample_random_events import sample_random_events
 from ma_crossover_signals import ma_crossover_signals
 from evaluate_all import evaluate_all
-from plot_return_distributions import plot_return_distributions
+from grouped_statistics import evaluate_grouped, stack_returns
 from label_events import label_events
+from price_panel import load_price_data, list_tickers
+from baseline_store import BASELINE_DIR, open_baseline_store
 
 def run_double_top_pipeline(
     ticker: str,
@@ -19,13 +21,16 @@ def run_double_top_pipeline(
     save_prefix: str | None = None,
     make_plots: bool = False,
     ind_full_summary: pd.DataFrame = pd.DataFrame(),
-    comp_full_summary: pd.DataFrame = pd.DataFrame()
+    comp_full_summary: pd.DataFrame = pd.DataFrame(),
+    use_baseline_cache: bool = True,
+    summarize: bool = True,
+    baseline_dir: str = BASELINE_DIR
 ):
     """
     End-to-end pipeline to test Double Top performance for one ticker.
 
     Steps:
-      1. Load stock data from local CSV files.
+      1. Load stock data from the local price panel (raw CSVs if not ingested).
       2. Detect Double Tops (strict two-peak pattern with trough).
       3. Confirm when price closes below the trough (neckline).
       4. Compute forward returns for double-top events (5/20/60 days by default).
@@ -51,6 +56,13 @@ def run_double_top_pipeline(
         DataFrame to append individual summary statistics across tickers.
     comp_full_summary : pd.DataFrame
         DataFrame to append comparison summary statistics across tickers.
+    use_baseline_cache : bool
+        If True, serve the random and MA crossover baselines from the persistent baseline store (see baseline_store.py).
+    summarize : bool
+        If False, skip the summary statistics (returned empty), e.g. when they are computed for many tickers at once
+        with `evaluate_grouped`.
+    baseline_dir : str
+        Directory of the baseline store (default is '.baseline_cache').
 
     Returns
     -------
@@ -69,20 +81,13 @@ def run_double_top_pipeline(
     """
 
     # 1) pull data from local files
-    df = pd.read_csv(f"sp500/sp500/{ticker}.csv", 
-                     header=0, 
-                     skiprows=[1],
-                     dtype={
-                        "Open": float,
-                        "High": float,
-                        "Low": float,
-                        "Close": float,
-                        "Volume": float
-                        }
-    )
+    df = load_price_data(ticker)
 
     # 2) detect + confirm double tops
-    dt_candidates = detect_double_tops(df, peak_window=3, peak_tolerance=0.01,min_peak_gap=15, max_peak_gap=30, min_trough_drop=0.03, require_lower_second_vol=True)
+    detect_params = {'peak_window': 3, 'peak_tolerance': 0.01, 'min_peak_gap': 15, 'max_peak_gap': 30,
+                     'min_trough_drop': 0.03, 'require_lower_second_vol': True}
+    detect_params.update(double_top_params)
+    dt_candidates = detect_double_tops(df, **detect_params)
 
     dt_confirmed = confirm_double_tops(df, dt_candidates, max_confirm_days=40)
 
@@ -100,16 +105,23 @@ def run_double_top_pipeline(
     dt_events["type"] = "double_top"
 
     # 4) baselines for random sampling and moving average crossovers
-    rand_events = sample_random_events(df, n_events=len(dt_events), horizons=horizons)
+    if use_baseline_cache:
+        baselines = open_baseline_store(baseline_dir)
+        rand_events = baselines.random_events(ticker, n_events=len(dt_events), df=df, horizons=horizons)
+        ma_events = baselines.ma_events(ticker, df=df, horizons=horizons)
+    else:
+        rand_events = sample_random_events(df, n_events=len(dt_events), horizons=horizons)
+        ma_events = ma_crossover_signals(df, horizons=horizons)
     rand_events["symbol"] = ticker
-
-    ma_events = ma_crossover_signals(df, horizons=horizons)
     ma_events["symbol"] = ticker
 
     # 5) summary statistics
-    ind_return_summary_df, comp_return_summary_df = evaluate_all(dt_events, rand_events, ma_events, horizons=horizons)
-    ind_return_summary_df["symbol"] = ticker
-    comp_return_summary_df["symbol"] = ticker
+    if summarize:
+        ind_return_summary_df, comp_return_summary_df = evaluate_all(dt_events, rand_events, ma_events, horizons=horizons)
+        ind_return_summary_df["symbol"] = ticker
+        comp_return_summary_df["symbol"] = ticker
+    else:
+        ind_return_summary_df, comp_return_summary_df = pd.DataFrame(), pd.DataFrame()
 
     # 6) CSVs
     if save_prefix is not None:
@@ -120,6 +132,8 @@ def run_double_top_pipeline(
 
     # 7) plots
     if make_plots:
+        from plot_return_distributions import plot_return_distributions  # matplotlib only when plotting
+
         mid_h = horizons[len(horizons) // 2]
         plot_return_distributions(dt_events, rand_events, ma_events, ticker=ticker, horizon=mid_h)
     
@@ -130,30 +144,94 @@ def run_double_top_pipeline(
     return dt_events, dt_candidates, rand_events, ma_events, ind_return_summary_df, comp_full_summary
 
 
-if __name__ == "__main__":
-    dt_events = None
-    dt_candidates = None
-    rand_events = None
-    ma_events = None
-    summary_df = None
+def _run_ticker(ticker, horizons, double_top_params, use_baseline_cache=True, baseline_dir=BASELINE_DIR):
+    """
+    Worker for `run_universe`: run the pipeline for one ticker, label its candidates and stack the event returns
+    for the summary statistics.
+    """
+    dt_events, dt_candidates, rand_events, ma_events, _, _ = run_double_top_pipeline(
+        ticker, horizons=horizons, double_top_params=double_top_params, use_baseline_cache=use_baseline_cache,
+        summarize=False, baseline_dir=baseline_dir)
+
+    # label per ticker, since positions are only unique within a ticker
+    if not dt_candidates.empty:
+        if dt_events.empty:
+            dt_candidates = dt_candidates.assign(label=False)
+        else:
+            dt_candidates = label_events(dt_candidates, dt_events)
+        dt_candidates["symbol"] = ticker
+
+    returns = pd.DataFrame()
+    if not dt_events.empty:
+        returns = stack_returns({'double_top': dt_events, 'random': rand_events, 'ma_crossover': ma_events},
+                                ticker, horizons=horizons)
+    return dt_events, dt_candidates, returns
+
+
+def run_universe(tickers, workers=None, horizons=(5, 20, 60), double_top_params: dict = {}, use_baseline_cache: bool = True,
+                 baseline_dir: str = BASELINE_DIR):
+    """
+    Run the double top pipeline over many tickers on a process pool and combine the results.
+
+    Per-ticker results are collected in lists and concatenated once at the end; the summary statistics of all
+    tickers are computed in one pass over their stacked returns (see grouped_statistics.py).
+
+    Parameters
+    ----------
+    tickers : list of str
+        Ticker symbols to process.
+    workers : int or None
+        Number of worker processes; None uses every core, 1 runs serially in this process.
+    horizons : tuple of int
+        Forward-return horizons in trading days.
+    double_top_params : dict
+        Parameters to adjust double top detection settings.
+    use_baseline_cache : bool
+        If True, serve the random and MA crossover baselines from the persistent baseline store.
+    baseline_dir : str
+        Directory of the baseline store (default is '.baseline_cache').
 
-    root_path = './sp500/sp500/'
+    Returns
+    -------
+    dt_events : pd.DataFrame
+        Confirmed double-top events with forward returns, across all tickers.
+    dt_candidates : pd.DataFrame
+        Candidate events across all tickers, labeled True when confirmed.
+    ind_full_summary : pd.DataFrame
+        Individual summary statistics across tickers, horizons & event types.
+    comp_full_summary : pd.DataFrame
+        Comparison summary statistics across tickers, horizons & event types.
+    """
+    n = len(tickers)
+    args = ([horizons] * n, [double_top_params] * n, [use_baseline_cache] * n, [baseline_dir] * n)
+
+    if workers == 1:
+        results = list(map(_run_ticker, tickers, *args))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_run_ticker, tickers, *args, chunksize=8))
 
-    ind_return_summary_df = pd.DataFrame()
-    comp_return_summary_df = pd.DataFrame()
+    # single concat per table; per-ticker frames are empty when nothing was confirmed
+    combined = []
+    for k in range(3):
+        frames = [r[k] for r in results if not r[k].empty]
+        combined.append(pd.concat(frames, ignore_index=True) if frames else pd.DataFrame())
 
-    for current_dir, subdirs, files in os.walk(root_path):
-        for fname in files:
-            symbol = fname.split('.')[0]
-            
-            print(f"Processing {symbol}...")
-            # use when processing all files
-            dt_events, dt_candidates, rand_events, ma_events, ind_return_summary_df, comp_return_summary_df = run_double_top_pipeline(symbol, ind_full_summary=ind_return_summary_df, comp_full_summary=comp_return_summary_df)
+    dt_events, dt_candidates, returns = combined
+    if returns.empty:
+        return dt_events, dt_candidates, pd.DataFrame(), pd.DataFrame()
 
-            # use when making images or saving example files
-            # dt_events, dt_candidates, rand_events, ma_events, summary_df, full_summary = run_double_top_pipeline(symbol, save_prefix=f'{symbol}', make_plots=True)
+    # tickers with confirmed events, in universe order, as evaluate_all per ticker would report them
+    symbols = [t for t, r in zip(tickers, results) if not r[0].empty]
+    ind_summaries, comp_summaries = evaluate_grouped(returns, symbols=symbols, horizons=horizons)
+    return dt_events, dt_candidates, ind_summaries, comp_summaries
+
+
+if __name__ == "__main__":
+    dt_events, dt_candidates, ind_return_summary_df, comp_return_summary_df = run_universe(list_tickers())
 
-    dt_candidates = label_events(dt_candidates, dt_events)
+    # use when making images or saving example files
+    # dt_events, dt_candidates, rand_events, ma_events, summary_df, full_summary = run_double_top_pipeline(symbol, save_prefix=f'{symbol}', make_plots=True)
 
     ind_return_summary_df.to_csv('ind_returns_all_horizons.csv', index=True)
-    comp_return_summary_df.to_csv('comp_returns_all_horizons.csv', index=True)
\ No newline at end of file
+    comp_return_summary_df.to_csv('comp_returns_all_horizons.csv', index=True)
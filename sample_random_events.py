@@ -26,12 +26,8 @@ def sample_random_events(df, n_events, horizons=(5, 20, 60), seed=42, buffer=60)
     valid_idx = idx[buffer:-buffer]  # avoid edges
     chosen_idx = rng.choice(valid_idx, size=min(n_events, len(valid_idx)), replace=False)
 
-    # gathering price and date information for selected dates
-    events = []
-    for t0 in chosen_idx:
-        row = {'confirm_date': t0, 'confirm_price': df.loc[t0, 'Close']}
-        events.append(row)
-    rand_df = pd.DataFrame(events)
+    # gathering price and date information for selected dates, as whole columns
+    rand_df = pd.DataFrame({'confirm_date': chosen_idx, 'confirm_price': df.loc[chosen_idx, 'Close'].to_numpy()})
 
     # compute forward returns at given dates
     rand_df = compute_forward_returns(df, rand_df, horizons=horizons)
@@ -0,0 +1,380 @@
+import hashlib
+import inspect
+import os
+import pickle
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import pandas as pd
+
+import detect_double_tops as _detect_module
+import confirm_double_tops as _confirm_module
+import compute_forward_returns as _returns_module
+import find_local_extrema as _extrema_module
+import range_argmin as _range_module
+import sample_random_events as _random_module
+import ma_crossover_signals as _ma_module
+import evaluate_all as _evaluate_module
+import summarize_returns as _summarize_module
+import compare_distributions as _compare_module
+import price_panel as _panel_module
+from price_panel import load_price_data, price_digest
+
+class Stage:
+    """
+    One step of the pipeline graph.
+
+    Parameters
+    ----------
+    name : str
+        Unique stage name; also the name downstream stages use to refer to its output.
+    func : callable
+        Called as func(*input_outputs, **stage_params) and returns the stage output.
+    inputs : tuple of str
+        Names of upstream stages, passed positionally to func in this order.
+    params : tuple of str
+        Names of run parameters this stage depends on; only these enter its cache key.
+    code : tuple of modules or functions
+        Code whose source versions the cache key (default is func itself).
+    data : callable or None
+        Maps the run parameters to a digest of the data the stage reads, which enters the cache key. It runs
+        every time keys are computed, so it should not read the data itself (e.g. `price_digest`, which returns
+        the digest recorded at ingest while the ticker's source CSV is unchanged).
+    cache : bool
+        Whether to persist the output on disk (default is True).
+    """
+
+    def __init__(self, name, func, inputs=(), params=(), code=None, data=None, cache=True):
+        self.name = name
+        self.func = func
+        self.inputs = tuple(inputs)
+        self.params = tuple(params)
+        self.code = tuple(code) if code is not None else (func,)
+        self.data = data
+        self.cache = cache
+        self._code_hash = None
+
+    def code_hash(self):
+        if self._code_hash is None:
+            h = hashlib.sha256()
+            for obj in self.code:
+                h.update(inspect.getsource(obj).encode())
+            self._code_hash = h.hexdigest()
+        return self._code_hash
+
+
+class StageCache:
+    """
+    Content-addressed on-disk store of stage outputs with LRU eviction under a size cap.
+
+    Entries are pickles named by their cache key. Reads refresh the file's mtime, which is the LRU clock.
+    Several processes may share one directory: writes are atomic renames, an entry removed by another process
+    reads as a miss, and eviction re-scans the directory rather than trusting this process's view of it.
+
+    Parameters
+    ----------
+    cache_dir : str
+        Directory for cached outputs (default is '.stage_cache').
+    max_bytes : int
+        Total size cap; least recently used entries are evicted beyond it (default is 2 GB).
+    """
+
+    def __init__(self, cache_dir=".stage_cache", max_bytes=2 * 1024**3):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        # running estimate of the directory size; only decides when to re-scan for eviction
+        self._sizes = {key: size for key, size, _ in self._scan()}
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.pkl")
+
+    def _scan(self):
+        """
+        (key, size, mtime) of every entry currently on disk.
+        """
+        entries = []
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if not entry.name.endswith(".pkl"):
+                    continue
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((entry.name[:-4], st.st_size, st.st_mtime_ns))
+        return entries
+
+    def __contains__(self, key):
+        return os.path.exists(self._path(key))
+
+    def get(self, key):
+        """
+        Stored value of key; raises KeyError if it is not (or no longer) on disk.
+        """
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self._sizes.pop(key, None)
+            raise KeyError(key) from None
+        return value
+
+    def put(self, key, value):
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            size = f.tell()
+        os.replace(tmp, path)
+        with self._lock:
+            self._sizes[key] = size
+            if sum(self._sizes.values()) > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        entries = sorted(self._scan(), key=lambda e: e[2])
+        total = sum(size for _, size, _ in entries)
+        for key, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            total -= size
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+        self._sizes = {key: size for key, size, _ in self._scan()}
+
+    def size(self):
+        return sum(size for _, size, _ in self._scan())
+
+
+class StageGraph:
+    """
+    DAG of stages executed with on-disk memoization and selective recompute.
+
+    A stage's cache key hashes its name, code version, its own parameter values, a digest of the data it
+    reads and the keys of its inputs. Keys are therefore known before anything runs: only
+    stages whose outputs are requested and missing from the cache are executed, and cached upstream
+    outputs are loaded only when a stage that has to run needs them. Stages whose inputs are ready run
+    concurrently on a thread pool.
+
+    Parameters
+    ----------
+    stages : list of Stage
+        Stages in any order; input names must refer to other stages in the list.
+    cache : StageCache or None
+        Output store (default is a StageCache in '.stage_cache').
+    workers : int
+        Maximum number of stages running at once (default is 4).
+    """
+
+    def __init__(self, stages, cache=None, workers=4):
+        self.stages = {s.name: s for s in stages}
+        self.cache = cache if cache is not None else StageCache()
+        self.workers = workers
+        for s in stages:
+            missing = set(s.inputs) - set(self.stages)
+            if missing:
+                raise ValueError(f"Stage {s.name!r} has unknown inputs {sorted(missing)}")
+
+    def keys(self, params):
+        """
+        Cache key of every stage for the given run parameters.
+        """
+        keys = {}
+
+        def key(name):
+            if name not in keys:
+                stage = self.stages[name]
+                h = hashlib.sha256()
+                h.update(name.encode())
+                h.update(stage.code_hash().encode())
+                h.update(repr(sorted((p, params[p]) for p in stage.params)).encode())
+                if stage.data is not None:
+                    h.update(stage.data(params).encode())
+                for upstream in stage.inputs:
+                    h.update(key(upstream).encode())
+                keys[name] = h.hexdigest()
+            return keys[name]
+
+        for name in self.stages:
+            key(name)
+        return keys
+
+    def run(self, targets, params):
+        """
+        Produce the outputs of `targets`, recomputing only what is not cached.
+
+        Parameters
+        ----------
+        targets : list of str
+            Stage names whose outputs are wanted.
+        params : dict
+            Run parameters; every parameter declared by a needed stage must be present.
+
+        Returns
+        -------
+        outputs : dict
+            Output of each target stage.
+        executed : list of str
+            Stages that actually ran (the rest were served from cache or not needed).
+        """
+        keys = self.keys(params)
+        values = {}
+
+        # walk back from the targets: a cached stage cuts off everything upstream of it
+        to_run = set()
+        def plan(name):
+            if name in to_run or name in values:
+                return
+            stage = self.stages[name]
+            if stage.cache:
+                try:
+                    values[name] = self.cache.get(keys[name])
+                    return
+                except KeyError:
+                    pass  # not cached, or evicted by another process
+            to_run.add(name)
+            for upstream in stage.inputs:
+                plan(upstream)
+        for name in targets:
+            plan(name)
+
+        executed = []
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            running = {}
+            pending = set(to_run)
+            while pending or running:
+                ready = [n for n in pending if all(u in values for u in self.stages[n].inputs)]
+                for name in ready:
+                    pending.discard(name)
+                    stage = self.stages[name]
+                    kwargs = {p: params[p] for p in stage.params}
+                    running[pool.submit(stage.func, *(values[u] for u in stage.inputs), **kwargs)] = name
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    values[name] = future.result()
+                    executed.append(name)
+                    if self.stages[name].cache:
+                        self.cache.put(keys[name], values[name])
+
+        return {name: values[name] for name in targets}, executed
+
+
+def _detect(df, **params):
+    return _detect_module.detect_double_tops(df, **params)
+
+def _confirm(df, candidates, max_confirm_days):
+    return _confirm_module.confirm_double_tops(df, candidates, max_confirm_days=max_confirm_days)
+
+def _dt_events(df, confirmed, ticker, horizons):
+    if confirmed.empty:
+        return pd.DataFrame()
+    dt_events = _returns_module.compute_forward_returns(df, confirmed, horizons=horizons)
+    dt_events["symbol"] = ticker
+    dt_events["type"] = "double_top"
+    return dt_events
+
+def _rand_events(df, dt_events, ticker, horizons, seed):
+    if dt_events.empty:
+        return pd.DataFrame()
+    rand_events = _random_module.sample_random_events(df, n_events=len(dt_events), horizons=horizons, seed=seed)
+    rand_events["symbol"] = ticker
+    return rand_events
+
+def _ma_events(df, ticker, horizons, short_window, long_window):
+    ma_events = _ma_module.ma_crossover_signals(df, short_window=short_window, long_window=long_window, horizons=horizons)
+    ma_events["symbol"] = ticker
+    return ma_events
+
+def _summary(dt_events, rand_events, ma_events, ticker, horizons):
+    if dt_events.empty:
+        return pd.DataFrame(), pd.DataFrame()
+    ind_summary, comp_summary = _evaluate_module.evaluate_all(dt_events, rand_events, ma_events, horizons=horizons)
+    ind_summary["symbol"] = ticker
+    comp_summary["symbol"] = ticker
+    return ind_summary, comp_summary
+
+
+DETECT_PARAMS = ('peak_window', 'peak_tolerance', 'min_peak_gap', 'max_peak_gap', 'min_trough_drop', 'require_lower_second_vol')
+
+DEFAULT_RUN_PARAMS = {'peak_window': 3, 'peak_tolerance': 0.01, 'min_peak_gap': 15, 'max_peak_gap': 30,
+                      'min_trough_drop': 0.03, 'require_lower_second_vol': True, 'max_confirm_days': 40,
+                      'horizons': (5, 20, 60), 'seed': 42, 'short_window': 20, 'long_window': 50}
+
+def double_top_graph(cache=None, workers=4):
+    """
+    The run_double_top_pipeline steps for one ticker as a StageGraph.
+
+    prices -> candidates -> confirmed -> dt_events -> rand_events, plus the independent ma_events baseline,
+    all feeding summary. Detection and confirmation do not depend on 'horizons', so changing horizons only
+    recomputes the returns, baselines and summary.
+    """
+    stages = [
+        Stage('prices', load_price_data, params=('ticker',), code=(_panel_module,), cache=False,
+              data=lambda p: price_digest(p['ticker'])),
+        Stage('candidates', _detect, inputs=('prices',), params=DETECT_PARAMS,
+              code=(_detect, _detect_module, _extrema_module, _range_module)),
+        Stage('confirmed', _confirm, inputs=('prices', 'candidates'), params=('max_confirm_days',),
+              code=(_confirm, _confirm_module)),
+        Stage('dt_events', _dt_events, inputs=('prices', 'confirmed'), params=('ticker', 'horizons'),
+              code=(_dt_events, _returns_module)),
+        Stage('rand_events', _rand_events, inputs=('prices', 'dt_events'), params=('ticker', 'horizons', 'seed'),
+              code=(_rand_events, _random_module, _returns_module)),
+        Stage('ma_events', _ma_events, inputs=('prices',), params=('ticker', 'horizons', 'short_window', 'long_window'),
+              code=(_ma_events, _ma_module, _returns_module)),
+        Stage('summary', _summary, inputs=('dt_events', 'rand_events', 'ma_events'), params=('ticker', 'horizons'),
+              code=(_summary, _evaluate_module, _summarize_module, _compare_module)),
+    ]
+    return StageGraph(stages, cache=cache, workers=workers)
+
+
+def run_cached_universe(tickers, params: dict = {}, cache=None, workers=4):
+    """
+    Run the double top graph for every ticker, reusing cached stage outputs, and combine the summaries.
+
+    Parameters
+    ----------
+    tickers : list of str
+        Ticker symbols to process.
+    params : dict
+        Overrides for DEFAULT_RUN_PARAMS.
+    cache : StageCache or None
+        Output store (default is a StageCache in '.stage_cache').
+    workers : int
+        Maximum number of stages running at once per ticker.
+
+    Returns
+    -------
+    ind_full_summary, comp_full_summary : pd.DataFrame
+        Individual and comparison summary statistics across tickers, horizons & event types.
+    """
+    graph = double_top_graph(cache=cache, workers=workers)
+    run_params = {**DEFAULT_RUN_PARAMS, **params}
+    run_params['horizons'] = tuple(run_params['horizons'])
+
+    ind_summaries, comp_summaries = [], []
+    for ticker in tickers:
+        outputs, _ = graph.run(['summary'], {**run_params, 'ticker': ticker})
+        ind_summary, comp_summary = outputs['summary']
+        if not ind_summary.empty:
+            ind_summaries.append(ind_summary)
+            comp_summaries.append(comp_summary)
+
+    ind_full_summary = pd.concat(ind_summaries, ignore_index=True) if ind_summaries else pd.DataFrame()
+    comp_full_summary = pd.concat(comp_summaries, ignore_index=True) if comp_summaries else pd.DataFrame()
+    return ind_full_summary, comp_full_summary
+
+
+if __name__ == "__main__":
+    from price_panel import list_tickers
+
+    ind_full_summary, comp_full_summary = run_cached_universe(list_tickers())
+    ind_full_summary.to_csv('ind_returns_all_horizons.csv', index=True)
+    comp_full_summary.to_csv('comp_returns_all_horizons.csv', index=True)
@@ -0,0 +1,236 @@
+import math
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+class StreamingDoubleTopDetector:
+    """
+    Incremental, bar-by-bar double top detection and confirmation for a single ticker.
+
+    Feeding a ticker's history one bar at a time through `update` yields the same candidates as
+    `detect_double_tops` and the same confirmations as `confirm_double_tops`, so a live feed only
+    pays for the newest bar. State is bounded by the detection parameters, not the history length:
+    the last 2*peak_window+1 bars for the extrema lookahead, peaks still eligible as peak 1 and the
+    troughs after them, and candidates still inside their confirmation window.
+
+    Positions are counted from the first bar fed in, matching the integer index the batch functions use.
+
+    Parameters
+    ----------
+    peak_window, peak_tolerance, min_peak_gap, max_peak_gap, min_trough_drop, require_lower_second_vol
+        Same meaning and defaults as in `detect_double_tops`.
+    max_confirm_days : int
+        Maximum number of days after the second peak to look for confirmation (default is 20).
+    keep_history : bool
+        If True, also keep every emitted event so `candidates_frame` / `confirmed_frame` can rebuild the batch
+        tables (default is False). The kept events grow with the feed, so leave it off for long-lived detectors
+        and consume the events `update` returns instead.
+    """
+
+    def __init__(self, peak_window=3, peak_tolerance=0.01, min_peak_gap=15, max_peak_gap=30,
+                 min_trough_drop=0.03, require_lower_second_vol=True, max_confirm_days=20, keep_history=False):
+        self.peak_window = peak_window
+        self.peak_tolerance = peak_tolerance
+        self.min_peak_gap = min_peak_gap
+        self.max_peak_gap = max_peak_gap
+        self.min_trough_drop = min_trough_drop
+        self.require_lower_second_vol = require_lower_second_vol
+        self.max_confirm_days = max_confirm_days
+        self.keep_history = keep_history
+
+        size = 2 * peak_window + 1
+        self.n_bars = 0
+        self._bars = deque(maxlen=size)        # (high, low, close, volume) for the lookahead window
+        self._dates = deque(maxlen=size)
+        self._high_max = deque()               # monotonic deques of positions for the sliding max/min
+        self._low_min = deque()
+        self._last_nan = -1                    # last position with a NaN high/low
+        self._open_peaks = deque()             # (pos, high, volume) still eligible as peak 1
+        self._troughs = deque()                # (pos, low) after the oldest open peak
+        self._pending = []                     # candidates waiting for a close below the neckline
+
+        self.candidates = []
+        self.confirmed = []
+
+    def update(self, high, low, close, volume, date=None):
+        """
+        Feed the next bar and return the events it triggers.
+
+        Parameters
+        ----------
+        high, low, close, volume : float
+            OHLCV values of the new bar ('Open' is not used by detection).
+        date : optional
+            Bar timestamp, echoed back on emitted events.
+
+        Returns
+        -------
+        list of dict
+            Candidate events ('event' = 'candidate') and confirmations ('event' = 'confirmation'),
+            each carrying the batch columns plus the emitting bar's position and date.
+        """
+        t = self.n_bars
+        self.n_bars += 1
+        w = self.peak_window
+        self._bars.append((high, low, close, volume))
+        self._dates.append(date)
+        events = []
+
+        # 1) candidates already waiting: check today's close against their neckline
+        still_pending = []
+        for cand in self._pending:
+            if close < cand['trough_price']:
+                events.append(self._confirm(cand, t, close, date))
+            elif t < cand['peak2_date'] + self.max_confirm_days:
+                still_pending.append(cand)
+        self._pending = still_pending
+
+        # 2) slide the extrema window [t - 2w, t]; its center t - w is now fully observed
+        if math.isnan(high) or math.isnan(low):
+            self._last_nan = t
+        else:
+            self._push(self._high_max, t, high, lambda new, old: new > old)
+            self._push(self._low_min, t, low, lambda new, old: new < old)
+        for q in (self._high_max, self._low_min):
+            while q and q[0][0] < t - 2 * w:
+                q.popleft()
+
+        c = t - w
+        if c < w or self._last_nan >= t - 2 * w:
+            return events
+        c_high, c_low, _, c_vol = self._bars[w]
+
+        # drop peaks and troughs that can no longer sit inside a pattern ending at or after c
+        oldest = c - self.max_peak_gap
+        while self._open_peaks and self._open_peaks[0][0] < oldest:
+            self._open_peaks.popleft()
+        while self._troughs and self._troughs[0][0] <= oldest:
+            self._troughs.popleft()
+
+        if c_low == self._low_min[0][1]:
+            self._troughs.append((c, c_low))
+
+        if c_high == self._high_max[0][1]:
+            for p1, price1, vol1 in self._open_peaks:
+                if c - p1 < self.min_peak_gap:
+                    break
+                cand = self._pair(p1, price1, vol1, c, c_high, c_vol)
+                if cand is None:
+                    continue
+                events.append(self._emit_candidate(cand, t, date))
+                confirmation = self._confirm_from_buffer(cand, t, date)
+                if confirmation is not None:
+                    events.append(confirmation)
+                elif t < c + self.max_confirm_days:
+                    self._pending.append(cand)
+            self._open_peaks.append((c, c_high, c_vol))
+
+        return events
+
+    def _push(self, q, t, value, dominates):
+        # keep values in decreasing (max) / increasing (min) order; ties stay so the front is the window extreme
+        while q and dominates(value, q[-1][1]):
+            q.pop()
+        q.append((t, value))
+
+    def _pair(self, t1, price1, vol1, t2, price2, vol2):
+        # peaks similar in height
+        if abs(price2 - price1) / price1 > self.peak_tolerance:
+            return None
+
+        # trough between them: lowest low strictly inside (t1, t2), first on ties
+        trough_date, trough_price = None, None
+        for pos, low in self._troughs:
+            if pos >= t2:
+                break
+            if pos > t1 and (trough_price is None or low < trough_price):
+                trough_date, trough_price = pos, low
+        if trough_date is None:
+            return None
+
+        # trough must be meaningfully below peaks
+        avg_peak = (price1 + price2) / 2
+        if (avg_peak - trough_price) / avg_peak < self.min_trough_drop:
+            return None
+
+        # second peak trading volume must be lower than first
+        if self.require_lower_second_vol and not (vol2 < vol1):
+            return None
+
+        return {
+            'peak1_date': t1,
+            'peak2_date': t2,
+            'trough_date': trough_date,
+            'peak1_price': price1,
+            'peak2_price': price2,
+            'trough_price': trough_price,
+            'peak_gap_days': (t2 - t1),
+            'vol1': vol1,
+            'vol2': vol2,
+            'vol2_vol1_ratio': vol2 / vol1 if vol1 > 0 else np.nan
+        }
+
+    def _emit_candidate(self, cand, t, date):
+        if self.keep_history:
+            self.candidates.append(cand)
+        return {'event': 'candidate', 'bar': t, 'date': date, **cand}
+
+    def _confirm_from_buffer(self, cand, t, date):
+        # bars after peak 2 that arrived during the lookahead are still in the buffer
+        first = t - len(self._bars) + 1
+        last = min(t, cand['peak2_date'] + self.max_confirm_days)
+        for pos in range(cand['peak2_date'] + 1, last + 1):
+            close = self._bars[pos - first][2]
+            if close < cand['trough_price']:
+                return self._confirm(cand, pos, close, self._dates[pos - first])
+        return None
+
+    def _confirm(self, cand, pos, close, date):
+        confirmed = {**cand, 'confirm_date': pos, 'confirm_price': close}
+        if self.keep_history:
+            self.confirmed.append(confirmed)
+        return {'event': 'confirmation', 'bar': pos, 'date': date, **confirmed}
+
+    def candidates_frame(self):
+        """
+        All candidates emitted so far (with keep_history=True), in `detect_double_tops` row order.
+        """
+        if not self.keep_history:
+            raise ValueError("candidates_frame needs a detector created with keep_history=True")
+        if not self.candidates:
+            return pd.DataFrame()
+        df = pd.DataFrame(self.candidates)
+        return df.sort_values(['peak1_date', 'peak2_date'], kind='stable').reset_index(drop=True)
+
+    def confirmed_frame(self):
+        """
+        All confirmations emitted so far (with keep_history=True), in `confirm_double_tops` row order.
+        """
+        if not self.keep_history:
+            raise ValueError("confirmed_frame needs a detector created with keep_history=True")
+        if not self.confirmed:
+            return pd.DataFrame()
+        df = pd.DataFrame(self.confirmed)
+        return df.sort_values(['peak1_date', 'peak2_date'], kind='stable').reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    # replay the bundled universe bar by bar (equivalence with the batch functions is checked in
+    # tests/test_equivalence.py)
+    import time
+    from price_panel import list_tickers, load_price_data
+
+    n_bars, n_confirmed, elapsed = 0, 0, 0.0
+    for ticker in list_tickers():
+        df = load_price_data(ticker)
+        detector = StreamingDoubleTopDetector(max_confirm_days=40)
+        bars = zip(df['High'].tolist(), df['Low'].tolist(), df['Close'].tolist(), df['Volume'].tolist(), df['Date'])
+
+        start = time.perf_counter()
+        for high, low, close, volume, date in bars:
+            n_confirmed += sum(e['event'] == 'confirmation' for e in detector.update(high, low, close, volume, date))
+        elapsed += time.perf_counter() - start
+        n_bars += len(df)
+
+    print(f"{n_confirmed} confirmed double tops streamed at {1e6 * elapsed / n_bars:.1f} us per bar")
@@ -0,0 +1,175 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+from sklearn.base import clone
+from sklearn.metrics import get_scorer
+from sklearn.model_selection import ParameterSampler
+
+from training_matrices import TrainingMatrices, train_booster
+
+class SuccessiveHalvingSearch:
+    """
+    Budget-aware drop-in for `RandomizedSearchCV` on gradient-boosted models, using boosting rounds as the resource.
+
+    All sampled configurations start with few rounds on the earliest walk-forward folds; after each rung only the
+    best 1/eta are kept and trained further (continuing their boosters rather than refitting) on more folds,
+    until the survivors run with their full `n_estimators` on every fold. A continued booster equals a fresh fit
+    only when it draws no rows or columns (`subsample` and `colsample_*` of 1); otherwise each continuation draws
+    from a different random stream, so final-rung scores are close to, not equal to, `RandomizedSearchCV`'s.
+    The refit best estimator is always trained from scratch.
+
+    Parameters
+    ----------
+    estimator : XGBClassifier (unfitted)
+        Base model; must accept `n_estimators` and continue training through `fit(..., xgb_model=...)`.
+    param_distributions : dict
+        Same format as `RandomizedSearchCV`; `n_estimators` (if present) is each configuration's full budget.
+    n_iter : int
+        Number of sampled configurations (default is 50).
+    scoring : str
+        Any sklearn scorer name (default is "roc_auc").
+    cv : WalkForwardSplit
+        Splitter whose folds are in chronological order; early rungs use the earliest folds.
+    eta : int
+        Halving factor: the fraction 1/eta of configurations survives each rung (default is 3).
+    min_resource : int or None
+        Boosting rounds in the first rung. If None, the largest `n_estimators` divided by eta per later rung.
+    n_jobs : int
+        Number of worker processes per rung; -1 uses every core (default is 1). When above 1, each worker
+        trains with a single thread instead of the estimator's own `n_jobs`.
+    refit : bool
+        Refit the best configuration on all of X (default is True).
+    random_state : int or None
+        Seed for sampling configurations.
+
+    Attributes
+    ----------
+    best_params_, best_score_, best_estimator_
+        As in `RandomizedSearchCV`.
+    cv_results_ : pd.DataFrame
+        One row per (rung, candidate) with 'rung', 'candidate', 'n_rounds', 'n_folds', 'mean_test_score' and 'params'.
+    compute_ : dict
+        Boosting rounds x training rows actually trained vs the exhaustive random search over the same
+        configurations ('trained', 'exhaustive', 'saved_fraction').
+    """
+
+    def __init__(self, estimator, param_distributions, n_iter=50, scoring="roc_auc", cv=None, eta=3,
+                 min_resource=None, n_jobs=1, refit=True, random_state=None):
+        self.estimator = estimator
+        self.param_distributions = param_distributions
+        self.n_iter = n_iter
+        self.scoring = scoring
+        self.cv = cv
+        self.eta = eta
+        self.min_resource = min_resource
+        self.n_jobs = n_jobs
+        self.refit = refit
+        self.random_state = random_state
+
+    def fit(self, X, y, matrices=None):
+        """
+        Run the search; returns self.
+
+        `matrices` (a TrainingMatrices over X, y and the same cv) lets the caller share quantized fold matrices
+        with later fits; otherwise they are built here, once per fold.
+        """
+        scorer = get_scorer(self.scoring)
+        candidates = list(ParameterSampler(self.param_distributions, self.n_iter, random_state=self.random_state))
+        full_rounds = np.array([c.get("n_estimators", self.estimator.get_params()["n_estimators"] or 100)
+                                for c in candidates])
+        matrices = matrices if matrices is not None else TrainingMatrices(X, y, cv=self.cv)
+        folds = matrices.folds
+
+        # rung schedule: rounds grow by eta up to the largest budget, folds grow linearly up to all folds
+        n_rungs = int(math.floor(math.log(len(candidates), self.eta))) + 1
+        max_resource = full_rounds.max()
+        min_resource = self.min_resource or max(1, int(max_resource // self.eta ** (n_rungs - 1)))
+        rounds = [min(max_resource, min_resource * self.eta ** i) for i in range(n_rungs)]
+        rounds[-1] = max_resource
+        n_folds = [max(1, math.ceil(len(folds) * (i + 1) / n_rungs)) for i in range(n_rungs)]
+
+        boosters = {}   # (candidate, fold) -> (booster, rounds trained)
+        alive = list(range(len(candidates)))
+        records = []
+        trained = 0
+        for rung in range(n_rungs):
+            # tasks grouped by fold, so each fold's quantized matrix is built once (once per worker)
+            tasks = {f: [(c, min(rounds[rung], full_rounds[c]), boosters.get((c, f))) for c in alive]
+                     for f in range(n_folds[rung])}
+            if self.n_jobs != 1 and len(alive) > 1:
+                from joblib import Parallel, delayed
+                # one thread per worker: n_jobs=-1 inside n_jobs=-1 workers oversubscribes every core
+                single_thread = clone(self.estimator).set_params(n_jobs=1)
+                out = Parallel(n_jobs=self.n_jobs)(
+                    delayed(_advance_fold)(single_thread, candidates, X, y, folds[f], scorer, fold_tasks)
+                    for f, fold_tasks in tasks.items())
+            else:
+                out = [_advance_fold(self.estimator, candidates, X, y, folds[f], scorer, fold_tasks, matrices.fold(f))
+                       for f, fold_tasks in tasks.items()]
+
+            scores = {}
+            for (f, fold_tasks), fold_out in zip(tasks.items(), out):
+                for (c, target, _), (booster, score, added) in zip(fold_tasks, fold_out):
+                    boosters[(c, f)] = (booster, target)
+                    scores.setdefault(c, []).append(score)
+                    trained += added * len(folds[f][0])
+
+            mean_scores = {c: np.mean(s) for c, s in scores.items()}
+            for c in alive:
+                records.append({'rung': rung, 'candidate': c, 'n_rounds': min(rounds[rung], full_rounds[c]),
+                                'n_folds': n_folds[rung], 'mean_test_score': mean_scores[c], 'params': candidates[c]})
+
+            # keep the best 1/eta; failed fits (NaN) rank last
+            keep = max(1, len(alive) // self.eta) if rung < n_rungs - 1 else 1
+            ranked = sorted(alive, key=lambda c: -np.nan_to_num(mean_scores[c], nan=-np.inf))
+            alive = ranked[:keep]
+
+        best = alive[0]
+        self.cv_results_ = pd.DataFrame(records)
+        self.best_params_ = candidates[best]
+        self.best_score_ = mean_scores[best]
+
+        exhaustive = sum(int(full_rounds[c]) * len(train_idx) for c in range(len(candidates)) for train_idx, _ in folds)
+        self.compute_ = {'trained': int(trained), 'exhaustive': int(exhaustive),
+                         'saved_fraction': float(1 - trained / exhaustive)}
+
+        if self.refit:
+            self.best_estimator_ = clone(self.estimator).set_params(**self.best_params_)
+            self.best_estimator_.load_model(bytearray(train_booster(self.best_estimator_, matrices.full()).save_raw()))
+        return self
+
+
+def _advance_fold(estimator, candidates, X, y, fold, scorer, fold_tasks, prebuilt=None):
+    """
+    Train configurations on one fold up to their target rounds, continuing their boosters from the last rung.
+
+    `fold_tasks` holds (candidate, target rounds, (booster, rounds) or None) entries. Returns one
+    (booster, validation score, rounds added) per task.
+    """
+    if prebuilt is None:
+        train_idx, test_idx = fold
+        prebuilt = TrainingMatrices(_take(X, train_idx), _take(y, train_idx)).full(), _take(X, test_idx), _take(y, test_idx)
+    dtrain, X_test, y_test = prebuilt
+
+    out = []
+    for c, target_rounds, previous in fold_tasks:
+        booster, done = previous if previous is not None else (None, 0)
+        model = clone(estimator).set_params(**candidates[c])
+        if done < target_rounds:
+            booster = train_booster(model, dtrain, num_boost_round=target_rounds - done, xgb_model=booster)
+        # else: already at its full n_estimators in an earlier rung
+
+        model.load_model(bytearray(booster.save_raw()))
+        try:
+            score = scorer(model, X_test, y_test)
+        except ValueError:
+            # e.g. a single-class test fold; RandomizedSearchCV scores these as NaN too
+            score = np.nan
+        out.append((booster, score, target_rounds - done))
+    return out
+
+
+def _take(data, idx):
+    return data.iloc[idx] if hasattr(data, "iloc") else np.asarray(data)[idx]
@@ -0,0 +1,162 @@
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from find_local_extrema import find_local_extrema_multi
+from detect_double_tops import enumerate_peak_pairs
+from confirm_double_tops import first_close_below
+from price_panel import load_price_data, list_tickers
+
+DEFAULT_PARAMS = {'peak_window': 3, 'peak_tolerance': 0.01, 'min_peak_gap': 15, 'max_peak_gap': 30,
+                  'min_trough_drop': 0.03, 'require_lower_second_vol': True, 'max_confirm_days': 40}
+
+def expand_param_grid(param_grid):
+    """
+    Expand a dict of parameter lists into one row per combination, filling unspecified parameters with pipeline defaults.
+
+    Parameters
+    ----------
+    param_grid : dict
+        Maps any of the `detect_double_tops` parameters and 'max_confirm_days' to a list of values.
+    """
+    unknown = set(param_grid) - set(DEFAULT_PARAMS)
+    if unknown:
+        raise ValueError(f"Unknown sweep parameters: {sorted(unknown)}")
+
+    grid = {name: list(param_grid.get(name, [default])) for name, default in DEFAULT_PARAMS.items()}
+    return pd.DataFrame(list(itertools.product(*grid.values())), columns=list(grid))
+
+
+def sweep_double_tops(tickers, param_grid, horizons=(5, 20, 60), workers=None):
+    """
+    Evaluate double top detection over a whole parameter grid, sharing the expensive work across grid cells.
+
+    Per ticker, extrema are computed once for every `peak_window`, the widest peak-pair set is enumerated
+    once per window, and first closes below the neckline and forward returns are computed once per pair.
+    Each grid cell is then a set of boolean filters over those pairs, so the cost of a cell is a few
+    vectorized comparisons rather than a pipeline run.
+
+    Parameters
+    ----------
+    tickers : list of str
+        Ticker symbols to process.
+    param_grid : dict
+        Maps parameter names to lists of values, see `expand_param_grid`.
+    horizons : tuple of int
+        Forward-return horizons in trading days.
+    workers : int or None
+        Number of worker processes; None uses every core, 1 runs serially in this process.
+
+    Returns
+    -------
+    pd.DataFrame
+        Tidy (params x ticker x horizon) table with the parameter columns, 'symbol', 'horizon',
+        'n_candidates', 'n_confirmed' and the `summarize_returns` statistics of confirmed-event returns.
+    """
+    cells = expand_param_grid(param_grid)
+    n = len(tickers)
+    args = ([cells] * n, [tuple(horizons)] * n)
+
+    if workers == 1:
+        results = list(map(_sweep_ticker, tickers, *args))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_sweep_ticker, tickers, *args, chunksize=8))
+
+    return pd.concat(results, ignore_index=True)
+
+
+def _sweep_ticker(ticker, cells, horizons):
+    """
+    Worker for `sweep_double_tops`: every grid cell for one ticker.
+    """
+    df = load_price_data(ticker)
+    close = df['Close'].to_numpy()
+    horizons = np.asarray(horizons, dtype=np.int64)
+    extrema = find_local_extrema_multi(df['High'].to_numpy(), df['Low'].to_numpy(), cells['peak_window'].unique())
+
+    frames = []
+    for window, group in cells.groupby('peak_window', sort=False):
+        local_high, local_low = extrema[window]
+
+        # widest pair set any cell in this window group can ask for
+        pairs = enumerate_peak_pairs(df, local_high, local_low, group['min_peak_gap'].min(),
+                                     group['max_peak_gap'].max(), group['peak_tolerance'].max())
+        gap = pairs['t2'] - pairs['t1']
+        vol_ok = pairs['vol2'] < pairs['vol1']
+
+        # first close below the neckline is the same for every confirmation window; cells only cap it
+        confirm_pos = first_close_below(df, pairs['t2'], pairs['trough_price'], group['max_confirm_days'].max())
+        has_confirm = confirm_pos >= 0
+        confirm_days = np.where(has_confirm, df.index.to_numpy()[confirm_pos] - pairs['t2'], np.iinfo(np.int64).max)
+
+        # (pairs x horizons) forward returns from each pair's confirmation close
+        pos_fwd = confirm_pos[:, None] + horizons[None, :]
+        valid = has_confirm[:, None] & (pos_fwd < len(close))
+        rets = np.where(valid, close[np.where(valid, pos_fwd, 0)] / close[confirm_pos][:, None] - 1.0, np.nan)
+
+        # (cells x pairs) membership masks
+        col = lambda name: group[name].to_numpy()[:, None]
+        candidate = ((gap >= col('min_peak_gap')) & (gap <= col('max_peak_gap'))
+                     & (pairs['peak_diff'] <= col('peak_tolerance'))
+                     & ~(pairs['trough_drop'] < col('min_trough_drop'))
+                     & (~col('require_lower_second_vol').astype(bool) | vol_ok))
+        confirmed = candidate & (confirm_days <= col('max_confirm_days'))
+
+        for k, h in enumerate(horizons):
+            summary = _masked_summary(confirmed, rets[:, k])
+            summary.insert(0, 'n_confirmed', confirmed.sum(axis=1))
+            summary.insert(0, 'n_candidates', candidate.sum(axis=1))
+            summary.insert(0, 'horizon', h)
+            summary.insert(0, 'symbol', ticker)
+            frames.append(pd.concat([group.reset_index(drop=True), summary], axis=1))
+
+    return pd.concat(frames, ignore_index=True)
+
+
+def _masked_summary(mask, ret):
+    """
+    `summarize_returns` statistics for every row of a (cells x pairs) mask over one return vector.
+    """
+    mask = mask & ~np.isnan(ret)
+    r = np.nan_to_num(ret)
+    n = mask.sum(axis=1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = (mask * r).sum(axis=1) / n
+        std = np.sqrt((mask * (r - mean[:, None]) ** 2).sum(axis=1) / (n - 1))
+        t_stat = mean / (std / np.sqrt(n))
+        p_value = 2 * stats.t.sf(np.abs(t_stat), n - 1)
+        hit_ratio_neg = (mask & (r < 0)).sum(axis=1) / n
+        sharpe = np.where(std > 0, mean / std, np.nan)
+
+    out = pd.DataFrame({
+        'n': n,
+        'mean': mean,
+        'std': std,
+        't_stat': t_stat,
+        'p_value': p_value,
+        'hit_ratio_neg': hit_ratio_neg,
+        'sharpe': sharpe,
+        'cohen_d': sharpe
+    })
+
+    # same small-sample cutoff as summarize_returns
+    out.loc[n < 5, 'mean':] = np.nan
+    return out
+
+
+if __name__ == "__main__":
+    param_grid = {
+        'peak_tolerance': [0.005, 0.01, 0.02, 0.03],
+        'min_peak_gap': [5, 10, 15, 20, 25],
+        'max_peak_gap': [30, 40, 60, 90, 120],
+        'min_trough_drop': [0.02, 0.03, 0.05, 0.08, 0.1],
+        'max_confirm_days': [20, 40],
+    }
+    sweep = sweep_double_tops(list_tickers(), param_grid)
+    sweep.to_csv('double_top_param_sweep.csv', index=False)
+    print(f"Saved {len(sweep)} rows to double_top_param_sweep.csv")
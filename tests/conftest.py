@@ -0,0 +1,29 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture(autouse=True)
+def repo_root(monkeypatch):
+    # data paths (sp500/sp500, sp500/panel, the labeled set) are relative to the repository root
+    monkeypatch.chdir(ROOT)
+
+
+@pytest.fixture(scope="session")
+def sample_tickers():
+    """
+    Every 20th ticker of the bundled universe plus AAPL, enough to cover listings, gaps in signals and edge cases.
+    """
+    from price_panel import list_tickers
+
+    cwd = os.getcwd()
+    os.chdir(ROOT)
+    try:
+        tickers = list_tickers()
+    finally:
+        os.chdir(cwd)
+    return sorted(set(tickers[::20]) | {'AAPL'})
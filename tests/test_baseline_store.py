@@ -0,0 +1,31 @@
+import baseline_store
+import price_panel
+from ma_crossover_signals import ma_crossover_signals
+from price_panel import load_price_data
+from sample_random_events import sample_random_events
+from stage_graph import StageCache
+
+
+def test_stored_baselines_are_served_without_prices(tmp_path, monkeypatch):
+    df = load_price_data('AAPL')
+    store = baseline_store.BaselineStore(StageCache(str(tmp_path)))
+    ma, rand = store.ma_events('AAPL'), store.random_events('AAPL', n_events=12)
+    assert ma.equals(ma_crossover_signals(df))
+    assert rand.equals(sample_random_events(df, n_events=12))
+
+    loads = []
+    monkeypatch.setattr(baseline_store, 'load_price_data', lambda *a, **k: loads.append(a))
+    monkeypatch.setattr(price_panel, 'load_price_data', lambda *a, **k: loads.append(a))
+    reopened = baseline_store.BaselineStore(StageCache(str(tmp_path)))
+    assert reopened.ma_events('AAPL').equals(ma)
+    assert reopened.random_events('AAPL', n_events=12).equals(rand)
+    assert loads == []
+
+
+def test_empty_random_baselines_keep_their_columns(tmp_path):
+    df = load_price_data('AAPL')
+    store = baseline_store.BaselineStore(StageCache(str(tmp_path)))
+    for frame, n_events in ((df, 0), (df.iloc[:100], 5)):   # no events asked for / too short for the buffer
+        rand = sample_random_events(frame, n_events=n_events)
+        assert rand.empty and list(rand) == ['confirm_date', 'confirm_price', 'ret_5d', 'ret_20d', 'ret_60d', 'type']
+        assert store.random_events('AAPL', n_events=n_events, df=frame).equals(rand)
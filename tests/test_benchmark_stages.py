@@ -0,0 +1,37 @@
+import pytest
+
+from benchmark_stages import BENCHMARKS, _ticker_inputs, check_regressions, run_benchmark
+
+
+def _run(**walls):
+    return {'results': {name: {'wall_s': wall, 'peak_mb': 10.0, **({'regressed': True} if flag else {})}
+                        for name, (wall, flag) in walls.items()}}
+
+
+def test_check_regressions_against_recent_median():
+    history = [_run(a=(1.0, False), b=(2.0, False)), _run(a=(1.1, False), b=(2.0, False)), _run(a=(0.9, False))]
+    results = {'a': {'wall_s': 1.2, 'peak_mb': 10.0}, 'b': {'wall_s': 2.6, 'peak_mb': 10.0},
+               'new': {'wall_s': 5.0, 'peak_mb': 99.0}}
+    messages = check_regressions(results, history, threshold=0.25)
+    assert messages == ["b: wall_s 2.6 vs baseline 2 (+30%)"]
+    assert results['b']['regressed'] and 'regressed' not in results['a'] and 'regressed' not in results['new']
+
+    # only the last `window` runs count
+    assert check_regressions({'a': {'wall_s': 1.2, 'peak_mb': 10.0}}, [_run(a=(0.5, False))] + history, window=3) == []
+    assert check_regressions({'a': {'wall_s': 1.2, 'peak_mb': 10.0}}, history, window=1)[0].startswith('a: wall_s')
+
+
+def test_flagged_runs_stay_out_of_the_baseline():
+    # a persistent slowdown keeps failing instead of becoming the baseline after `window` runs
+    history = [_run(a=(1.0, False))] + [_run(a=(2.0, True)) for _ in range(5)]
+    results = {'a': {'wall_s': 2.0, 'peak_mb': 10.0}}
+    assert check_regressions(results, history, window=5) == ["a: wall_s 2 vs baseline 1 (+100%)"]
+
+
+@pytest.mark.parametrize('name', ['find_local_extrema', 'detect_double_tops', 'confirm_double_tops',
+                                  'compute_forward_returns', 'ma_crossover_signals', 'evaluate_all'])
+def test_ticker_benchmarks_count_their_events(name):
+    assert BENCHMARKS[name][0] is _ticker_inputs
+    result = run_benchmark(name, repeat=1)
+    assert result['events'] > 0 and result['wall_s'] > 0 and result['peak_mb'] > 0
+    assert result['events_per_s'] == pytest.approx(result['events'] / result['wall_s'])
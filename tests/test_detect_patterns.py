@@ -0,0 +1,167 @@
+import json
+
+import numpy as np
+import pytest
+
+from detect_patterns import (LAYOUTS, MATCHERS, detect_patterns, extrema_sequence, match_double_bottoms,
+                             match_double_tops, match_head_and_shoulders, match_pennants_and_flags, match_triangles,
+                             patterns_to_records)
+from price_panel import load_price_data
+
+
+def _seq(points):
+    """
+    Hand-built alternating sequence from (position, price, is_peak) triples.
+    """
+    pos, price, is_peak = map(np.array, zip(*points))
+    return {'pos': pos.astype(np.int64), 'price': price.astype(float), 'is_peak': is_peak.astype(bool)}
+
+
+def _bars(close, high=None, low=None, volume=None):
+    close = np.asarray(close, dtype=float)
+    return {
+        'close': close,
+        'high': close + 0.5 if high is None else np.asarray(high, dtype=float),
+        'low': close - 0.5 if low is None else np.asarray(low, dtype=float),
+        'volume': np.full(len(close), 1000.0) if volume is None else np.asarray(volume, dtype=float),
+        'date': np.datetime_as_string(np.datetime64('2022-01-03', 'ns') + np.arange(len(close)) * np.timedelta64(1, 'D')),
+    }
+
+
+# extrema_sequence
+
+def test_extrema_sequence_alternates_and_keeps_run_extremes():
+    highs = np.array([5, 9, 7, 9, 3, 4, 8, 2, 6, 1], dtype=float)
+    lows = highs - 1
+    local_high = np.array([0, 1, 0, 1, 0, 0, 1, 0, 0, 0], bool)
+    local_low = np.array([0, 0, 0, 0, 1, 1, 1, 0, 0, 1], bool)
+    seq = extrema_sequence(local_high, local_low, highs, lows)
+    # peaks 1 and 3 tie at 9: the first is kept; troughs 4 and 5: the lower low (4 at 2.0) is kept;
+    # bar 6 is both, so it comes as a peak then a trough, and the trough run 6, 9 keeps the lowest low (9)
+    assert seq['pos'].tolist() == [1, 4, 6, 9]
+    assert seq['is_peak'].tolist() == [True, False, True, False]
+    assert seq['price'].tolist() == [9, 2, 8, 0]
+
+
+def test_extrema_sequence_empty():
+    seq = extrema_sequence(np.zeros(5, bool), np.zeros(5, bool), np.ones(5), np.ones(5))
+    assert len(seq['pos']) == len(seq['price']) == len(seq['is_peak']) == 0
+
+
+def test_extrema_sequence_on_real_prices_alternates():
+    df = load_price_data('AAPL')
+    from find_local_extrema import find_local_extrema
+
+    local_high, local_low = find_local_extrema(df, window=10)
+    seq = extrema_sequence(local_high.to_numpy(), local_low.to_numpy(), df['High'].to_numpy(), df['Low'].to_numpy())
+    assert (seq['is_peak'][1:] != seq['is_peak'][:-1]).all()
+    assert (np.diff(seq['pos']) >= 0).all()
+
+
+# matchers on hand-built formations
+
+def test_double_top_and_bottom():
+    bars = _bars(np.full(60, 100.0))
+    top = match_double_tops(_seq([(10, 100, True), (30, 90, False), (50, 100.5, True)]), bars)
+    assert top['type'].tolist() == ['Double Top'] and top['valid'].tolist() == [True]
+    assert top['support_level'].tolist() == [90] and top['validation_reasons'][0] == ['All criteria met']
+
+    uneven = match_double_tops(_seq([(10, 100, True), (30, 90, False), (50, 110, True)]), bars)
+    assert not uneven['valid'][0] and uneven['validation_reasons'][0] == ['Peaks not similar: 10.0% difference']
+
+    bottom = match_double_bottoms(_seq([(10, 50, False), (30, 60, True), (50, 50.5, False)]), bars)
+    assert bottom['type'].tolist() == ['Double Bottom'] and bottom['valid'].tolist() == [True]
+    assert bottom['resistance_level'].tolist() == [60]
+    assert len(match_double_tops(_seq([(10, 50, False), (30, 60, True), (50, 50.5, False)]), bars)['type']) == 0
+
+
+def test_head_and_shoulders():
+    bars = _bars(np.full(100, 100.0))
+    points = [(0, 100, True), (20, 90, False), (40, 110, True), (60, 91, False), (80, 101, True)]
+    hs = match_head_and_shoulders(_seq(points), bars)
+    assert hs['valid'].tolist() == [True] and hs['confidence'].tolist() == [0.9]
+    assert hs['neckline_level'].tolist() == [90.5] and hs['head_index'].tolist() == [40]
+
+    points[2] = (40, 102, True)
+    low_head = match_head_and_shoulders(_seq(points), bars)
+    assert low_head['validation_reasons'][0] == ["Head not significantly higher than shoulders"]
+
+
+@pytest.mark.parametrize('peaks, troughs, kind', [
+    ((110, 105), (90, 95), 'Symmetric Triangle'),
+    ((110, 110), (90, 100), 'Ascending Triangle'),
+    ((110, 100), (90, 90), 'Descending Triangle'),
+])
+def test_triangles(peaks, troughs, kind):
+    seq = _seq([(0, peaks[0], True), (10, troughs[0], False), (20, peaks[1], True), (30, troughs[1], False)])
+    out = match_triangles(seq, _bars(np.full(40, 100.0)))
+    assert out['type'].tolist() == [kind] and out['valid'].tolist() == [True]
+    assert out['peak_indices'][0] == [0, 20] and out['trough_indices'][0] == [10, 30]
+
+
+def test_rectangle_is_not_a_triangle():
+    seq = _seq([(0, 110, True), (10, 90, False), (20, 110, True), (30, 90, False)])
+    assert len(match_triangles(seq, _bars(np.full(40, 100.0)))['type']) == 0
+
+
+def _pole_and_consolidation(bull, upper_step, lower_step):
+    sign = 1 if bull else -1
+    t = np.arange(21)
+    pole = 100 + sign * 2.0 * np.arange(11)            # +-20% over 10 days
+    top, bottom = pole[-1] + 1 + upper_step * t, pole[-1] - 3 + lower_step * t
+    close = np.r_[pole, ((top + bottom) / 2)[1:], np.full(5, pole[-1])]
+    high = np.r_[pole + 0.5, top[1:], np.full(5, pole[-1] + 0.5)]
+    low = np.r_[pole - 0.5, bottom[1:], np.full(5, pole[-1] - 0.5)]
+    high[10], low[10] = top[0], bottom[0]
+    volume = np.r_[np.full(10, 1000.0), np.full(len(close) - 10, 400.0)]
+    return _seq([(10, high[10] if bull else low[10], bull)]), _bars(close, high, low, volume)
+
+
+@pytest.mark.parametrize('bull, upper_step, lower_step, kind', [
+    (True, -0.1, -0.1, 'Bull Flag'),
+    (True, -0.2, 0.1, 'Bull Pennant'),
+    (False, 0.1, 0.1, 'Bear Flag'),
+    (False, -0.1, 0.2, 'Bear Pennant'),
+])
+def test_pennants_and_flags(bull, upper_step, lower_step, kind):
+    seq, bars = _pole_and_consolidation(bull, upper_step, lower_step)
+    out = match_pennants_and_flags(seq, bars)
+    assert out['type'].tolist() == [kind]
+    assert out['valid'].tolist() == [True], out['validation_reasons']
+    assert out['pole_duration_days'].tolist() == [10] and out['pattern_end_date'][0] == bars['date'][30]
+
+
+# JSON records
+
+def test_records_follow_the_reference_layout():
+    with open('outputs/aapl_patterns_3yr.json') as f:
+        reference = json.load(f)
+    aapl = load_price_data('AAPL').iloc[-753:].reset_index(drop=True)
+    records = patterns_to_records(detect_patterns(aapl))
+    assert {r['type'] for r in records} <= set(LAYOUTS)
+
+    ref_by_type = {}
+    for r in reference:
+        ref_by_type.setdefault(r['type'], r)
+    shared = {r['type'] for r in records} & set(ref_by_type)
+    assert len(shared) >= 5
+    for record in records:
+        ref = ref_by_type.get(record['type'])
+        if ref is None:
+            continue
+        assert list(record) == list(ref), record['type']
+        for key, value in ref.items():
+            if isinstance(value, dict):
+                assert list(record[key]) == list(value), (record['type'], key)
+            else:
+                assert type(record[key]) is type(value) or {type(record[key]), type(value)} <= {int, float}, key
+        for key in ('start_date', 'pole_start_date'):
+            if key in ref:
+                assert len(record[key]) == len(ref[key]) and record[key][10] == 'T'
+
+
+def test_matchers_registry_covers_layouts():
+    aapl = load_price_data('AAPL')
+    events = detect_patterns(aapl, patterns=['double_top'])
+    assert set(events['type'].astype(str)) == {'Double Top'}
+    assert set(MATCHERS) == {'head_and_shoulders', 'double_top', 'double_bottom', 'triangle', 'pennant_flag'}
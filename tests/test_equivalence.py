@@ -0,0 +1,635 @@
+"""
+Equivalence of the vectorized kernels with the original implementations they replaced.
+
+Each reference below is the original code, unchanged apart from its name (the technical features, which had no
+earlier version, are checked against a pandas formulation); the tests run both over a sample of the bundled
+universe (see conftest.sample_tickers) and require identical output.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.metrics import (
+    accuracy_score,
+    precision_score,
+    recall_score,
+    f1_score,
+    roc_auc_score,
+    average_precision_score,
+    brier_score_loss,
+)
+
+from compute_all_metrics import compute_all_metrics_batch, threshold_curves
+from compute_forward_returns import compute_forward_returns
+from confirm_double_tops import confirm_double_tops
+from detect_double_tops import detect_double_tops
+from event_store import read_events
+from feature_store import TECHNICAL_FEATURES, FeatureStore, add_technical_features, technical_features
+from find_local_extrema import find_local_extrema, find_local_extrema_multi
+from grouped_statistics import evaluate_grouped, stack_returns
+from ma_crossover_signals import ma_crossover_signals
+from price_panel import load_price_data, open_price_panel
+from stage_graph import StageCache
+from streaming_double_tops import StreamingDoubleTopDetector
+
+DETECT_PARAM_SETS = [{}, {'peak_window': 5, 'peak_tolerance': 0.02, 'min_peak_gap': 10, 'max_peak_gap': 40,
+                          'min_trough_drop': 0.02, 'require_lower_second_vol': False}]
+
+
+# detect_double_tops
+
+def detect_double_tops_loop(
+    df,
+    peak_window=3,
+    peak_tolerance=0.01,
+    min_peak_gap=15,
+    max_peak_gap=30,
+    min_trough_drop=0.03,
+    require_lower_second_vol=True
+):
+    """
+    Original row-by-row implementation of `detect_double_tops`.
+    """
+    local_high, local_low = find_local_extrema(df, window=peak_window)
+    
+    peaks = df[local_high].copy()
+    troughs = df[local_low].copy()
+
+    peaks_idx = peaks.index
+    events = []
+
+    for i in range(len(peaks_idx)):
+        t1 = peaks_idx[i]
+        p1 = peaks.loc[t1]
+
+        # look for second peak within [min_peak_gap, max_peak_gap] days
+        min_date = t1 + min_peak_gap
+        max_date = t1 + max_peak_gap
+
+        candidate_peaks2 = peaks[(peaks.index >= min_date) & (peaks.index <= max_date)]
+        
+        # edge case for no candidate second peaks, like for the last peak in the data
+        if candidate_peaks2.empty:
+            continue
+
+        for t2, p2 in candidate_peaks2.iterrows():
+            price1 = p1['High']
+            price2 = p2['High']
+
+            # peaks similar in height
+            if abs(price2 - price1) / price1 > peak_tolerance:
+                continue
+
+            # trough between them
+            mid_troughs = troughs[(troughs.index > t1) & (troughs.index < t2)]
+            if mid_troughs.empty:
+                continue
+            
+            trough_date = mid_troughs['Low'].idxmin()
+            trough_price = mid_troughs.loc[trough_date, 'Low']
+
+            # trough must be meaningfully below peaks
+            avg_peak = (price1 + price2) / 2
+            if (avg_peak - trough_price) / avg_peak < min_trough_drop:
+                continue
+
+            # second peak trading volume must be lower than first
+            vol1 = p1['Volume']
+            vol2 = p2['Volume']
+            if require_lower_second_vol and not (vol2 < vol1):
+                continue
+
+            # add to return df
+            # all dates saved as index rather than actual date; relevant in later functions
+            events.append({
+                'peak1_date': t1,
+                'peak2_date': t2,
+                'trough_date': trough_date,
+                'peak1_price': price1,
+                'peak2_price': price2,
+                'trough_price': trough_price,
+                'peak_gap_days': (t2 - t1),
+                'vol1': vol1,
+                'vol2': vol2,
+                'vol2_vol1_ratio': vol2 / vol1 if vol1 > 0 else np.nan
+            })
+
+    events_df = pd.DataFrame(events)
+    return events_df
+
+
+def test_detect_double_tops_matches_loop(sample_tickers):
+    for ticker in sample_tickers:
+        df = load_price_data(ticker)
+        for params in DETECT_PARAM_SETS:
+            pd.testing.assert_frame_equal(detect_double_tops(df, **params), detect_double_tops_loop(df, **params))
+
+
+# confirm_double_tops
+
+def confirm_double_tops_loop(df, events_df, max_confirm_days=20):
+    """
+    Original row-by-row implementation of `confirm_double_tops`.
+    """
+    confirmed = []
+
+    for _, row in events_df.iterrows():
+        
+        # extracting relevant candidate event details
+        t2 = row['peak2_date']
+        neck_price = row['trough_price']
+
+        # defining window to search for confirmation
+        start = t2 + 1
+        end = t2 + max_confirm_days
+
+        # creating subset of data within the confirmation window
+        post = df.loc[(df.index >= start) & (df.index <= end)]
+
+        # checking for close below neckline; if found, record confirmation price and date
+        below = post[post['Close'] < neck_price]
+        if below.empty:
+            continue
+
+        confirm_date = below.index[0]
+        confirm_price = below.loc[confirm_date, 'Close']
+
+        # add confirmed event to return df with additional confirmation details
+        r = row.to_dict()
+        r.update({
+            'confirm_date': confirm_date,
+            'confirm_price': confirm_price
+        })
+        confirmed.append(r)
+
+    confirmed_df = pd.DataFrame(confirmed)
+    return confirmed_df
+
+
+def test_confirm_double_tops_matches_loop(sample_tickers):
+    for ticker in sample_tickers:
+        df = load_price_data(ticker)
+        candidates = detect_double_tops(df)
+        for max_confirm_days in (20, 40):
+            # iterrows upcasts the integer position columns to float in the loop version
+            pd.testing.assert_frame_equal(confirm_double_tops(df, candidates, max_confirm_days),
+                                          confirm_double_tops_loop(df, candidates, max_confirm_days),
+                                          check_dtype=False)
+
+
+# compute_forward_returns
+
+def compute_forward_returns_loop(df, events_df, predicted = False, horizons=(5, 20, 60)):
+    """
+    Original row-by-row implementation of `compute_forward_returns`.
+    """
+    events_df = events_df.copy()
+    
+    # compute forward returns for each specified horizon
+    for h in horizons:
+        col = f'ret_{h}d'
+        vals = []
+        for _, row in events_df.iterrows():
+            
+            # index at double top confirmation date
+            if predicted:
+                t0 = row['peak2_pos'] + 1 # returns must be calculated from the first day after closing at a second peak
+            else:
+                t0 = row['confirm_date']
+
+            # index at the given horizon if t0 + h is within df index range; edge case to avoid erroring out
+            t_fwd = df.index[df.index.get_loc(t0) + h] if (df.index.get_loc(t0) + h) < len(df.index) else None
+            if t_fwd is None:
+                vals.append(np.nan)
+                continue
+            
+            # Calculating forward return from confirmation date to horizon date
+            price0 = df.loc[t0, 'Close']
+            price1 = df.loc[t_fwd, 'Close']
+            vals.append(price1 / price0 - 1.0)
+        events_df[col] = vals
+    return events_df
+
+
+def test_compute_forward_returns_matches_loop(sample_tickers):
+    for ticker in sample_tickers:
+        df = load_price_data(ticker)
+        confirmed = confirm_double_tops(df, detect_double_tops(df), max_confirm_days=40)
+        if confirmed.empty:
+            continue
+        pd.testing.assert_frame_equal(compute_forward_returns(df, confirmed),
+                                      compute_forward_returns_loop(df, confirmed))
+        predicted = confirmed.rename(columns={'peak2_date': 'peak2_pos'})
+        predicted = predicted[predicted['peak2_pos'] + 1 < len(df)]
+        pd.testing.assert_frame_equal(compute_forward_returns(df, predicted, predicted=True),
+                                      compute_forward_returns_loop(df, predicted, predicted=True))
+
+
+# find_local_extrema
+
+def find_local_extrema_rolling(df, window=3):
+    """
+    Original pandas rolling implementation of `find_local_extrema`.
+    """
+    highs = df['High']
+    lows = df['Low']
+
+    local_high = (highs == highs.rolling(window*2+1, center=True).max())
+    local_low = (lows == lows.rolling(window*2+1, center=True).min())
+
+    return local_high.fillna(False), local_low.fillna(False)
+
+
+def test_find_local_extrema_matches_rolling(sample_tickers):
+    windows = [1, 2, 3, 5, 8, 13]
+    for ticker in sample_tickers:
+        df = load_price_data(ticker)
+        multi = find_local_extrema_multi(df['High'].to_numpy(), df['Low'].to_numpy(), windows)
+        for w in windows:
+            ref_high, ref_low = find_local_extrema_rolling(df, w)
+            local_high, local_low = find_local_extrema(df, w)
+            pd.testing.assert_series_equal(local_high, ref_high)
+            pd.testing.assert_series_equal(local_low, ref_low)
+            assert (multi[w][0] == ref_high.to_numpy()).all() and (multi[w][1] == ref_low.to_numpy()).all()
+
+
+# compute_all_metrics
+
+def compute_all_metrics_sklearn(y_true, y_prob, threshold=0.5):
+    """
+    Original sklearn implementation of `compute_all_metrics`.
+    """
+    y_pred = (y_prob >= threshold).astype(int)
+
+    metrics = {
+        "accuracy": accuracy_score(y_true, y_pred),
+        "precision": precision_score(y_true, y_pred, zero_division=0),
+        "recall": recall_score(y_true, y_pred, zero_division=0),
+        "f1": f1_score(y_true, y_pred, zero_division=0),
+        "roc_auc": roc_auc_score(y_true, y_prob),
+        "pr_auc": average_precision_score(y_true, y_prob),
+        "brier": brier_score_loss(y_true, y_prob),
+    }
+
+    return metrics
+
+
+def test_batched_metrics_match_sklearn():
+    # tied and rounded probabilities included
+    rng = np.random.default_rng(0)
+    for trial in range(50):
+        n = rng.integers(5, 400)
+        y = rng.random(n) < rng.uniform(0.1, 0.9)
+        y[:2] = [True, False]
+        probs = rng.random((n, 8))
+        probs[:, :4] = np.round(probs[:, :4], rng.integers(1, 3))
+        batch = compute_all_metrics_batch(y, probs, threshold=0.5)
+        for k in range(probs.shape[1]):
+            ref = compute_all_metrics_sklearn(y, probs[:, k])
+            for name, value in ref.items():
+                assert np.isclose(batch[name][k], value, rtol=1e-12, atol=1e-12), (name, batch[name][k], value)
+
+        curves = threshold_curves(y, probs[:, 0])
+        for _, row in curves.sample(min(5, len(curves)), random_state=trial).iterrows():
+            ref = compute_all_metrics_sklearn(y, probs[:, 0], threshold=row['threshold'])
+            for name in ("accuracy", "precision", "recall", "f1"):
+                assert np.isclose(row[name], ref[name]), (name, row[name], ref[name])
+
+
+def test_batched_metrics_reject_single_class():
+    probs = np.random.default_rng(0).random((10, 3))
+    for y in (np.zeros(10), np.ones(10)):
+        with pytest.raises(ValueError):
+            compute_all_metrics_batch(y, probs)
+
+
+# ma_crossover_signals
+
+def ma_crossover_signals_copy(df, short_window=20, long_window=50, horizons=(5, 20, 60)):
+    """
+    Original implementation of `ma_crossover_signals` on a copy of the frame.
+    """
+    data = df.copy()
+    data['ma_short'] = data['Close'].rolling(short_window).mean()
+    data['ma_long'] = data['Close'].rolling(long_window).mean()
+
+    # short MA crossing from above to below long MA, indicating a downward turn in the market
+    
+    # begin ChatGPT section
+    prev = data.shift(1)
+    cond_prev = prev['ma_short'] > prev['ma_long']
+    cond_now = data['ma_short'] <= data['ma_long']
+    signals = data[cond_prev & cond_now].dropna()
+    # end ChatGPT section
+
+    # for all determined ma crossovers, loop through price data to get date and priec
+    events = []
+    for t0, row in signals.iterrows():
+        events.append({'confirm_date': t0, 'confirm_price': row['Close']})
+    ma_df = pd.DataFrame(events)
+
+    # compute forward returns for these ma crossover events
+    ma_df = compute_forward_returns(df, ma_df, horizons=horizons)
+    ma_df['type'] = 'ma_crossover'
+
+    return ma_df
+
+
+def test_ma_crossover_signals_matches_copy(sample_tickers):
+    for ticker in sample_tickers:
+        df = load_price_data(ticker)
+        for short_window, long_window in ((20, 50), (5, 10), (50, 200)):
+            pd.testing.assert_frame_equal(ma_crossover_signals(df, short_window, long_window),
+                                          ma_crossover_signals_copy(df, short_window, long_window))
+        pd.testing.assert_frame_equal(ma_crossover_signals(df.iloc[:30]), ma_crossover_signals_copy(df.iloc[:30]))
+
+
+# feature_store.technical_features
+
+def technical_features_pandas(df):
+    """
+    The technical features with pandas rolling and ewm, as a reference for the array version.
+    """
+    close, high, low, volume = df['Close'], df['High'], df['Low'], df['Volume']
+    prev_close = close.shift(1)
+    delta = close.diff()
+    gain = delta.clip(lower=0).ewm(alpha=1 / 14, adjust=False).mean()
+    loss = (-delta).clip(lower=0).ewm(alpha=1 / 14, adjust=False).mean()
+    true_range = pd.concat([high - low, (high - prev_close).abs(), (low - prev_close).abs()], axis=1).max(axis=1)
+    atr = true_range.ewm(alpha=1 / 14, adjust=False).mean()
+    warm = np.arange(len(df)) < 14
+
+    out = pd.DataFrame(index=df.index)
+    out['rsi_14'] = (100 - 100 / (1 + gain / loss)).where(loss != 0, 100.0).mask(warm)
+    out['atr_14_pct'] = (atr / close).mask(warm)
+    out['volatility_20'] = np.log(close).diff().rolling(20).std()
+    out['volume_z_20'] = (volume - volume.rolling(20).mean()) / volume.rolling(20).std()
+    out['ma20_dist'] = close / close.rolling(20).mean() - 1
+    out['ma50_dist'] = close / close.rolling(50).mean() - 1
+    out['ret_5d_into'] = close.pct_change(5, fill_method=None)
+    out['ret_20d_into'] = close.pct_change(20, fill_method=None)
+    return out
+
+
+def test_technical_features_match_pandas(sample_tickers):
+    panel = open_price_panel()
+    for ticker in sample_tickers:
+        full, _ = technical_features(panel.arrays(ticker))
+        ref = technical_features_pandas(load_price_data(ticker))
+        for c in TECHNICAL_FEATURES:
+            assert np.allclose(full[c], ref[c].to_numpy(), rtol=1e-9, atol=1e-9, equal_nan=True), (ticker, c)
+
+
+def test_technical_features_extend_incrementally(sample_tickers):
+    # history arriving in pieces: compute a prefix, then extend with the rest in uneven chunks
+    panel = open_price_panel()
+    for ticker in sample_tickers:
+        arrays = panel.arrays(ticker)
+        full, _ = technical_features(arrays)
+        n = len(arrays['Close'])
+        cuts = [0, n // 2, n // 2 + 1, n - 7, n]
+        pieces, state = {c: [] for c in TECHNICAL_FEATURES}, None
+        for a, b in zip(cuts[:-1], cuts[1:]):
+            part, state = technical_features({f: v[:b] for f, v in arrays.items()}, start=a, state=state)
+            for c in TECHNICAL_FEATURES:
+                pieces[c].append(part[c])
+        for c in TECHNICAL_FEATURES:
+            assert np.allclose(np.concatenate(pieces[c]), full[c], rtol=1e-12, atol=0, equal_nan=True), (ticker, c)
+
+
+def test_feature_store_extends_stored_history(tmp_path):
+    arrays = open_price_panel().arrays('AAPL')
+    store = FeatureStore(StageCache(str(tmp_path)))
+    store.features('AAPL', {f: v[:-5] for f, v in arrays.items()})
+    reopened = FeatureStore(StageCache(str(tmp_path)))
+    extended = reopened.features('AAPL', arrays)
+    assert reopened.stats['extended'] == 1
+    full, _ = technical_features(arrays)
+    for c in TECHNICAL_FEATURES:
+        assert np.array_equal(extended[c], full[c], equal_nan=True), c
+
+
+def test_joined_features_are_point_in_time(tmp_path):
+    # truncating the history right after peak 2 gives the same joined values
+    panel = open_price_panel()
+    labeled = read_events('labeled_double_top_events.csv')
+    sample = labeled.iloc[np.random.default_rng(0).choice(len(labeled), 50, replace=False)].reset_index(drop=True)
+    joined = add_technical_features(sample, store=FeatureStore(StageCache(str(tmp_path))))
+    for i, event in sample.iterrows():
+        p = int(event['peak2_pos'])
+        cut, _ = technical_features({f: v[:p + 1] for f, v in panel.arrays(event['Ticker']).items()})
+        for c in TECHNICAL_FEATURES:
+            assert np.allclose(cut[c][p], joined[c].iloc[i], equal_nan=True), (i, c)
+
+
+# grouped_statistics (against evaluate_all ticker by ticker, and scipy on tied and tiny samples)
+
+def test_grouped_statistics_match_evaluate_all(sample_tickers, tmp_path):
+    from baseline_store import open_baseline_store
+    from evaluate_all import evaluate_all
+    from run_double_top_pipeline import run_universe
+
+    dt_events = run_universe(sample_tickers, workers=1, baseline_dir=str(tmp_path))[0]
+    baselines = open_baseline_store(str(tmp_path))
+    ref_ind, ref_comp, frames = [], [], []
+    for ticker, dt in dt_events.groupby('symbol', sort=False):
+        rand, ma = baselines.random_events(ticker, n_events=len(dt)), baselines.ma_events(ticker)
+        ind, comp = evaluate_all(dt, rand, ma)
+        ref_ind.append(ind.assign(symbol=ticker))
+        ref_comp.append(comp.assign(symbol=ticker))
+        frames.append(stack_returns({'double_top': dt, 'random': rand, 'ma_crossover': ma}, ticker))
+    ind, comp = evaluate_grouped(pd.concat(frames, ignore_index=True), symbols=list(dt_events['symbol'].unique()))
+    pd.testing.assert_frame_equal(ind, pd.concat(ref_ind, ignore_index=True), check_dtype=False, rtol=1e-9)
+    pd.testing.assert_frame_equal(comp, pd.concat(ref_comp, ignore_index=True), check_dtype=False, rtol=1e-9)
+
+
+def test_grouped_tests_match_scipy_on_small_tied_samples():
+    from cohen_d_two_sample import cohen_d_two_sample
+    from compare_distributions import compare_distributions
+
+    rng = np.random.default_rng(0)
+    frames, pairs = [], []
+    for k in range(300):
+        na, nb = rng.integers(3, 14, size=2)
+        if k % 5 == 0:
+            nb = na  # equal sizes take scipy's closed-form KS path
+        decimals = int(rng.integers(1, 4))
+        a, b = rng.normal(size=na).round(decimals), (rng.normal(size=nb) + rng.normal()).round(decimals)
+        frames.append(stack_returns({'a': pd.DataFrame({'ret_5d': a}), 'b': pd.DataFrame({'ret_5d': b})}, k, (5,)))
+        pairs.append((pd.Series(a), pd.Series(b)))
+    ind, comp = evaluate_grouped(pd.concat(frames), horizons=(5,), types=('a', 'b'), comparisons=(('a', 'b'),),
+                                 effect_size=True, p_adjust='holm')
+    ref = pd.DataFrame([compare_distributions(a, b) for a, b in pairs])
+    pd.testing.assert_frame_equal(comp[ref.columns], ref, rtol=1e-9)
+    assert np.allclose(comp['cohen_d'], [cohen_d_two_sample(a, b) for a, b in pairs], equal_nan=True)
+
+
+def test_ks_exact_sf_matches_ks_2samp():
+    from scipy import stats
+    from grouped_statistics import _ks_pvalues
+
+    rng = np.random.default_rng(1)
+    pairs = [(rng.normal(size=rng.integers(5, 120)), rng.normal(size=rng.integers(5, 120)) + 0.3) for _ in range(200)]
+    d = np.array([stats.ks_2samp(a, b, method='asymp').statistic for a, b in pairs])
+    na, nb = np.array([len(a) for a, _ in pairs]), np.array([len(b) for _, b in pairs])
+    stat, p = _ks_pvalues(d, na, nb)
+    ref = [stats.ks_2samp(a, b, method='auto') for a, b in pairs]
+    assert np.allclose(stat, [r.statistic for r in ref], rtol=1e-12)
+    assert np.allclose(p, [r.pvalue for r in ref], rtol=1e-9)
+
+
+# batch_scorer
+
+def test_batch_scorer_matches_predict_proba():
+    from xgboost import XGBClassifier
+    from batch_scorer import RAW_COLUMNS, BatchScorer
+
+    scorer = BatchScorer('best_xgb_model.json', 'feature_names.pkl')
+    labeled = read_events('labeled_double_top_events.csv')
+    raw = labeled.drop(columns=[c for c in scorer.features if c not in RAW_COLUMNS])
+    model = XGBClassifier()
+    model.load_model('best_xgb_model.json')
+    ref = model.predict_proba(labeled[scorer.features])[:, 1]
+
+    # one micro-batch per peak-2 day, like the day's new candidates across the universe
+    days = [day for _, day in raw.groupby('peak2_date', sort=False)]
+    probs = np.concatenate([scorer.score(day) for day in days])
+    order = np.concatenate([day.index.to_numpy() for day in days])
+    assert np.array_equal(probs, ref[order])
+    assert np.array_equal(scorer.score(raw.iloc[:20].to_dict('records')), ref[:20])
+    assert np.array_equal(scorer.score_frame(raw.iloc[:20])['predicted_label'], (ref[:20] >= 0.5).astype(int))
+
+    stats = scorer.stats()
+    assert stats['calls'] == len(days) + 2 and stats['rows'] == len(raw) + 40
+
+
+def test_batch_scorer_http_front_end():
+    import json
+    import threading
+    import urllib.error
+    import urllib.request
+    from batch_scorer import RAW_COLUMNS, BatchScorer, make_server
+
+    scorer = BatchScorer('best_xgb_model.json', 'feature_names.pkl')
+    raw = read_events('labeled_double_top_events.csv').iloc[:5]
+    raw = raw.drop(columns=[c for c in scorer.features if c not in RAW_COLUMNS])
+    candidates = json.loads(raw.to_json(orient='records', date_format='iso'))
+    server = make_server(scorer, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        def post(payload):
+            request = urllib.request.Request(f"{url}/score", data=json.dumps(payload).encode(), method='POST')
+            with urllib.request.urlopen(request) as response:
+                return json.load(response)
+
+        reply = post({'candidates': candidates})
+        assert np.allclose(reply['prob'], scorer.score(raw), rtol=0, atol=1e-7)
+        assert post(candidates) == reply
+        with pytest.raises(urllib.error.HTTPError) as err:
+            post([{k: v for k, v in candidates[0].items() if k != 'peak1_price'}])
+        assert err.value.code == 400
+        with urllib.request.urlopen(f"{url}/stats") as response:
+            assert json.load(response)['calls'] == scorer.stats()['calls']
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+# batch_scorer (models trained with technical features)
+
+def test_batch_scorer_joins_technical_features(tmp_path):
+    import joblib
+    from xgboost import XGBClassifier
+    from batch_scorer import RAW_COLUMNS, BatchScorer
+    from engineer_features import FEATURES
+
+    labeled = read_events('labeled_double_top_events.csv').iloc[:1500].reset_index(drop=True)
+    features = FEATURES + TECHNICAL_FEATURES
+    joined = add_technical_features(labeled, store=FeatureStore(StageCache(str(tmp_path / 'features'))))
+    model = XGBClassifier(objective="binary:logistic", n_estimators=20, max_depth=3, n_jobs=1)
+    model.fit(joined[features], joined['label'])
+    model.save_model(str(tmp_path / 'model.json'))
+    joblib.dump(features, tmp_path / 'features.pkl')
+    ref = model.predict_proba(joined[features])[:, 1]
+
+    scorer = BatchScorer(str(tmp_path / 'model.json'), str(tmp_path / 'features.pkl'))
+    raw = labeled.drop(columns=[c for c in features if c in labeled and c not in RAW_COLUMNS])
+    assert np.array_equal(scorer.score(raw), ref)
+    assert np.array_equal(scorer.score(raw.iloc[:20].to_dict('records')), ref[:20])
+    assert np.array_equal(scorer.score(joined), ref)  # technical columns already present
+    with pytest.raises(ValueError, match='Ticker'):
+        scorer.score(raw.drop(columns='Ticker'))
+
+
+# streaming_double_tops (bar-by-bar replay against the batch detection and confirmation)
+
+@pytest.mark.parametrize('max_confirm_days', [5, 20, 40])
+@pytest.mark.parametrize('params', DETECT_PARAM_SETS)
+def test_streaming_detector_matches_batch(sample_tickers, params, max_confirm_days):
+    for ticker in sample_tickers:
+        df = load_price_data(ticker)
+        detector = StreamingDoubleTopDetector(**params, max_confirm_days=max_confirm_days, keep_history=True)
+        for bar in zip(df['High'].tolist(), df['Low'].tolist(), df['Close'].tolist(), df['Volume'].tolist(),
+                       df['Date']):
+            detector.update(*bar)
+
+        candidates = detect_double_tops(df, **params)
+        pd.testing.assert_frame_equal(detector.candidates_frame(), candidates)
+        pd.testing.assert_frame_equal(detector.confirmed_frame(),
+                                      confirm_double_tops(df, candidates, max_confirm_days=max_confirm_days))
+
+
+# panel_signals (whole-panel kernels against the per-ticker functions)
+
+def test_panel_signals_match_per_ticker(sample_tickers):
+    from panel_signals import panel_events_forward_returns, panel_local_extrema, panel_ma_crossover_signals
+
+    panel = open_price_panel()
+    local_high, local_low, _ = panel_local_extrema(panel, window=3)
+    ma_events = panel_ma_crossover_signals(panel)
+    ma_by_symbol = dict(tuple(ma_events.groupby('symbol', observed=True)))
+    for ticker in sample_tickers:
+        df = load_price_data(ticker)
+        row, start = panel.row[ticker], panel.starts[panel.row[ticker]]
+        ref_high, ref_low = find_local_extrema(df, window=3)
+        assert (local_high[row, start:] == ref_high.to_numpy()).all() and not local_high[row, :start].any()
+        assert (local_low[row, start:] == ref_low.to_numpy()).all() and not local_low[row, :start].any()
+
+        ref_ma = ma_crossover_signals(df)
+        ma = ma_by_symbol.get(ticker, ma_events.iloc[:0]).drop(columns='symbol').reset_index(drop=True)
+        pd.testing.assert_frame_equal(ma, ref_ma, check_dtype=False)
+        pd.testing.assert_frame_equal(
+            panel_events_forward_returns(panel, ref_ma.assign(symbol=ticker)).drop(columns='symbol'),
+            compute_forward_returns(df, ref_ma))
+
+
+# training_matrices (reused quantized matrices against fresh XGBClassifier fits)
+
+def test_training_matrices_match_fresh_fits():
+    import joblib
+    from sklearn.utils import shuffle
+    from xgboost import XGBClassifier
+    from training_matrices import TrainingMatrices, fit_from_matrix, train_booster
+    from walk_forward_split import WalkForwardSplit
+
+    labeled = read_events('labeled_double_top_events.csv').sort_values('peak2_date', kind='stable')
+    train = labeled.iloc[:3000].reset_index(drop=True)
+    features = joblib.load('feature_names.pkl')
+    X, y = train[features], train['label']
+    model = XGBClassifier(objective="binary:logistic", n_estimators=30, max_depth=4, subsample=0.8,
+                          colsample_bytree=0.8, n_jobs=1, random_state=0)
+    matrices = TrainingMatrices(X, y, cv=WalkForwardSplit(n_splits=3, times=train['peak2_date']))
+
+    # every fold's scores, from the fold matrix (built once, reused by the second pass)
+    for _ in range(2):
+        for k, (train_idx, _) in enumerate(matrices.folds):
+            dtrain, X_test, _ = matrices.fold(k)
+            ref = XGBClassifier(**model.get_params()).fit(X.iloc[train_idx], y.iloc[train_idx])
+            assert np.array_equal(fit_from_matrix(XGBClassifier(**model.get_params()), dtrain).predict_proba(X_test),
+                                  ref.predict_proba(X_test))
+
+    # label permutations on the full matrix only swap the labels
+    for seed in range(3):
+        y_perm = shuffle(y, random_state=seed)
+        ref = XGBClassifier(**model.get_params()).fit(X, y_perm).predict_proba(X)[:, 1]
+        assert np.array_equal(train_booster(model, matrices.full(y_perm)).inplace_predict(X), ref)
@@ -0,0 +1,28 @@
+import numpy as np
+import pandas as pd
+
+from event_store import read_events, save_events, store_path
+
+
+def test_read_events_from_store_is_writable_and_leaves_store_unchanged(tmp_path):
+    csv = str(tmp_path / 'events.csv')
+    df = pd.DataFrame({'ticker': ['AAPL', 'MSFT', 'AAPL'], 'peak2_date': ['2020-01-02', '2020-02-03', '2020-03-02'],
+                       'peak2_pos': [10, 30, 50], 'drop': [0.05, 0.1, 0.2], 'label': [1, 0, 1]})
+    df.to_csv(csv, index=False)
+    save_events(read_events(csv), store_path(csv), exact=['drop'], source=csv)
+
+    events = read_events(csv)
+    assert any(isinstance(b, np.memmap) for b in _bases(events['drop'].to_numpy()))   # served from the store
+    events['drop'] *= 2
+    events.loc[0, 'peak2_pos'] = -1
+    events['label'].to_numpy()[1] = 1
+
+    again = read_events(csv)
+    assert again['drop'].tolist() == [0.05, 0.1, 0.2]
+    assert again['peak2_pos'].tolist() == [10, 30, 50] and again['label'].tolist() == [1, 0, 1]
+
+
+def _bases(array):
+    while array is not None:
+        yield array
+        array = array.base
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+from scipy.stats import mannwhitneyu
+
+from monte_carlo_baseline import draw_index_matrix, mann_whitney_u, monte_carlo_random_baseline, monte_carlo_universe
+
+
+def test_draw_index_matrix_rows_are_uniform_subsets():
+    rng = np.random.default_rng(0)
+    idx = draw_index_matrix(rng, 40, 10, 20_000, block=1000)
+    assert idx.shape == (20_000, 10)
+    assert idx.min() >= 0 and idx.max() < 40
+    assert all(len(np.unique(row)) == 10 for row in idx[:500])
+    # every anchor is drawn with probability 10/40
+    freq = np.bincount(idx.ravel(), minlength=40) / len(idx)
+    assert np.allclose(freq, 0.25, atol=0.02)
+
+    assert draw_index_matrix(rng, 5, 8, 3).shape == (3, 5)  # more events than anchors: every anchor once
+    assert draw_index_matrix(rng, 5, 0, 3).shape == (3, 0)
+
+
+def test_mann_whitney_u_matches_scipy():
+    rng = np.random.default_rng(0)
+    x = rng.normal(size=15).round(1)
+    anchors = rng.normal(size=300).round(1)
+    idx = draw_index_matrix(rng, len(anchors), 15, 50)
+    u = mann_whitney_u(x, anchors, idx)
+    assert np.allclose(u, [mannwhitneyu(x, anchors[row]).statistic for row in idx])
+
+
+def test_mw_auc_counts_finite_draws_only():
+    rng = np.random.default_rng(1)
+    anchors = rng.normal(size=200)
+    anchors[-40:] = np.nan  # long horizons run past the end of the history
+    events = rng.normal(size=30) + 0.2
+    nulls = monte_carlo_random_baseline({'ret_60d': anchors}, {'ret_60d': events}, n_replicates=200,
+                                        rng=np.random.default_rng(2))['ret_60d']
+    idx = draw_index_matrix(np.random.default_rng(2), 200, 30, 200)
+    ref = []
+    for row in idx:
+        draws = anchors[row][~np.isnan(anchors[row])]
+        ref.append(mannwhitneyu(events, draws).statistic / (len(events) * len(draws)))
+    assert np.allclose(nulls['mw_auc'], ref)
+    assert ((nulls['mw_auc'] >= 0) & (nulls['mw_auc'] <= 1)).all()
+
+
+def _events(tickers, n=12, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.concat([pd.DataFrame({'symbol': t, **{f'ret_{h}d': rng.normal(size=n) / 20 for h in (5, 20, 60)}})
+                      for t in tickers], ignore_index=True)
+
+
+def test_replicates_do_not_depend_on_the_run():
+    tickers = ['AAPL', 'MSFT', 'XOM', 'JPM']
+    events = _events(tickers)
+    serial = monte_carlo_universe(events, n_replicates=300, workers=1, return_nulls=True)[1]
+    parallel = monte_carlo_universe(events, n_replicates=300, workers=2, return_nulls=True)[1]
+    subset = monte_carlo_universe(events, n_replicates=300, tickers=['XOM', 'MSFT'], workers=1, return_nulls=True)[1]
+    # a ticker's stream depends on its symbol only, not on its position or the other tickers in the run
+    reordered = monte_carlo_universe(events, n_replicates=300, tickers=tickers[::-1], workers=1, return_nulls=True)[1]
+    for other in (parallel, subset, reordered):
+        for t in other:
+            for col in other[t]:
+                for stat in other[t][col]:
+                    assert np.array_equal(serial[t][col][stat], other[t][col][stat], equal_nan=True)
+    assert not np.array_equal(serial['AAPL']['ret_5d']['mean'], serial['MSFT']['ret_5d']['mean'])
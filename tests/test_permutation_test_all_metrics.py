@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LogisticRegression
+
+import permutation_test_all_metrics as ptam
+from permutation_test_all_metrics import permutation_test_all_metrics
+
+
+@pytest.fixture
+def split():
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(size=(300, 3)), columns=['a', 'b', 'c'])
+    y = pd.Series((X['a'] + rng.normal(size=300) > 0).astype(int))
+    return X.iloc[:200], y.iloc[:200], X.iloc[200:], y.iloc[200:]
+
+
+@pytest.fixture
+def seeds_run(monkeypatch):
+    """
+    Seeds each call to the refit loop was given, to see which permutations a resumed run repeats.
+    """
+    calls = []
+    permuted_probs = ptam._permuted_probs
+
+    def counting(base_model, X_train, y_train, X_test, seeds, *args, **kwargs):
+        calls.extend(int(s) for s in seeds)
+        return permuted_probs(base_model, X_train, y_train, X_test, seeds, *args, **kwargs)
+
+    monkeypatch.setattr(ptam, '_permuted_probs', counting)
+    return calls
+
+
+def test_checkpoint_without_suffix_is_resumed(split, tmp_path, seeds_run):
+    checkpoint = str(tmp_path / 'null')
+    _, first, _ = permutation_test_all_metrics(LogisticRegression(), *split, n_permutations=20, batch_size=10,
+                                               checkpoint=checkpoint)
+    assert (tmp_path / 'null.npz').exists() and not (tmp_path / 'null').exists()
+
+    seeds_run.clear()
+    _, extended, p_values = permutation_test_all_metrics(LogisticRegression(), *split, n_permutations=30,
+                                                         batch_size=10, checkpoint=checkpoint)
+    assert seeds_run == list(range(20, 30))
+    _, fresh, fresh_p = permutation_test_all_metrics(LogisticRegression(), *split, n_permutations=30, batch_size=10)
+    for name in fresh:
+        assert np.array_equal(extended[name][:20], first[name])
+        assert np.array_equal(extended[name], fresh[name])
+    assert p_values == fresh_p
+
+
+def test_longer_checkpoint_is_cut_to_n_permutations(split, tmp_path, seeds_run):
+    checkpoint = tmp_path / 'null.npz'
+    _, full, _ = permutation_test_all_metrics(LogisticRegression(), *split, n_permutations=30, batch_size=10,
+                                              checkpoint=checkpoint)
+    seeds_run.clear()
+    _, short, p_values = permutation_test_all_metrics(LogisticRegression(), *split, n_permutations=10,
+                                                      checkpoint=checkpoint)
+    assert seeds_run == []
+    _, fresh, fresh_p = permutation_test_all_metrics(LogisticRegression(), *split, n_permutations=10)
+    for name in full:
+        assert np.array_equal(short[name], full[name][:10]) and np.array_equal(short[name], fresh[name])
+    assert p_values == fresh_p
+
+
+def test_checkpoint_of_another_model_is_rejected(split, tmp_path):
+    checkpoint = tmp_path / 'null.npz'
+    permutation_test_all_metrics(LogisticRegression(), *split, n_permutations=5, checkpoint=checkpoint)
+    with pytest.raises(ValueError, match="different data or model parameters"):
+        permutation_test_all_metrics(LogisticRegression(C=0.1), *split, n_permutations=5, checkpoint=checkpoint)
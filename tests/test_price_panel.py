@@ -0,0 +1,59 @@
+import os
+import shutil
+
+import pytest
+
+import price_panel
+from price_panel import PRICE_DIR, frame_digest, ingest_price_panel, load_price_data, price_digest
+
+
+def _small_universe(tmp_path, tickers=('AAPL', 'MSFT')):
+    src = tmp_path / "src"
+    src.mkdir()
+    for ticker in tickers:
+        shutil.copy(os.path.join(PRICE_DIR, f"{ticker}.csv"), src / f"{ticker}.csv")
+    return str(src), str(tmp_path / "panel")
+
+
+def test_price_digest_uses_recorded_digest(tmp_path, monkeypatch):
+    src, panel = _small_universe(tmp_path)
+    ingest_price_panel(src, panel)
+    expected = frame_digest(load_price_data('AAPL', panel_dir=panel, src_dir=src))
+
+    loads = []
+    monkeypatch.setattr(price_panel, 'load_price_data', lambda *a, **k: loads.append(a))
+    assert price_digest('AAPL', panel, src) == expected
+    assert price_digest('AAPL', panel, src) == expected
+    assert loads == []
+
+
+def test_price_digest_follows_changed_csv(tmp_path):
+    src, panel = _small_universe(tmp_path)
+    ingest_price_panel(src, panel)
+    before = price_digest('AAPL', panel, src)
+
+    path = os.path.join(src, "AAPL.csv")
+    with open(path) as f:
+        lines = f.readlines()
+    with open(path, "w") as f:
+        f.writelines(lines[:-1])
+    with pytest.warns(UserWarning, match='re-run ingest_price_panel'):
+        after = price_digest('AAPL', panel, src)
+    assert after != before
+    assert after == frame_digest(price_panel.read_price_csv('AAPL', src))
+    assert price_digest('MSFT', panel, src) == frame_digest(price_panel.read_price_csv('MSFT', src))
+
+
+def test_panel_signals_reject_stale_panel(tmp_path):
+    from panel_signals import panel_local_extrema, panel_ma_crossover_signals
+
+    src, panel_dir = _small_universe(tmp_path)
+    panel = ingest_price_panel(src, panel_dir)
+    panel_local_extrema(panel)
+
+    with open(os.path.join(src, "MSFT.csv"), "a") as f:
+        f.write("\n")
+    with pytest.raises(ValueError, match="re-run ingest_price_panel"):
+        panel_local_extrema(panel)
+    with pytest.raises(ValueError, match="MSFT"):
+        panel_ma_crossover_signals(panel)
@@ -0,0 +1,21 @@
+import price_panel
+import stage_graph
+from stage_graph import DEFAULT_RUN_PARAMS, StageCache, double_top_graph
+
+
+def test_cached_run_reads_no_prices(tmp_path, monkeypatch):
+    graph = double_top_graph(cache=StageCache(str(tmp_path)), workers=1)
+    params = {**DEFAULT_RUN_PARAMS, 'ticker': 'AAPL'}
+    first, executed = graph.run(['summary'], params)
+    assert 'prices' in executed
+
+    # keys come from the digest recorded at ingest, so a fully cached run never loads the ticker
+    loads = []
+    monkeypatch.setattr(price_panel, 'load_price_data', lambda *a, **k: loads.append(a))
+    monkeypatch.setattr(stage_graph, 'load_price_data', lambda *a, **k: loads.append(a))
+    graph = double_top_graph(cache=StageCache(str(tmp_path)), workers=1)
+    second, executed = graph.run(['summary'], params)
+    assert executed == []
+    assert loads == []
+    for a, b in zip(first['summary'], second['summary']):
+        assert a.equals(b)
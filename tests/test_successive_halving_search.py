@@ -0,0 +1,62 @@
+import os
+
+import joblib
+import numpy as np
+import pytest
+from sklearn.model_selection import cross_val_score
+from xgboost import XGBClassifier
+
+from event_store import read_events
+from successive_halving_search import SuccessiveHalvingSearch
+from walk_forward_split import WalkForwardSplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PARAMS = {"n_estimators": [10, 20, 30], "max_depth": [2, 3, 4], "learning_rate": [0.05, 0.1, 0.3],
+          "min_child_weight": [1, 5]}
+
+
+@pytest.fixture(scope="module")
+def training_set():
+    labeled = read_events(os.path.join(ROOT, 'labeled_double_top_events.csv')).sort_values('peak2_date', kind='stable')
+    train = labeled.iloc[:3000].reset_index(drop=True)
+    features = joblib.load(os.path.join(ROOT, 'feature_names.pkl'))
+    return train[features], train['label'], WalkForwardSplit(n_splits=3, times=train['peak2_date'])
+
+
+def _search(cv, **kwargs):
+    model = XGBClassifier(objective="binary:logistic", n_jobs=-1, random_state=0)
+    return SuccessiveHalvingSearch(model, PARAMS, n_iter=9, cv=cv, eta=3, random_state=0, **kwargs)
+
+
+def test_rungs_keep_the_best_third(training_set):
+    X, y, cv = training_set
+    search = _search(cv).fit(X, y)
+    results = search.cv_results_
+    assert results.groupby('rung').size().tolist() == [9, 3, 1]
+    assert results.groupby('rung')['n_folds'].first().tolist() == [1, 2, 3]
+    for rung in (0, 1):
+        ranked = results[results['rung'] == rung].sort_values('mean_test_score', ascending=False)
+        assert set(results[results['rung'] == rung + 1]['candidate']) <= set(ranked['candidate'][:3])
+    last = results[results['rung'] == 2].iloc[0]
+    assert last['n_rounds'] == last['params']['n_estimators'] and search.best_params_ == last['params']
+    assert 0 < search.compute_['saved_fraction'] < 1
+
+
+def test_final_rung_scores_what_randomized_search_would(training_set):
+    # without row or column subsampling a continued booster is a fresh fit, so the scores are exact
+    X, y, cv = training_set
+    search = _search(cv).fit(X, y)
+    ref = cross_val_score(XGBClassifier(objective="binary:logistic", n_jobs=-1, random_state=0,
+                                        **search.best_params_), X, y, cv=cv, scoring="roc_auc")
+    assert search.best_score_ == pytest.approx(ref.mean(), abs=1e-12)
+
+    refit = XGBClassifier(objective="binary:logistic", n_jobs=-1, random_state=0, **search.best_params_).fit(X, y)
+    assert np.array_equal(search.best_estimator_.predict_proba(X), refit.predict_proba(X))
+
+
+def test_parallel_search_matches_serial(training_set):
+    X, y, cv = training_set
+    serial = _search(cv).fit(X, y).cv_results_
+    parallel = _search(cv, n_jobs=2).fit(X, y).cv_results_
+    assert serial[['rung', 'candidate', 'n_rounds', 'n_folds']].equals(parallel[['rung', 'candidate', 'n_rounds', 'n_folds']])
+    assert np.allclose(serial['mean_test_score'], parallel['mean_test_score'], rtol=0, atol=1e-12)
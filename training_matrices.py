@@ -0,0 +1,192 @@
+import os
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+MAX_BIN = 256  # XGBoost's default histogram resolution
+
+class TrainingMatrices:
+    """
+    Quantile-sketched XGBoost matrices built once and reused across fits.
+
+    `XGBClassifier.fit(X, y)` re-quantizes X on every call. The histogram cuts depend only on the features, so
+    one matrix per walk-forward fold (and one for the full training set) serves every hyperparameter candidate,
+    and a label permutation only needs `set_label`.
+
+    Parameters
+    ----------
+    X : pd.DataFrame
+        Training features.
+    y : pd.Series or np.ndarray
+        Training labels.
+    cv : WalkForwardSplit or None
+        Splitter defining the folds served by `fold`.
+    max_bin : int
+        Histogram bins per feature (default is 256, XGBoost's default). Models trained on these matrices use it.
+    """
+
+    def __init__(self, X, y, cv=None, max_bin=MAX_BIN):
+        self.X = X
+        self.y = np.asarray(y)
+        self.max_bin = max_bin
+        self.folds = list(cv.split(X, y)) if cv is not None else []
+        self._full = None
+        self._fold = {}
+
+    def full(self, y=None):
+        """
+        Matrix of the full training set, labeled with `y` (default is the original labels).
+        """
+        if self._full is None:
+            self._full = xgb.QuantileDMatrix(self.X, self.y, max_bin=self.max_bin)
+        self._full.set_label(self.y if y is None else np.asarray(y))
+        return self._full
+
+    def fold(self, k):
+        """
+        Training matrix of fold k, plus the fold's test features and labels.
+        """
+        train_idx, test_idx = self.folds[k]
+        if k not in self._fold:
+            self._fold[k] = xgb.QuantileDMatrix(_take(self.X, train_idx), self.y[train_idx], max_bin=self.max_bin)
+        return self._fold[k], _take(self.X, test_idx), self.y[test_idx]
+
+
+def train_booster(estimator, dtrain, num_boost_round=None, xgb_model=None):
+    """
+    Train the booster `estimator.fit` would, from a prebuilt matrix.
+
+    Parameters
+    ----------
+    estimator : XGBClassifier
+        Supplies the hyperparameters; it is not modified.
+    dtrain : xgb.QuantileDMatrix or xgb.ExtMemQuantileDMatrix
+        Training matrix from `TrainingMatrices` or `external_memory_matrix`.
+    num_boost_round : int or None
+        Rounds to add (default is the estimator's n_estimators).
+    xgb_model : xgb.Booster or None
+        Booster to continue training.
+    """
+    params = {k: v for k, v in estimator.get_xgb_params().items() if v is not None}
+    params['max_bin'] = _matrix_max_bin(dtrain, params.get('max_bin'))
+    rounds = num_boost_round if num_boost_round is not None else (estimator.get_params()['n_estimators'] or 100)
+    return xgb.train(params, dtrain, num_boost_round=int(rounds), xgb_model=xgb_model)
+
+
+def fit_from_matrix(estimator, dtrain, xgb_model=None):
+    """
+    `estimator.fit(X, y)` from a prebuilt matrix: trains the same model without re-quantizing X.
+
+    Fits `estimator` in place and returns it.
+    """
+    booster = train_booster(estimator, dtrain, xgb_model=xgb_model)
+    estimator.load_model(bytearray(booster.save_raw()))
+    return estimator
+
+
+def _matrix_max_bin(dtrain, requested):
+    """
+    Training must use the matrix's own bin count; a different `max_bin` on the model is an error.
+    """
+    max_bin = getattr(dtrain, 'max_bin', None) or MAX_BIN
+    if requested is not None and requested != max_bin:
+        raise ValueError(f"model max_bin={requested} does not match the training matrix (max_bin={max_bin})")
+    return max_bin
+
+
+def _take(data, idx):
+    return data.iloc[idx] if hasattr(data, 'iloc') else data[idx]
+
+
+class CsvBatchIter(xgb.DataIter):
+    """
+    Stream labeled events from CSV files in chunks, for training sets that do not fit in memory.
+
+    Parameters
+    ----------
+    paths : list of str
+        CSV files, read in order.
+    features : list of str
+        Feature columns, e.g. the contents of 'feature_names.pkl'.
+    label : str
+        Label column (default is 'label').
+    chunksize : int
+        Rows per batch (default is 100,000).
+    cache_prefix : str
+        Where XGBoost writes its on-disk pages.
+    """
+
+    def __init__(self, paths, features, label='label', chunksize=100_000, cache_prefix=os.path.join('.xgb_cache', 'train')):
+        self.paths = list(paths)
+        self.features = list(features)
+        self.label = label
+        self.chunksize = chunksize
+        self._chunks = None
+        os.makedirs(os.path.dirname(cache_prefix) or '.', exist_ok=True)
+        super().__init__(cache_prefix=cache_prefix)
+
+    def _iter_chunks(self):
+        for path in self.paths:
+            yield from pd.read_csv(path, usecols=self.features + [self.label], chunksize=self.chunksize)
+
+    def next(self, input_data):
+        if self._chunks is None:
+            self._chunks = self._iter_chunks()
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            return False
+        input_data(data=chunk[self.features], label=chunk[self.label].to_numpy())
+        return True
+
+    def reset(self):
+        self._chunks = None
+
+
+def external_memory_matrix(paths, features, label='label', chunksize=100_000, max_bin=MAX_BIN,
+                           cache_prefix=os.path.join('.xgb_cache', 'train')):
+    """
+    Quantized training matrix built batch by batch from CSV files and paged to disk.
+
+    Train on it with `train_booster` / `fit_from_matrix` exactly like an in-memory `TrainingMatrices` matrix.
+    """
+    batches = CsvBatchIter(paths, features, label=label, chunksize=chunksize, cache_prefix=cache_prefix)
+    return xgb.ExtMemQuantileDMatrix(batches, max_bin=max_bin)
+
+
+if __name__ == "__main__":
+    # timing of permutation refits (equivalence with XGBClassifier.fit is checked in tests/test_equivalence.py)
+    import time
+    import joblib
+    from xgboost import XGBClassifier
+    from sklearn.utils import shuffle
+    from walk_forward_split import WalkForwardSplit
+    from event_store import read_events
+
+    labeled = read_events('labeled_double_top_events.csv').sort_values('peak2_date', kind='stable').reset_index(drop=True)
+    features = joblib.load('feature_names.pkl')
+    train = labeled.iloc[:int(len(labeled) * 0.8)]
+    X, y = train[features], train['label']
+    model = XGBClassifier(objective="binary:logistic", n_estimators=100, max_depth=4, subsample=0.8,
+                          colsample_bytree=0.8, n_jobs=1, random_state=0)
+
+    start = time.perf_counter()
+    for seed in range(5):
+        ref = model.fit(X, shuffle(y, random_state=seed)).predict_proba(X)[:, 1]
+    t_fit = time.perf_counter() - start
+
+    start = time.perf_counter()
+    matrices = TrainingMatrices(X, y, cv=WalkForwardSplit(n_splits=5, times=train['peak2_date']))
+    for seed in range(5):
+        probs = train_booster(model, matrices.full(shuffle(y, random_state=seed))).inplace_predict(X)
+    t_cached = time.perf_counter() - start
+    print(f"5 permutation fits: {t_fit:.2f} s with fit(X, y), {t_cached:.2f} s with a cached matrix")
+
+
+    path = os.path.join('.xgb_cache', 'train_sample.csv')
+    os.makedirs('.xgb_cache', exist_ok=True)
+    train[features + ['label']].to_csv(path, index=False)
+    booster = train_booster(model, external_memory_matrix([path], features, chunksize=20_000))
+    ext = booster.inplace_predict(X)
+    inmem = train_booster(model, matrices.full()).inplace_predict(X)
+    print(f"external memory vs in-memory max |diff| = {np.abs(ext - inmem).max():.2e}")